@@ -1,27 +1,55 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pandas as pd
 import mysql.connector
 from sqlalchemy import create_engine
 from urllib.parse import quote_plus
-import streamlit as st
-from db import insert_member, insert_payment, fetch_members, fetch_membership_types, fetch_trainers
+from db import invalidate_reference_data, rebuild_latest_payments, roll_up_loaded_payments, rebuild_revenue_rollups
 
 
 # ------------------- Helper Functions -------------------
 
+def map_unique(series, transform):
+    """
+    Apply a vectorized Series -> Series transform once per distinct value and
+    broadcast the result back. Dirty exports repeat the same few plan, mode,
+    status and name spellings, so this touches far fewer strings.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    mapped = transform(pd.Series(uniques))
+    return pd.Series(mapped.array.take(codes), index=series.index, name=series.name)
+
+
 def capitalize_strings(df):
     """Capitalize all string/object columns and replace 'Nan' with None."""
     for col in df.select_dtypes(include=['object']).columns:
-        df[col] = df[col].astype(str).str.strip().str.title()
-        df[col] = df[col].replace({'Nan': None})
+        df[col] = map_unique(
+            df[col].astype(str),
+            lambda s: s.str.strip().str.title().replace({'Nan': None})
+        )
     return df
 
 
+def normalize_gender(df):
+    """Reduce gender values ('male', ' f', ...) to a single upper-case character."""
+    if 'gender' in df.columns:
+        df['gender'] = map_unique(df['gender'].astype(str), lambda s: s.str.strip().str[0].str.upper())
+    return df
+
+
+def sql_dates(values):
+    """Parse a Series to YYYY-MM-DD strings, None where unparseable."""
+    dates = pd.to_datetime(values, errors='coerce')
+    return dates.dt.strftime('%Y-%m-%d').astype(object).where(dates.notna(), None)
+
+
 def format_dates(df, date_cols):
     """Format datetime columns to SQL-friendly YYYY-MM-DD."""
     for col in date_cols:
         if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-            df[col] = df[col].apply(lambda x: x.strftime('%Y-%m-%d') if pd.notna(x) else None)
+            # Distinct dates are few compared to rows: parse each one once
+            df[col] = map_unique(df[col], sql_dates)
     return df
 
 
@@ -29,7 +57,9 @@ def fill_non_critical(df, critical_cols):
     """Fill non-critical missing columns with None for SQL insertion."""
     non_critical = set(df.columns) - set(critical_cols)
     for col in non_critical:
-        df[col] = df[col].apply(lambda x: x if pd.notna(x) else None)
+        # Numeric columns keep NaN (written as NULL); others get real None
+        if not pd.api.types.is_numeric_dtype(df[col]) and df[col].isna().any():
+            df[col] = df[col].astype(object).where(df[col].notna(), None)
     return df
 
 
@@ -47,6 +77,41 @@ def remove_duplicates(df, subset_cols):
     return df
 
 
+def drop_seen_keys(df, key, seen_keys):
+    """
+    Drop rows whose key already appeared in an earlier chunk, then remember
+    this chunk's keys in seen_keys[key]. No-op when seen_keys is None
+    (whole-file cleaning).
+    """
+    if seen_keys is None:
+        return df
+    seen = seen_keys.setdefault(key, set())
+    df = df[~df[key].isin(seen)].reset_index(drop=True)
+    seen.update(df[key].tolist())
+    return df
+
+
+def remove_duplicate_people(df, seen_keys=None):
+    """
+    Keep the first member per (name, contact), as the unique index on
+    Members requires. Rows without a contact never clash (NULLs are distinct).
+    In chunked mode pairs from earlier chunks are tracked in seen_keys too.
+    """
+    if 'name' not in df.columns or 'contact' not in df.columns:
+        return df
+
+    df = df[~(df.duplicated(subset=['name', 'contact'], keep='first') & df['contact'].notna())]
+
+    if seen_keys is not None:
+        seen = seen_keys.setdefault(('name', 'contact'), set())
+        pairs = [(n, c) if pd.notna(c) else None for n, c in zip(df['name'], df['contact'])]
+        keep = [pair is None or pair not in seen for pair in pairs]
+        df = df[keep]
+        seen.update(pair for pair, kept in zip(pairs, keep) if kept and pair is not None)
+
+    return df.reset_index(drop=True)
+
+
 def integrity_check(df, column, valid_values_set):
     """
     Remove rows where 'column' value is not in valid_values_set (for FK constraints).
@@ -57,10 +122,79 @@ def integrity_check(df, column, valid_values_set):
         df = df.reset_index(drop=True)
     return df
 
+
+def index_non_unique(cursor, table, index_name):
+    """information_schema's non_unique flag of an index (None if it doesn't exist)."""
+    cursor.execute("""
+        SELECT MIN(non_unique) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (table, index_name))
+    return cursor.fetchone()[0]
+
+
+def duplicate_keys(cursor, table, columns, limit=10):
+    """Up to `limit` (key..., count) rows sharing a value of `columns` (NULLs never clash)."""
+    not_null = " AND ".join(f"{c.strip()} IS NOT NULL" for c in columns.split(","))
+    cursor.execute(f"""
+        SELECT {columns}, COUNT(*) FROM {table}
+        WHERE {not_null}
+        GROUP BY {columns}
+        HAVING COUNT(*) > 1
+        LIMIT {int(limit)}
+    """)
+    return cursor.fetchall()
+
+
+def create_index(cursor, table, index_name, columns, unique=False):
+    """
+    Create an index unless it already exists (MySQL has no CREATE INDEX IF NOT
+    EXISTS). An existing index whose uniqueness differs is rebuilt under a
+    temporary name and swapped in, so the table keeps its old index if the
+    build fails. A unique index is not attempted over duplicate rows: they
+    are reported and False is returned.
+    """
+    non_unique = index_non_unique(cursor, table, index_name)
+    if non_unique is not None and (non_unique == 0) == unique:
+        return True
+
+    if unique:
+        duplicates = duplicate_keys(cursor, table, columns)
+        if duplicates:
+            print(f"⚠️ {index_name} not made unique: {table} has rows sharing ({columns}), e.g. "
+                  + "; ".join(f"{row[:-1]} x{row[-1]}" for row in duplicates)
+                  + ". Merge or remove them and run again.")
+            return False
+
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    if non_unique is None:
+        cursor.execute(f"CREATE {kind} {index_name} ON {table} ({columns})")
+        return True
+
+    new_name = f"{index_name}_new"
+    if index_non_unique(cursor, table, new_name) is not None:
+        cursor.execute(f"DROP INDEX {new_name} ON {table}")   # left by an interrupted rebuild
+    cursor.execute(f"CREATE {kind} {new_name} ON {table} ({columns})")
+    cursor.execute(f"DROP INDEX {index_name} ON {table}")
+    cursor.execute(f"ALTER TABLE {table} RENAME INDEX {new_name} TO {index_name}")
+    return True
+
+def add_column(cursor, table, column, definition):
+    """Add a column to an existing table unless it is already there; True if it was added."""
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+    return False
+
 # ------------------- Clean Functions -------------------
+# Each clean_*_df works on an in-memory frame (a whole file or one chunk of
+# it); clean_* reads the full file, stream_* below reads it chunk by chunk.
 
-def clean_members(file, valid_trainers=None, valid_memberships=None):
-    df = pd.read_csv(file).drop_duplicates()
+def clean_members_df(df, valid_trainers=None, valid_memberships=None, seen_keys=None):
+    df = df.drop_duplicates()
 
     # Add 'name' as critical
     critical = ['member_id', 'name', 'membership_type', 'start_date']
@@ -73,8 +207,7 @@ def clean_members(file, valid_trainers=None, valid_memberships=None):
     df = format_dates(df, ['start_date', 'end_date'])
 
     # Fix gender to single character
-    if 'gender' in df.columns:
-        df['gender'] = df['gender'].astype(str).str.strip().str[0].str.upper()
+    df = normalize_gender(df)
 
     # Fix numeric types
     if 'contact' in df.columns:
@@ -82,22 +215,15 @@ def clean_members(file, valid_trainers=None, valid_memberships=None):
     if 'trainer_id' in df.columns:
         df['trainer_id'] = pd.to_numeric(df['trainer_id'], errors='coerce')
 
-    # Remove duplicates
+    # Remove duplicates (by ID, then by name + contact for the unique index)
     df = remove_duplicates(df, ['member_id'])
+    df = drop_seen_keys(df, 'member_id', seen_keys)
+    df = remove_duplicate_people(df, seen_keys)
 
     # Integrity checks
-    if valid_trainers is not None:
-        df = df[df['trainer_id'].isin(valid_trainers)]
-    if valid_memberships is not None:
-        df = df[df['membership_type'].isin(valid_memberships)]
+    return member_integrity(df, valid_trainers, valid_memberships)
 
-    df = df.reset_index(drop=True)
-    return df
-
-    # Remove duplicates
-    df = remove_duplicates(df, ['member_id'])
-
-    # Integrity checks
+def member_integrity(df, valid_trainers=None, valid_memberships=None):
     if valid_trainers is not None:
         df = df[df['trainer_id'].isin(valid_trainers)]
     if valid_memberships is not None:
@@ -106,8 +232,8 @@ def clean_members(file, valid_trainers=None, valid_memberships=None):
     df = df.reset_index(drop=True)
     return df
 
-def clean_trainers(file):
-    df = pd.read_csv(file).drop_duplicates()
+def clean_trainers_df(df, seen_keys=None):
+    df = df.drop_duplicates()
     df.columns = [col.lower() for col in df.columns]
 
     if 'trainer_id' in df.columns:
@@ -117,22 +243,24 @@ def clean_trainers(file):
     df = drop_missing_critical(df, critical)
     df = capitalize_strings(df)
     df = remove_duplicates(df, ['trainer_id'])
+    df = drop_seen_keys(df, 'trainer_id', seen_keys)
     df = fill_non_critical(df, critical)
     df = df.reset_index(drop=True)
     return df
 
-def clean_membership_types(file):
-    df = pd.read_csv(file).drop_duplicates()
+def clean_membership_types_df(df, seen_keys=None):
+    df = df.drop_duplicates()
     critical = ['membership_type', 'price', 'validity_months']
     df = drop_missing_critical(df, critical)
     df = fill_non_critical(df, critical)
     df = capitalize_strings(df)
     df = remove_duplicates(df, ['membership_type'])
+    df = drop_seen_keys(df, 'membership_type', seen_keys)
     df = df.reset_index(drop=True)
     return df
 
-def clean_payments(file, valid_members=None):
-    df = pd.read_csv(file).drop_duplicates()
+def clean_payments_df(df, valid_members=None, seen_keys=None):
+    df = df.drop_duplicates()
     critical = ['payment_id']
     df = drop_missing_critical(df, critical)
     df = fill_non_critical(df, critical)
@@ -143,114 +271,437 @@ def clean_payments(file, valid_members=None):
 
     df = format_dates(df, ['payment_date'])
     df = remove_duplicates(df, ['payment_id'])
+    df = drop_seen_keys(df, 'payment_id', seen_keys)
 
     # Integrity check for member_id
+    return payment_integrity(df, valid_members)
+
+def payment_integrity(df, valid_members=None):
     if valid_members is not None:
         df = df[df['member_id'].isin(valid_members)]
 
     df = df.reset_index(drop=True)
     return df
 
-# ------------------- Call Cleaning Functions -------------------
 
-trainers_df = clean_trainers(r"F:\DBMS_PROJECT\trainer_dirty.csv")
-membership_df = clean_membership_types(r"F:\DBMS_PROJECT\membership_types_dirty.csv")
-members_df = clean_members(
-    r"F:\DBMS_PROJECT\members_dirty.csv",
-    valid_trainers=set(trainers_df['trainer_id']),
-    valid_memberships=set(membership_df['membership_type'])
-)
-payments_df = clean_payments(
-    r"F:\DBMS_PROJECT\payments_dirty.csv",
-    valid_members=set(members_df['member_id'])
-)
+def clean_members(file, valid_trainers=None, valid_memberships=None):
+    return clean_members_df(pd.read_csv(file), valid_trainers, valid_memberships)
+
+def clean_trainers(file):
+    return clean_trainers_df(pd.read_csv(file))
+
+def clean_membership_types(file):
+    return clean_membership_types_df(pd.read_csv(file))
+
+def clean_payments(file, valid_members=None):
+    return clean_payments_df(pd.read_csv(file), valid_members)
+
+# ------------------- Streaming (Chunked) Cleaning -------------------
+
+CHUNK_SIZE = 50_000       # CSV rows read per chunk
+INSERT_BATCH = 1_000      # rows per multi-row INSERT statement
+
+
+class StageStats:
+    """Row counts and throughput of one ETL stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows_read = 0
+        self.rows_loaded = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    def report(self):
+        rate = self.rows_read / self.elapsed if self.elapsed else 0.0
+        return (f"{self.name:<18} read {self.rows_read:>10,}  loaded {self.rows_loaded:>10,}  "
+                f"{self.elapsed:8.2f}s  {rate:>12,.0f} rows/s")
+
+
+def stream_clean(file, cleaner, key, loaded_keys, stats, chunksize=CHUNK_SIZE, **cleaner_args):
+    """
+    Yield cleaned chunks of a CSV. Primary keys are deduplicated across
+    chunks at the same point the whole-file cleaner dedups them, and the keys
+    of surviving rows are collected in loaded_keys - the FK integrity set for
+    the next stage. Memory stays at one chunk plus the key sets.
+    """
+    seen_keys = {}
+    for chunk in pd.read_csv(file, chunksize=chunksize):
+        stats.rows_read += len(chunk)
+        df = cleaner(chunk, seen_keys=seen_keys, **cleaner_args)
+        loaded_keys.update(df[key].tolist())
+        if not df.empty:
+            yield df
+
 
-# ------------------- Preview Cleaned Data -------------------
-print("Members Cleaned:\n", members_df.head(), "\n")
-print("Trainers Cleaned:\n", trainers_df.head(), "\n")
-print("Membership Types Cleaned:\n", membership_df.head(), "\n")
-print("Payments Cleaned:\n", payments_df.head(), "\n")
+def load_chunks(chunks, table, engine, stats, batch_size=INSERT_BATCH):
+    """Append each chunk to table with batched multi-row INSERTs."""
+    for df in chunks:
+        df.to_sql(table, con=engine, if_exists='append', index=False, method='multi', chunksize=batch_size)
+        stats.rows_loaded += len(df)
+    return stats.finish()
 
+# ------------------- Database Setup -------------------
 
 user = 'root'
 password = 'Kartik10@'
 host = 'localhost'
 database = 'gym_db'
 
-# Connect to MySQL
-conn = mysql.connector.connect(
-    host=host,
-    user=user,
-    password=password,
-    database=database
-)
-cursor = conn.cursor()
-print("✅ Connected to MySQL!")
-
-# Create SQLAlchemy engine
-password_encoded = quote_plus(password)
-engine = create_engine(f"mysql+pymysql://{user}:{password_encoded}@{host}/{database}")
-print("✅ SQLAlchemy engine ready!")
-
-# ------------------- Create Tables -------------------
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS Membership_Types (
-    membership_type VARCHAR(50) PRIMARY KEY,
-    price DECIMAL(10,2),
-    validity_months INT
-)
-""")
-conn.commit()
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS Trainers (
-    trainer_id INT PRIMARY KEY AUTO_INCREMENT,
-    name VARCHAR(100) NOT NULL,
-    specialization VARCHAR(50)
-)
-""")
-conn.commit()
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS Members (
-    member_id INT PRIMARY KEY AUTO_INCREMENT,
-    name VARCHAR(100) NOT NULL,
-    age INT,
-    gender CHAR(1),
-    contact BIGINT,
-    membership_type VARCHAR(50),
-    start_date DATE,
-    end_date DATE,
-    trainer_id INT,
-    FOREIGN KEY (membership_type) REFERENCES Membership_Types(membership_type),
-    FOREIGN KEY (trainer_id) REFERENCES Trainers(trainer_id)
-)
-""")
-conn.commit()
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS Payments (
-    payment_id VARCHAR(10) PRIMARY KEY,
-    member_id INT,
-    amount DECIMAL(10,2),
-    payment_date DATE,
-    mode VARCHAR(50),
-    status VARCHAR(20),
-    FOREIGN KEY (member_id) REFERENCES Members(member_id)
-)
-""")
-conn.commit()
-
-print("✅ Tables created successfully!")
-
-# 1️⃣ Membership Types (parent table)
-membership_df.to_sql('Membership_Types', con=engine, if_exists='append', index=False)
-
-# 2️⃣ Trainers (parent table)
-trainers_df.to_sql('Trainers', con=engine, if_exists='append', index=False)
-
-# 3️⃣ Members (child table)
-members_df.to_sql('Members', con=engine, if_exists='append', index=False)
-
-# 4️⃣ Payments (child table)
-payments_df.to_sql('Payments', con=engine, if_exists='append', index=False)
+DEFAULT_PATHS = {
+    'trainers': r"F:\DBMS_PROJECT\trainer_dirty.csv",
+    'membership_types': r"F:\DBMS_PROJECT\membership_types_dirty.csv",
+    'members': r"F:\DBMS_PROJECT\members_dirty.csv",
+    'payments': r"F:\DBMS_PROJECT\payments_dirty.csv",
+}
+
+
+def connect():
+    # Connect to MySQL
+    conn = mysql.connector.connect(
+        host=host,
+        user=user,
+        password=password,
+        database=database
+    )
+    print("✅ Connected to MySQL!")
+
+    # Create SQLAlchemy engine
+    password_encoded = quote_plus(password)
+    engine = create_engine(f"mysql+pymysql://{user}:{password_encoded}@{host}/{database}")
+    print("✅ SQLAlchemy engine ready!")
+    return conn, engine
+
+
+def create_tables(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Membership_Types (
+        membership_type VARCHAR(50) PRIMARY KEY,
+        price DECIMAL(10,2),
+        validity_months INT
+    )
+    """)
+    conn.commit()
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Trainers (
+        trainer_id INT PRIMARY KEY AUTO_INCREMENT,
+        name VARCHAR(100) NOT NULL,
+        specialization VARCHAR(50)
+    )
+    """)
+    conn.commit()
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Members (
+        member_id INT PRIMARY KEY AUTO_INCREMENT,
+        name VARCHAR(100) NOT NULL,
+        age INT,
+        gender CHAR(1),
+        contact BIGINT,
+        membership_type VARCHAR(50),
+        start_date DATE,
+        end_date DATE,
+        trainer_id INT,
+        FOREIGN KEY (membership_type) REFERENCES Membership_Types(membership_type),
+        FOREIGN KEY (trainer_id) REFERENCES Trainers(trainer_id)
+    )
+    """)
+    conn.commit()
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Payments (
+        payment_id VARCHAR(10) PRIMARY KEY,
+        member_id INT,
+        amount DECIMAL(10,2),
+        payment_date DATE,
+        mode VARCHAR(50),
+        status VARCHAR(20),
+        membership_type VARCHAR(50),
+        FOREIGN KEY (member_id) REFERENCES Members(member_id)
+    )
+    """)
+    # Plan the payment was for; NULL until the load is rolled up (see db.py)
+    upgraded = add_column(cursor, 'Payments', 'membership_type', 'VARCHAR(50)')
+    conn.commit()
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Latest_Payments (
+        member_id INT PRIMARY KEY,
+        payment_id VARCHAR(10) NOT NULL,
+        amount DECIMAL(10,2),
+        payment_date DATE,
+        mode VARCHAR(50),
+        status VARCHAR(20),
+        FOREIGN KEY (member_id) REFERENCES Members(member_id)
+    )
+    """)
+    conn.commit()
+
+    # Revenue rollups kept current by every payment write (see db.py)
+    for table in ('Revenue_Daily', 'Revenue_Monthly'):
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            period DATE NOT NULL,
+            membership_type VARCHAR(50) NOT NULL,
+            mode VARCHAR(50) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            payments INT NOT NULL,
+            amount DECIMAL(14,2) NOT NULL,
+            PRIMARY KEY (period, membership_type, mode, status)
+        )
+        """)
+    conn.commit()
+
+    if upgraded:
+        # Existing database from before the rollups: backfill them from its
+        # payment history (all still unstamped) once
+        payments = rebuild_revenue_rollups(conn)
+        print(f"✅ Revenue rollups backfilled from {payments} existing payments")
+
+    # Block counters for application-generated IDs (see db.IdGenerator)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Id_Sequences (
+        name VARCHAR(32) PRIMARY KEY,
+        next_value BIGINT NOT NULL
+    )
+    """)
+    conn.commit()
+
+    # Turnstile / front-desk swipes, written in batches by checkins.py. No
+    # foreign key: swipes of unknown or deleted members are kept as denied.
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Check_Ins (
+        checkin_id CHAR(24) PRIMARY KEY,
+        member_id INT NOT NULL,
+        checked_in_at DATETIME NOT NULL,
+        gate VARCHAR(50),
+        result VARCHAR(30) NOT NULL
+    )
+    """)
+    conn.commit()
+
+    print("✅ Tables created successfully!")
+
+    # ------------------- Create Indexes -------------------
+    # One member per name + contact (enforced for register_member); the
+    # leftmost prefix also serves plain name searches.
+    create_index(cursor, 'Members', 'idx_members_name_contact', 'name, contact', unique=True)
+    # Expiry dashboards: end_date range scans, optionally within a plan or trainer
+    create_index(cursor, 'Members', 'idx_members_end_date', 'end_date')
+    create_index(cursor, 'Members', 'idx_members_plan_end', 'membership_type, end_date')
+    create_index(cursor, 'Members', 'idx_members_trainer_end', 'trainer_id, end_date')
+    # Per-member payment history and "latest payment" lookups
+    create_index(cursor, 'Payments', 'idx_payments_member_date', 'member_id, payment_date, payment_id')
+    # Finds freshly loaded payments (plan still NULL) without a full scan
+    create_index(cursor, 'Payments', 'idx_payments_plan', 'membership_type')
+    # A member's visit history, and check-ins per hour of a day
+    create_index(cursor, 'Check_Ins', 'idx_checkins_member_time', 'member_id, checked_in_at')
+    create_index(cursor, 'Check_Ins', 'idx_checkins_time', 'checked_in_at')
+    conn.commit()
+
+    print("✅ Indexes ready!")
+
+
+def finish_load(conn):
+    # 5️⃣ Latest payment per member (summary of Payments)
+    rebuild_latest_payments(conn)
+
+    # 6️⃣ Add the newly loaded payments to the revenue rollups
+    roll_up_loaded_payments(conn)
+
+    # Reference tables changed: make running app instances reload them
+    invalidate_reference_data("Membership_Types", "Trainers")
+
+# ------------------- Pipelines -------------------
+
+def run_batch(paths, conn, engine):
+    """Original mode: clean every file in memory, then load the four tables."""
+    # ------------------- Call Cleaning Functions -------------------
+    trainers_df = clean_trainers(paths['trainers'])
+    membership_df = clean_membership_types(paths['membership_types'])
+    members_df = clean_members(
+        paths['members'],
+        valid_trainers=set(trainers_df['trainer_id']),
+        valid_memberships=set(membership_df['membership_type'])
+    )
+    payments_df = clean_payments(
+        paths['payments'],
+        valid_members=set(members_df['member_id'])
+    )
+
+    # ------------------- Preview Cleaned Data -------------------
+    print("Members Cleaned:\n", members_df.head(), "\n")
+    print("Trainers Cleaned:\n", trainers_df.head(), "\n")
+    print("Membership Types Cleaned:\n", membership_df.head(), "\n")
+    print("Payments Cleaned:\n", payments_df.head(), "\n")
+
+    create_tables(conn)
+
+    # 1️⃣ Membership Types (parent table)
+    membership_df.to_sql('Membership_Types', con=engine, if_exists='append', index=False)
+
+    # 2️⃣ Trainers (parent table)
+    trainers_df.to_sql('Trainers', con=engine, if_exists='append', index=False)
+
+    # 3️⃣ Members (child table)
+    members_df.to_sql('Members', con=engine, if_exists='append', index=False)
+
+    # 4️⃣ Payments (child table)
+    payments_df.to_sql('Payments', con=engine, if_exists='append', index=False)
+
+    finish_load(conn)
+
+
+def run_streaming(paths, conn, engine, chunksize=CHUNK_SIZE):
+    """Chunked mode: clean and load each file a chunk at a time (bounded memory)."""
+    create_tables(conn)
+
+    # Keys loaded so far; each set is the FK integrity set for the next stage
+    membership_keys, trainer_keys, member_keys, payment_keys = set(), set(), set(), set()
+
+    stages = []
+    stats = StageStats('Membership_Types')
+    stages.append(load_chunks(
+        stream_clean(paths['membership_types'], clean_membership_types_df, 'membership_type',
+                     membership_keys, stats, chunksize),
+        'Membership_Types', engine, stats))
+
+    stats = StageStats('Trainers')
+    stages.append(load_chunks(
+        stream_clean(paths['trainers'], clean_trainers_df, 'trainer_id', trainer_keys, stats, chunksize),
+        'Trainers', engine, stats))
+
+    stats = StageStats('Members')
+    stages.append(load_chunks(
+        stream_clean(paths['members'], clean_members_df, 'member_id', member_keys, stats, chunksize,
+                     valid_trainers=trainer_keys, valid_memberships=membership_keys),
+        'Members', engine, stats))
+
+    stats = StageStats('Payments')
+    stages.append(load_chunks(
+        stream_clean(paths['payments'], clean_payments_df, 'payment_id', payment_keys, stats, chunksize,
+                     valid_members=member_keys),
+        'Payments', engine, stats))
+
+    finish_load(conn)
+
+    for stage in stages:
+        print(stage.report())
+
+
+def clean_stage(stage, path):
+    """Process-pool worker: clean one file, leaving FK checks to the parent."""
+    cleaners = {
+        'membership_types': clean_membership_types,
+        'trainers': clean_trainers,
+        'members': clean_members,
+        'payments': clean_payments,
+    }
+    start = time.perf_counter()
+    df = cleaners[stage](path)
+    return df, time.perf_counter() - start
+
+
+def load_table(df, table, engine, batch_size=INSERT_BATCH):
+    start = time.perf_counter()
+    df.to_sql(table, con=engine, if_exists='append', index=False, method='multi', chunksize=batch_size)
+    return time.perf_counter() - start
+
+
+def run_parallel(paths, conn, engine, workers=None):
+    """
+    Clean all four files concurrently in worker processes, apply each FK
+    filter as soon as its parent keys are known, and load tables in threads
+    as soon as their FK parents are in the database:
+
+        Membership_Types ─┐
+                          ├─> Members ──> Payments
+        Trainers ─────────┘
+    """
+    create_tables(conn)
+    started = time.perf_counter()
+    clean_time, load_time, rows = {}, {}, {}
+
+    with ProcessPoolExecutor(max_workers=workers) as cleaners, ThreadPoolExecutor(max_workers=2) as loaders:
+        cleaning = {stage: cleaners.submit(clean_stage, stage, path) for stage, path in paths.items()}
+
+        # Parents: independent, cleaned and loaded side by side
+        membership_df, clean_time['Membership_Types'] = cleaning['membership_types'].result()
+        load_types = loaders.submit(load_table, membership_df, 'Membership_Types', engine)
+        trainers_df, clean_time['Trainers'] = cleaning['trainers'].result()
+        load_trainers = loaders.submit(load_table, trainers_df, 'Trainers', engine)
+
+        # Members: FK filter needs only the parents' cleaned keys
+        members_df, clean_time['Members'] = cleaning['members'].result()
+        members_df = member_integrity(
+            members_df, set(trainers_df['trainer_id']), set(membership_df['membership_type'])
+        )
+        load_time['Membership_Types'] = load_types.result()
+        load_time['Trainers'] = load_trainers.result()
+        load_members = loaders.submit(load_table, members_df, 'Members', engine)
+
+        # Payments: filter while Members is loading, insert once it is done
+        payments_df, clean_time['Payments'] = cleaning['payments'].result()
+        payments_df = payment_integrity(payments_df, set(members_df['member_id']))
+        load_time['Members'] = load_members.result()
+        load_time['Payments'] = load_table(payments_df, 'Payments', engine)
+
+    for table, df in (('Membership_Types', membership_df), ('Trainers', trainers_df),
+                      ('Members', members_df), ('Payments', payments_df)):
+        rows[table] = len(df)
+
+    finish_load(conn)
+
+    for table in rows:
+        print(f"{table:<18} clean {clean_time[table]:8.2f}s  load {load_time[table]:8.2f}s  "
+              f"rows {rows[table]:>10,}")
+    print(f"{'Total (wall)':<18} {time.perf_counter() - started:8.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean the gym CSV exports and load them into MySQL")
+    parser.add_argument('--trainers', default=DEFAULT_PATHS['trainers'], help="trainers CSV")
+    parser.add_argument('--membership-types', default=DEFAULT_PATHS['membership_types'],
+                        help="membership types CSV")
+    parser.add_argument('--members', default=DEFAULT_PATHS['members'], help="members CSV")
+    parser.add_argument('--payments', default=DEFAULT_PATHS['payments'], help="payments CSV")
+
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--stream', action='store_true',
+                      help="read, clean and load each CSV in chunks to keep memory bounded")
+    mode.add_argument('--parallel', action='store_true',
+                      help="clean files concurrently and load tables in FK order, in parallel where possible")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help=f"rows per CSV chunk in --stream mode (default {CHUNK_SIZE})")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="cleaning processes in --parallel mode (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    paths = {
+        'trainers': args.trainers,
+        'membership_types': args.membership_types,
+        'members': args.members,
+        'payments': args.payments,
+    }
+
+    conn, engine = connect()
+    try:
+        if args.stream:
+            run_streaming(paths, conn, engine, args.chunk_size)
+        elif args.parallel:
+            run_parallel(paths, conn, engine, args.workers)
+        else:
+            run_batch(paths, conn, engine)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
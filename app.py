@@ -1,175 +1,476 @@
 import streamlit as st
 import pandas as pd
-from db import insert_member, insert_payment, fetch_members, fetch_membership_types, fetch_trainers, get_connection, delete_member, renew_membership
+import hmac
+import os
+import tempfile
+from datetime import date, timedelta
+import metrics
+import async_db
+import snapshot
+from checkins import check_in, fetch_member_checkins
+from db import pool_stats, replica_status, register_member, DuplicateMemberError, search_roster, expiry_bucket_counts, fetch_revenue, bulk_register_members, delete_member, renew_membership, export_members, export_payments, NO_PAYMENT
 
 st.set_page_config(page_title="Gym Management System", layout="wide")
 st.title("🏋️ Gym Management System")
 
-menu = ["Register New Member", "View Members", "Delete Member", "Renew Membership"]
+menu = ["Register New Member", "Bulk Import Members", "View Members", "Expiring Memberships", "Revenue", "Delete Member", "Renew Membership", "Check-In", "Diagnostics"]
 choice = st.sidebar.selectbox("Menu", menu)
 
+# Render time of this run, recorded when the run ends
+page_timer = metrics.page_timer("admin", choice)
+metrics.start_metrics_server()
+
 
 # ------------------- Fetch Membership Plans and Trainers -------------------
-membership_df = fetch_membership_types()
+# Served from db.py's process-wide reference cache: no queries on a rerun,
+# and on a cache miss both tables load concurrently
+membership_df, trainers_df = async_db.load_reference_data()
 membership_plans = membership_df['membership_type'].tolist()
 
-trainers_df = fetch_trainers()
-trainers_display = [f"{row['name']} ({row['specialization']})" for _, row in trainers_df.iterrows()]
+trainers_display = [f"{name} ({spec})" for name, spec in zip(trainers_df['name'], trainers_df['specialization'])]
 
 
-# ----------------- Register Member -----------------
-if choice == "Register New Member":
-    st.subheader("📝 Register New Member")
+def roster_label(entry):
+    return f"{entry.member_id} - {entry.name}"
 
-    selected_plan_name = st.selectbox("Select Membership Plan", membership_plans)
-    selected_plan = membership_df[membership_df['membership_type'] == selected_plan_name].iloc[0]
 
-    st.write(f"💰 Price: ₹{selected_plan['price']}")
-    st.write(f"⏳ Duration: {selected_plan['validity_months']} months")
+# st.stop() and st.rerun() end a run by raising: record its render time either way
+try:
+    # ----------------- Register Member -----------------
+    if choice == "Register New Member":
+        st.subheader("📝 Register New Member")
 
-    with st.form("register_form"):
-        name = st.text_input("Full Name")
-        age = st.number_input("Age", min_value=10, max_value=100)
-        gender = st.selectbox("Gender", ["M", "F", "O"])
-        contact = st.text_input("Contact Number")
+        selected_plan_name = st.selectbox("Select Membership Plan", membership_plans)
+        selected_plan = membership_df[membership_df['membership_type'] == selected_plan_name].iloc[0]
 
-        selected_trainer_display = st.selectbox("Trainer", trainers_display)
-        trainer_id = trainers_df.iloc[trainers_display.index(selected_trainer_display)]['trainer_id']
+        st.write(f"💰 Price: ₹{selected_plan['price']}")
+        st.write(f"⏳ Duration: {selected_plan['validity_months']} months")
+
+        with st.form("register_form"):
+            name = st.text_input("Full Name")
+            age = st.number_input("Age", min_value=10, max_value=100)
+            gender = st.selectbox("Gender", ["M", "F", "O"])
+            contact = st.text_input("Contact Number")
+
+            selected_trainer_display = st.selectbox("Trainer", trainers_display)
+            trainer_id = trainers_df.iloc[trainers_display.index(selected_trainer_display)]['trainer_id']
+
+            payment_mode = st.selectbox("Payment Mode", ["Cash", "Card", "UPI"])
+            payment_status = st.selectbox("Payment Status", ["Paid", "Unpaid"])
+
+            submit = st.form_submit_button("Register")
+
+        if submit:
+            if name and contact:
+                try:
+                    register_member(
+                        name=name,
+                        age=age,
+                        gender=gender,
+                        contact=contact,
+                        membership_type=selected_plan_name,
+                        trainer_id=trainer_id,
+                        mode=payment_mode,
+                        status=payment_status
+                    )
+                    st.success(f"✅ {name} registered successfully!")
+                except DuplicateMemberError:
+                    st.warning("This member is already registered!")
+            else:
+                st.error("Please enter both Name and Contact Number.")
+
+
+    # ----------------- Bulk Import Members -----------------
+    elif choice == "Bulk Import Members":
+        st.subheader("📦 Bulk Import Members")
+        st.write(
+            "Upload a CSV with columns `name, age, gender, contact, membership_type, trainer_id` "
+            "and optionally `amount` (defaults to the plan price), `mode` and `status`."
+        )
+
+        uploaded = st.file_uploader("Members CSV", type="csv")
+
+        if uploaded is not None:
+            upload_df = pd.read_csv(uploaded)
+            st.write(f"{len(upload_df)} rows found")
+            st.dataframe(upload_df.head(20))
+
+            if st.button("Import Members"):
+                with st.spinner("Registering members..."):
+                    registered_df, failures_df = bulk_register_members(upload_df)
+
+                st.success(f"✅ {len(registered_df)} members registered")
+                if not failures_df.empty:
+                    st.warning(f"⚠️ {len(failures_df)} rows were skipped")
+                    st.dataframe(failures_df)
+                    st.download_button(
+                        "Download skipped rows",
+                        failures_df.to_csv(index=False),
+                        file_name="import_failures.csv",
+                        mime="text/csv"
+                    )
+
+
+    # ----------------- View Members -----------------
+    elif choice == "View Members":
+        st.subheader("👥 View Members")
+
+        sort_options = {
+            "Member ID": ("member_id", False),
+            "Newest First": ("member_id", True),
+            "Name (A-Z)": ("name", False),
+            "Expiring Soonest": ("end_date", False),
+            "Expiring Latest": ("end_date", True),
+        }
+
+        col1, col2, col3 = st.columns(3)
+        selected_filter = col1.selectbox("Filter by Membership Type", ["All"] + membership_plans)
+        selected_trainer = col2.selectbox("Filter by Trainer", ["All"] + trainers_display)
+        payment_filter = col3.selectbox("Filter by Payment Status", ["All", "Paid", "Unpaid", NO_PAYMENT])
+
+        col4, col5, col6 = st.columns(3)
+        name_prefix = col4.text_input("Name starts with").strip()
+        expiring_days = col5.number_input("Expiring within (days, 0 = any)", min_value=0, value=0)
+        sort_label = col6.selectbox("Sort by", list(sort_options))
+        page_size = st.selectbox("Rows per page", [25, 50, 100], index=1)
+
+        trainer_id = None
+        if selected_trainer != "All":
+            trainer_id = int(trainers_df.iloc[trainers_display.index(selected_trainer)]['trainer_id'])
+
+        filters = {
+            "membership_type": selected_filter,
+            "trainer_id": trainer_id,
+            "payment_status": payment_filter,
+            "expires_within_days": int(expiring_days) or None,
+            "name_prefix": name_prefix or None,
+        }
+        sort_by, descending = sort_options[sort_label]
+
+        # Start again from page 1 whenever the filters, sort or page size change
+        page_key = (tuple(filters.items()), sort_label, page_size)
+        if st.session_state.get("members_page_key") != page_key:
+            st.session_state.members_page_key = page_key
+            st.session_state.members_cursors = [None]
+        cursors = st.session_state.members_cursors
+
+        # The total count and the page itself are fetched concurrently
+        members_df, total_members, next_cursor = async_db.run(async_db.fetch_members_page(
+            page_size=page_size, sort_by=sort_by, descending=descending, after=cursors[-1], **filters
+        ))
+
+        if not members_df.empty:
+            st.caption(f"Page {len(cursors)} · showing {len(members_df)} of {total_members} members")
+            st.dataframe(members_df)
+
+            prev_col, next_col = st.columns(2)
+            if prev_col.button("⬅️ Previous", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+            if next_col.button("Next ➡️", disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun()
+        else:
+            st.info("No members found for this category.")
+
+        # Exports stream from the database into a temp file only when downloaded
+        with st.expander("⬇️ Export"):
+            col1, col2 = st.columns(2)
+            export_what = col1.radio("Data", ["Members (current filters)", "All payments"], horizontal=True)
+            export_format = col2.radio("Format", ["csv", "parquet"], horizontal=True)
+
+            def build_export():
+                f = tempfile.TemporaryFile()
+                if export_what == "All payments":
+                    export_payments(f, export_format)
+                else:
+                    export_members(f, export_format, **filters)
+                f.seek(0)
+                return f
+
+            st.download_button(
+                f"Download {export_format.upper()}",
+                build_export,
+                file_name=f"{'payments' if export_what == 'All payments' else 'members'}_{date.today()}.{export_format}",
+                mime="text/csv" if export_format == "csv" else "application/vnd.apache.parquet",
+                on_click="ignore",
+            )
 
-        payment_mode = st.selectbox("Payment Mode", ["Cash", "Card", "UPI"])
-        payment_status = st.selectbox("Payment Status", ["Paid", "Unpaid"])
 
-        submit = st.form_submit_button("Register")
+    # ----------------- Expiring Memberships -----------------
+    elif choice == "Expiring Memberships":
+        st.subheader("⏳ Expiring Soon / Expired")
 
-    if submit:
-        if name and contact:
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT member_id FROM Members WHERE name=%s AND contact=%s",
-                (name, contact)
-            )
-            existing = cursor.fetchone()
-            conn.close()
+        col1, col2, col3 = st.columns(3)
+        view = col1.radio("Show", ["Expiring Soon", "Expired"], horizontal=True)
+        window_days = col2.number_input("Window (days)", min_value=1, max_value=365, value=30)
+        bucket = col3.radio("Group by", ["Day", "Week"], horizontal=True)
 
-            if existing:
-                st.warning("This member is already registered!")
-            else:
-                member_id = insert_member(
-                    name=name,
-                    age=age,
-                    gender=gender,
-                    contact=contact,
-                    membership_type=selected_plan_name,
-                    trainer_id=trainer_id
-                )
+        col4, col5 = st.columns(2)
+        selected_filter = col4.selectbox("Filter by Membership Type", ["All"] + membership_plans)
+        selected_trainer = col5.selectbox("Filter by Trainer", ["All"] + trainers_display)
 
-                insert_payment(
-                    member_id=member_id,
-                    amount=selected_plan['price'],
-                    mode=payment_mode,
-                    status=payment_status
-                )
-                st.success(f"✅ {name} registered successfully!")
+        trainer_id = None
+        if selected_trainer != "All":
+            trainer_id = int(trainers_df.iloc[trainers_display.index(selected_trainer)]['trainer_id'])
+
+        expired = view == "Expired"
+        buckets_df = expiry_bucket_counts(
+            days=int(window_days), bucket=bucket.lower(), expired=expired,
+            membership_type=selected_filter, trainer_id=trainer_id
+        )
+        buckets_df["Period"] = [
+            str(start) if start == end else f"{start} → {end}"
+            for start, end in zip(buckets_df["From"], buckets_df["To"])
+        ]
+
+        total_members = int(buckets_df["Members"].sum())
+        st.metric("Expired" if expired else "Expiring", total_members)
+        st.bar_chart(buckets_df.set_index("Period")["Members"])
+
+        if total_members:
+            # Drill into one bucket; the list pages through it by end_date
+            periods = [p for p, n in zip(buckets_df["Period"], buckets_df["Members"]) if n]
+            selected_period = st.selectbox("Show members for", periods)
+            selected_bucket = buckets_df[buckets_df["Period"] == selected_period].iloc[0]
+
+            filters = {
+                "membership_type": selected_filter,
+                "trainer_id": trainer_id,
+                "end_between": (selected_bucket["From"], selected_bucket["To"]),
+            }
+            page_key = (tuple(filters.items()), expired)
+            if st.session_state.get("expiring_page_key") != page_key:
+                st.session_state.expiring_page_key = page_key
+                st.session_state.expiring_cursors = [None]
+            cursors = st.session_state.expiring_cursors
+
+            members_df, bucket_members, next_cursor = async_db.run(async_db.fetch_members_page(
+                page_size=50, sort_by="end_date", descending=expired, after=cursors[-1], **filters
+            ))
+            st.caption(f"Page {len(cursors)} · showing {len(members_df)} of {bucket_members} members")
+            st.dataframe(members_df)
+
+            prev_col, next_col = st.columns(2)
+            if prev_col.button("⬅️ Previous", key="expiring_prev", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+            if next_col.button("Next ➡️", key="expiring_next", disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun()
         else:
-            st.error("Please enter both Name and Contact Number.")
+            st.info("No memberships in this window.")
 
 
-# ----------------- View Members -----------------
-elif choice == "View Members":
-    st.subheader("👥 View Members")
+    # ----------------- Revenue -----------------
+    elif choice == "Revenue":
+        st.subheader("📈 Revenue")
 
-    membership_list = ["All"] + membership_plans
+        breakdowns = {"Membership Plan": "membership_type", "Payment Mode": "mode", "Payment Status": "status"}
 
-    selected_filter = st.selectbox("Filter by Membership Type", membership_list)
+        col1, col2, col3 = st.columns(3)
+        grain = col1.radio("Period", ["Month", "Day"], horizontal=True).lower()
+        breakdown = col2.selectbox("Break down by", list(breakdowns))
+        status_filter = col3.selectbox("Payment Status", ["All", "Paid", "Unpaid"])
 
-    # FIXED: No None value
-    members_df = fetch_members(selected_filter)
+        today = date.today()
+        default_start = today.replace(day=1) - timedelta(days=365) if grain == "month" else today - timedelta(days=30)
+        col4, col5 = st.columns(2)
+        start = col4.date_input("From", default_start)
+        end = col5.date_input("To", today)
+        if grain == "month":
+            start = start.replace(day=1)
 
-    if not members_df.empty:
-        st.dataframe(members_df)
-    else:
-        st.info("No members found for this category.")
+        # Reads only the rollup tables, never Payments
+        revenue_df = fetch_revenue(grain, start=start, end=end, by=breakdowns[breakdown], status=status_filter)
 
+        if not revenue_df.empty:
+            by = breakdowns[breakdown]
+            revenue_df[by] = revenue_df[by].replace("", "Unknown")
 
-# ----------------- Delete Member -----------------
-elif choice == "Delete Member":
-    st.subheader("🗑️ Delete a Member")
+            col1, col2 = st.columns(2)
+            col1.metric("Revenue", f"₹{revenue_df['amount'].sum():,.2f}")
+            col2.metric("Payments", f"{revenue_df['payments'].sum():,}")
 
-    search_input = st.text_input("Enter Member ID or Name")
+            chart_df = revenue_df.pivot_table(index="period", columns=by, values="amount", aggfunc="sum", fill_value=0)
+            st.bar_chart(chart_df)
 
-    if search_input:
-        members_df = fetch_members()
-        filtered = members_df[
-            (members_df['member_id'].astype(str) == search_input) |
-            (members_df['Member_Name'].str.lower() == search_input.lower())
-        ]
+            totals = revenue_df.groupby(by)[["payments", "amount"]].sum().sort_values("amount", ascending=False)
+            st.dataframe(totals.rename(columns={"payments": "Payments", "amount": "Revenue (₹)"}))
+        else:
+            st.info("No payments in this period.")
+
+
+    # ----------------- Delete Member -----------------
+    elif choice == "Delete Member":
+        st.subheader("🗑️ Delete a Member")
 
-        if not filtered.empty:
-            member_info = filtered.iloc[0]
-            st.write("**Member Details:**")
-            st.write(f"**ID:** {member_info['member_id']}")
-            st.write(f"**Name:** {member_info['Member_Name']}")
-
-            if "confirm_delete" not in st.session_state:
-                st.session_state.confirm_delete = False
-
-            if not st.session_state.confirm_delete and st.button("Delete Member"):
-                st.session_state.confirm_delete = True
-
-            if st.session_state.confirm_delete:
-                st.warning("⚠️ Are you sure you want to delete this member?")
-                col1, col2 = st.columns(2)
-                with col1:
-                    if st.button("Yes, Delete"):
-                        success = delete_member(int(member_info['member_id']))
-                        if success:
-                            st.success(f"✅ Member {member_info['Member_Name']} deleted successfully!")
-                        else:
-                            st.error("❌ Error: Could not delete member.")
-                        st.session_state.confirm_delete = False
-                with col2:
-                    if st.button("Cancel"):
-                        st.session_state.confirm_delete = False
+        search_input = st.text_input("Enter Member ID or Name")
 
+        if search_input:
+            matches = search_roster(search_input)
+
+            if matches:
+                member_info = st.selectbox("Select Member", matches, format_func=roster_label)
+                st.write("**Member Details:**")
+                st.write(f"**ID:** {member_info.member_id}")
+                st.write(f"**Name:** {member_info.name}")
+
+                if "confirm_delete" not in st.session_state:
+                    st.session_state.confirm_delete = False
+
+                if not st.session_state.confirm_delete and st.button("Delete Member"):
+                    st.session_state.confirm_delete = True
+
+                if st.session_state.confirm_delete:
+                    st.warning("⚠️ Are you sure you want to delete this member?")
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        if st.button("Yes, Delete"):
+                            success = delete_member(member_info.member_id)
+                            if success:
+                                st.success(f"✅ Member {member_info.name} deleted successfully!")
+                            else:
+                                st.error("❌ Error: Could not delete member.")
+                            st.session_state.confirm_delete = False
+                    with col2:
+                        if st.button("Cancel"):
+                            st.session_state.confirm_delete = False
+
+            else:
+                st.info("No member found with this ID or Name.")
+
+
+    # ----------------- Renew Membership -----------------
+    elif choice == "Renew Membership":
+        st.header("♻️ Renew Membership")
+
+        search_input = st.text_input("Search Member by ID or Name")
+        matches = search_roster(search_input) if search_input else []
+
+        if not search_input:
+            st.info("Start typing a member's name or ID.")
+        elif not matches:
+            st.warning("No member found with this ID or Name.")
         else:
-            st.info("No member found with this ID or Name.")
+            selected_member = st.selectbox("Select Member", matches, format_func=roster_label)
+            member_id = selected_member.member_id
+            st.caption(f"Current plan: {selected_member.membership_type} · ends {selected_member.end_date}")
 
+            membership_plans = membership_df['membership_type'].tolist()
+            selected_plan_name = st.selectbox("Select Membership Plan", membership_plans)
 
-# ----------------- Renew Membership -----------------
-elif choice == "Renew Membership":
-    st.header("♻️ Renew Membership")
+            selected_plan = membership_df[membership_df['membership_type'] == selected_plan_name].iloc[0]
+            price = selected_plan['price']
+            duration_months = selected_plan['validity_months']
 
-    members = fetch_members()
+            st.write(f"💰 Price: ₹{price}")
+            st.write(f"⏳ Duration: {duration_months} months")
 
-    if members.empty:
-        st.warning("No members found. Please register a member first.")
-    else:
-        member_names = [f"{row['member_id']} - {row['Member_Name']}" for _, row in members.iterrows()]
-        selected_member = st.selectbox("Select Member", member_names)
-        member_id = int(selected_member.split(" - ")[0])
+            payment_status = st.selectbox("Payment Status", ["Paid", "Unpaid"])
+            payment_mode = st.selectbox("Payment Mode", ["Cash", "UPI", "Card"]) if payment_status == "Paid" else None
 
-        membership_plans = membership_df['membership_type'].tolist()
-        selected_plan_name = st.selectbox("Select Membership Plan", membership_plans)
+            if st.button("Renew Membership"):
+                payment_id, new_start, new_end, last_amount, last_payment_date = renew_membership(
+                    member_id, selected_plan_name, price, payment_mode, payment_status, duration_months
+                )
 
-        selected_plan = membership_df[membership_df['membership_type'] == selected_plan_name].iloc[0]
-        price = selected_plan['price']
-        duration_months = selected_plan['validity_months']
+                st.success("Membership renewed successfully! ✅")
+                st.write(f"Payment ID: {payment_id}")
+                st.write(f"New Start Date: {new_start}")
+                st.write(f"New End Date: {new_end}")
+                st.write(f"Last Paid Amount: ₹{last_amount}")
+                st.write(f"Last Payment Date: {last_payment_date}")
+
+
+    # ----------------- Front-Desk Check-In -----------------
+    elif choice == "Check-In":
+        st.header("🚪 Front-Desk Check-In")
+
+        with st.form("desk_checkin_form", clear_on_submit=True):
+            member_id_input = st.text_input("Scan card or enter Member ID")
+            checkin_button = st.form_submit_button("Check In")
+
+        if checkin_button:
+            if member_id_input.strip().isdigit():
+                result = check_in(int(member_id_input), gate="Front Desk")
+                if result.accepted:
+                    st.success(f"✅ Member {result.member_id} checked in at {result.checked_in_at:%H:%M}.")
+                else:
+                    st.error(f"⛔ Member {result.member_id}: {result.reason}.")
+
+                visits_df = fetch_member_checkins(result.member_id, limit=5)
+                st.dataframe(visits_df[['checked_in_at', 'gate', 'result']].rename(columns={
+                    'checked_in_at': 'Time', 'gate': 'Gate', 'result': 'Result'
+                }))
+            else:
+                st.error("Please enter a valid numeric Member ID.")
+
+
+    # ----------------- Diagnostics (admin only) -----------------
+    elif choice == "Diagnostics":
+        st.header("🩺 Diagnostics")
+
+        admin_password = os.environ.get("GYM_ADMIN_PASSWORD")
+        if not admin_password:
+            st.info("Diagnostics are disabled: set GYM_ADMIN_PASSWORD to enable this page.")
+            st.stop()
+        entered = st.text_input("Admin password", type="password")
+        if not hmac.compare_digest(entered.encode(), admin_password.encode()):
+            st.info("Enter the admin password to view diagnostics.")
+            st.stop()
+
+        stats = pool_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Connections in use", f"{stats['in_use']} / {stats['size']}")
+        col2.metric("Checkouts", stats["checkouts"])
+        col3.metric("Avg wait", f"{stats['wait_time_avg'] * 1000:.1f} ms")
+        col4.metric("Checkout timeouts", stats["timeouts"])
+
+        replica = replica_status()
+        if replica is not None:
+            lag = "—" if replica["lag_seconds"] is None else f"{replica['lag_seconds']:.0f}s"
+            col1, col2, col3 = st.columns(3)
+            col1.metric(f"Replica {replica['host']}", "Serving reads" if replica["healthy"] else "Bypassed")
+            col2.metric("Replica lag", lag)
+            col3.metric("Replica fallbacks", replica["fallbacks"])
+            if not replica["healthy"]:
+                st.warning(f"Reads go to the primary: replica {replica['reason']}")
+
+        snap = snapshot.status()
+        col1, col2, col3 = st.columns(3)
+        if snap["exists"]:
+            col1.metric("Analytics snapshot age", f"{snap['age_seconds'] / 60:.0f} min")
+            col2.metric("Last refresh", f"{snap['refresh_seconds']:.1f} s", snap["mode"], delta_color="off")
+        else:
+            col1.metric("Analytics snapshot", "Not built")
+        if col3.button("Refresh snapshot"):
+            snapshot.refresh()
+            st.rerun()
 
-        st.write(f"💰 Price: ₹{price}")
-        st.write(f"⏳ Duration: {duration_months} months")
+        st.subheader("db.py calls")
+        st.dataframe(metrics.REGISTRY.histogram_frame("gym_db_call_seconds"))
 
-        payment_status = st.selectbox("Payment Status", ["Paid", "Unpaid"])
-        payment_mode = st.selectbox("Payment Mode", ["Cash", "UPI", "Card"]) if payment_status == "Paid" else None
+        st.subheader("SQL statements")
+        st.dataframe(metrics.REGISTRY.histogram_frame("gym_db_statement_seconds"))
 
-        if st.button("Renew Membership"):
-            payment_id, new_start, new_end, last_amount, last_payment_date = renew_membership(
-                member_id, selected_plan_name, price, payment_mode, payment_status, duration_months
-            )
+        st.subheader("Page renders")
+        st.dataframe(metrics.REGISTRY.histogram_frame("gym_page_render_seconds"))
 
-            st.success("Membership renewed successfully! ✅")
-            st.write(f"Payment ID: {payment_id}")
-            st.write(f"New Start Date: {new_start}")
-            st.write(f"New End Date: {new_end}")
-            st.write(f"Last Paid Amount: ₹{last_amount}")
-            st.write(f"Last Payment Date: {last_payment_date}")
+        st.subheader(f"Slow queries (≥ {metrics.SLOW_QUERY_SECONDS * 1000:.0f} ms)")
+        slow_df = pd.DataFrame(list(metrics.REGISTRY.slow_queries))
+        if not slow_df.empty:
+            st.dataframe(slow_df.iloc[::-1])
+        else:
+            st.info("No slow queries recorded.")
+
+        metrics_text = metrics.render_text()
+        with st.expander("Metrics (text format)"):
+            st.code(metrics_text, language="text")
+        col1, col2 = st.columns(2)
+        col1.download_button("Download metrics", metrics_text, file_name="gym_metrics.txt", mime="text/plain")
+        if col2.button("Reset counters"):
+            metrics.REGISTRY.reset()
+            st.rerun()
+finally:
+    page_timer.stop()
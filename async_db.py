@@ -0,0 +1,209 @@
+"""
+Asyncio variant of the db.py read API, on aiomysql with its own pool.
+
+Independent queries can run concurrently on separate pooled connections,
+so a page pays for the slowest round trip instead of the sum of them:
+
+    details, payments = await asyncio.gather(
+        fetch_member_details(member_id), fetch_member_payments(member_id)
+    )
+
+Every coroutine returns the same DataFrames as its db.py namesake (the SQL
+is shared) and is routed to the read replica under the same rules
+(db.use_replica). On the embedded SQLite backend, or when aiomysql is not
+installed, the queries run on db.py's own pool in worker threads instead.
+Synchronous code such as the Streamlit pages uses run(), which executes
+coroutines on one background event loop owned by this module:
+
+    membership_df, trainers_df = load_reference_data()
+    page, total, cursor = run(fetch_members_page(page_size=50))
+"""
+import asyncio
+import functools
+import os
+import threading
+import time
+import weakref
+
+import pandas as pd
+
+import db
+import metrics
+
+ASYNC_POOL_SIZE = int(os.environ.get("GYM_DB_ASYNC_POOL_SIZE", str(db.POOL_SIZE)))
+
+# aiomysql pools belong to the event loop that created them. Each loop maps to
+# the tasks creating its pools, so concurrent first queries share one pool.
+_pools = weakref.WeakKeyDictionary()
+
+
+@functools.lru_cache(maxsize=None)
+def _aiomysql():
+    """aiomysql, or None when it is not installed (queries then run in threads)."""
+    try:
+        import aiomysql
+    except ImportError:
+        return None
+    return aiomysql
+
+
+async def _create_pool(config):
+    import aiomysql
+
+    config = dict(config)
+    config["db"] = config.pop("database")
+    if "connection_timeout" in config:
+        config["connect_timeout"] = config.pop("connection_timeout")
+    return await aiomysql.create_pool(minsize=0, maxsize=ASYNC_POOL_SIZE, autocommit=True, **config)
+
+
+async def get_pool(replica=False):
+    loop = asyncio.get_running_loop()
+    pools = _pools.setdefault(loop, {})
+    creating = pools.get(replica)
+    if creating is None or (creating.done() and (creating.cancelled() or creating.exception())):
+        # First use on this loop, or an earlier attempt to connect failed
+        config = db.REPLICA_CONFIG if replica else db.DB_CONFIG
+        creating = pools[replica] = loop.create_task(_create_pool(config))
+    return await creating
+
+
+async def close_pool():
+    for creating in _pools.pop(asyncio.get_running_loop(), {}).values():
+        pool = await creating
+        pool.close()
+        await pool.wait_closed()
+
+
+async def _read(pool, query, params):
+    start = time.perf_counter()
+    async with pool.acquire() as conn:
+        acquired = time.perf_counter()
+        metrics.REGISTRY.observe("gym_db_connection_acquire_seconds", acquired - start)
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, params)
+            rows = await cursor.fetchall()
+            columns = [d[0] for d in cursor.description]
+    metrics.record_statement(query, time.perf_counter() - acquired, len(rows))
+    # Same Decimal -> float coercion pd.read_sql applies in db.py
+    return pd.DataFrame.from_records(list(rows), columns=columns, coerce_float=True)
+
+
+def _read_threaded(query, params, member_id, replica):
+    conn = db.get_read_connection(member_id) if replica else db.get_connection()
+    try:
+        return pd.read_sql(query, conn, params=params)
+    finally:
+        conn.close()
+
+
+async def read_frame(query, params=None, member_id=None, replica=True):
+    """
+    Run one SELECT on a pooled connection and return it as a DataFrame. It
+    goes to the replica when `replica` is set and db.use_replica() allows it.
+    """
+    if db.BACKEND.embedded or _aiomysql() is None:
+        # Run on db.py's pool (and its replica routing) in a worker thread
+        return await asyncio.to_thread(_read_threaded, query, params, member_id, replica)
+    import pymysql
+
+    # The health check may block on the network, so it runs off the loop
+    if replica and db.REPLICA_CONFIG is not None and await asyncio.to_thread(db.use_replica, member_id):
+        try:
+            return await _read(await get_pool(replica=True), query, params)
+        except (pymysql.err.OperationalError, OSError) as e:
+            db.mark_replica_down(e)
+    return await _read(await get_pool(), query, params)
+
+
+# ------------------- Queries -------------------
+async def fetch_membership_types():
+    return await read_frame(db.REFERENCE_QUERIES["Membership_Types"], replica=False)
+
+
+async def fetch_trainers():
+    return await read_frame(db.REFERENCE_QUERIES["Trainers"], replica=False)
+
+
+async def fetch_member_details(member_id):
+    return await read_frame(db.MEMBER_DETAILS_QUERY, (member_id,), member_id)
+
+
+async def fetch_member_payments(member_id):
+    return await read_frame(db.MEMBER_PAYMENTS_QUERY, (member_id,), member_id)
+
+
+async def fetch_member_payment_summary(member_id):
+    df = await read_frame(db.MEMBER_SUMMARY_QUERY, (member_id, member_id), member_id)
+    return db._payment_summary(df.iloc[0])
+
+
+async def fetch_members_page(page_size=50, sort_by="member_id", descending=False, after=None,
+                             membership_type="All", **filters):
+    """db.fetch_members_page with the COUNT and the page query running side by side."""
+    count_query, params, query, page_params, df_column = db._members_page_queries(
+        page_size, sort_by, descending, after, membership_type, **filters
+    )
+    count_df, df = await asyncio.gather(read_frame(count_query, params), read_frame(query, page_params))
+    df, next_cursor = db._members_page_result(df, page_size, df_column)
+    return df, int(count_df.iloc[0, 0]), next_cursor
+
+
+async def fetch_member_overview(member_id):
+    """(details, all payments, payment summary) for one member, fetched concurrently."""
+    return tuple(await asyncio.gather(
+        fetch_member_details(member_id),
+        fetch_member_payments(member_id),
+        fetch_member_payment_summary(member_id),
+    ))
+
+
+# ------------------- Sync facade -------------------
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop():
+    global _loop, _loop_pid
+    with _loop_lock:
+        # A forked child does not inherit the loop's thread
+        if _loop is None or _loop_pid != os.getpid():
+            _loop, _loop_pid = asyncio.new_event_loop(), os.getpid()
+            threading.Thread(target=_loop.run_forever, name="async-db", daemon=True).start()
+    return _loop
+
+
+def run(*coros):
+    """
+    Run coroutines concurrently on the background loop and block for the
+    results: one coroutine returns its result, several return a tuple.
+    """
+    async def gather():
+        return await asyncio.gather(*coros)
+
+    results = asyncio.run_coroutine_threadsafe(gather(), _background_loop()).result()
+    return results[0] if len(coros) == 1 else tuple(results)
+
+
+def load_reference_data(refresh=False):
+    """
+    (membership types, trainers) through db.py's reference cache; whichever
+    tables are missing or stale are loaded concurrently.
+    """
+    stamp = db._reference_stamp()
+    frames = {} if refresh else {table: db._fresh_reference(table, stamp) for table in db.REFERENCE_QUERIES}
+    missing = [table for table in db.REFERENCE_QUERIES if frames.get(table) is None]
+
+    if missing:
+        loaded = run(*(read_frame(db.REFERENCE_QUERIES[table], replica=False) for table in missing))
+        if len(missing) == 1:
+            loaded = (loaded,)
+        for table, df in zip(missing, loaded):
+            db._store_reference(table, stamp, df)
+            frames[table] = df
+
+    return frames["Membership_Types"].copy(), frames["Trainers"].copy()
+
+
+metrics.instrument_module(globals(), skip=("get_pool", "close_pool", "read_frame", "run"), prefix="async.")
@@ -0,0 +1,325 @@
+"""
+Database backends for db.py.
+
+db.py writes its SQL in MySQL's dialect with %s placeholders. A backend owns
+everything that differs between database engines: opening, checking and
+resetting connections, explicit transactions, the statements whose shape
+differs (upserts, date arithmetic) and how a duplicate-key error looks.
+
+    mysql   a MySQL server configured by db.DB_CONFIG (the default)
+    sqlite  an embedded database file, for single-site installs where the
+            app and the data live on one front-desk machine
+
+db.py picks one from GYM_DB_BACKEND (and GYM_DB_PATH for sqlite). The
+SQLite file gets the same tables and indexes as Project1.py creates on
+MySQL the first time it is opened.
+"""
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+import numpy as np
+
+
+# ------------------- MySQL -------------------
+class MySQLBackend:
+    name = "mysql"
+    embedded = False
+
+    def __init__(self, config):
+        import mysql.connector
+        from mysql.connector import errorcode
+
+        self._connector = mysql.connector
+        self._dup_entry = errorcode.ER_DUP_ENTRY
+        self.config = config  # shared, not copied: db.DB_CONFIG edits apply to new connections
+        self.Error = mysql.connector.Error
+        self.IntegrityError = mysql.connector.IntegrityError
+
+    def describe(self):
+        return f"mysql://{self.config.get('host')}/{self.config.get('database')}"
+
+    def connect(self):
+        return self._connector.connect(**self.config)
+
+    def ping(self, raw):
+        raw.ping(reconnect=False)
+
+    def reset(self, raw):
+        """Leave no open transaction, unread result or session variable behind."""
+        if raw.unread_result:
+            raw.consume_results()
+        if raw.in_transaction:
+            raw.rollback()
+        raw.reset_session()
+
+    def begin(self, raw):
+        raw.start_transaction()
+
+    def prepare(self, operation, args):
+        return operation, args
+
+    def is_duplicate_key(self, error):
+        return isinstance(error, self.IntegrityError) and error.errno == self._dup_entry
+
+    def error_message(self, error):
+        return error.msg
+
+    # SQL fragments
+    def month_start(self, column):
+        return f"DATE_FORMAT({column}, '%%Y-%%m-01')"
+
+    def days_between(self, later, earlier):
+        return f"DATEDIFF({later}, {earlier})"
+
+    def floor_div(self, numerator, denominator):
+        return f"FLOOR(({numerator}) / {denominator})"
+
+    def upsert_add(self, table, keys, columns, source="s"):
+        """Clause ending INSERT ... SELECT ... {source}: add `columns` to an existing row."""
+        updates = ", ".join(f"{c} = {table}.{c} + {source}.{c}" for c in columns)
+        return f"ON DUPLICATE KEY UPDATE {updates}"
+
+    def upsert_newer(self, table, keys, columns, order):
+        """
+        Clause ending INSERT ... VALUES: replace an existing row only when the
+        new row sorts after it by the `order` columns.
+        """
+        newer = f"({', '.join(order)}) < ({', '.join(f'VALUES({c})' for c in order)})"
+        # MySQL assigns left to right and later IF()s see the updated values:
+        # set the order columns last, least significant first, so each one's
+        # test still compares the old prefix it depends on.
+        assigned = list(columns) + list(reversed(order))
+        updates = ", ".join(f"{c} = IF({newer}, VALUES({c}), {c})" for c in assigned)
+        return f"ON DUPLICATE KEY UPDATE {updates}"
+
+
+# ------------------- SQLite -------------------
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS Membership_Types (
+    membership_type VARCHAR(50) PRIMARY KEY,
+    price DECIMAL(10,2),
+    validity_months INT
+);
+
+CREATE TABLE IF NOT EXISTS Trainers (
+    trainer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL,
+    specialization VARCHAR(50)
+);
+
+-- NOCASE matches the case-insensitive name lookups MySQL's _ci collation gives
+CREATE TABLE IF NOT EXISTS Members (
+    member_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL COLLATE NOCASE,
+    age INT,
+    gender CHAR(1),
+    contact BIGINT,
+    membership_type VARCHAR(50) REFERENCES Membership_Types(membership_type),
+    start_date DATE,
+    end_date DATE,
+    trainer_id INT REFERENCES Trainers(trainer_id)
+);
+
+CREATE TABLE IF NOT EXISTS Payments (
+    payment_id VARCHAR(10) PRIMARY KEY,
+    member_id INT REFERENCES Members(member_id),
+    amount DECIMAL(10,2),
+    payment_date DATE,
+    mode VARCHAR(50),
+    status VARCHAR(20),
+    membership_type VARCHAR(50)
+);
+
+CREATE TABLE IF NOT EXISTS Latest_Payments (
+    member_id INT PRIMARY KEY REFERENCES Members(member_id),
+    payment_id VARCHAR(10) NOT NULL,
+    amount DECIMAL(10,2),
+    payment_date DATE,
+    mode VARCHAR(50),
+    status VARCHAR(20)
+);
+
+CREATE TABLE IF NOT EXISTS Revenue_Daily (
+    period DATE NOT NULL,
+    membership_type VARCHAR(50) NOT NULL,
+    mode VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    payments INT NOT NULL,
+    amount DECIMAL(14,2) NOT NULL,
+    PRIMARY KEY (period, membership_type, mode, status)
+);
+
+CREATE TABLE IF NOT EXISTS Revenue_Monthly (
+    period DATE NOT NULL,
+    membership_type VARCHAR(50) NOT NULL,
+    mode VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    payments INT NOT NULL,
+    amount DECIMAL(14,2) NOT NULL,
+    PRIMARY KEY (period, membership_type, mode, status)
+);
+
+CREATE TABLE IF NOT EXISTS Id_Sequences (
+    name VARCHAR(32) PRIMARY KEY,
+    next_value BIGINT NOT NULL
+);
+
+-- No foreign key: swipes of unknown or deleted members are kept as denied
+CREATE TABLE IF NOT EXISTS Check_Ins (
+    checkin_id CHAR(24) PRIMARY KEY,
+    member_id INT NOT NULL,
+    checked_in_at DATETIME NOT NULL,
+    gate VARCHAR(50),
+    result VARCHAR(30) NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_members_name_contact ON Members (name, contact);
+CREATE INDEX IF NOT EXISTS idx_members_end_date ON Members (end_date);
+CREATE INDEX IF NOT EXISTS idx_members_plan_end ON Members (membership_type, end_date);
+CREATE INDEX IF NOT EXISTS idx_members_trainer_end ON Members (trainer_id, end_date);
+CREATE INDEX IF NOT EXISTS idx_payments_member_date ON Payments (member_id, payment_date, payment_id);
+CREATE INDEX IF NOT EXISTS idx_payments_plan ON Payments (membership_type);
+CREATE INDEX IF NOT EXISTS idx_checkins_member_time ON Check_Ins (member_id, checked_in_at);
+CREATE INDEX IF NOT EXISTS idx_checkins_time ON Check_Ins (checked_in_at);
+"""
+
+# Dates are stored as ISO text and read back as date/datetime objects through
+# the DATE and DATETIME column types. numpy scalars from DataFrames bind like Python numbers.
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(Decimal, float)
+for _type in (np.int64, np.int32):
+    sqlite3.register_adapter(_type, int)
+sqlite3.register_adapter(np.float64, float)
+sqlite3.register_adapter(np.bool_, bool)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()[:10]))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+
+# MySQL spellings with a one-to-one SQLite equivalent
+_REWRITES = [
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.I), "INSERT OR IGNORE"),
+    (re.compile(r"<=>"), " IS "),
+    (re.compile(r"\s+FOR\s+UPDATE\b", re.I), ""),   # writers are serialized by BEGIN IMMEDIATE
+    (re.compile(r"\bLIKE\s+%s", re.I), r"LIKE %s ESCAPE '\\'"),   # MySQL escapes with \ by default
+]
+_PLACEHOLDER = re.compile(r"%([s%])")
+
+
+@lru_cache(maxsize=1024)
+def _sqlite_sql(operation, has_params):
+    for pattern, replacement in _REWRITES:
+        operation = pattern.sub(replacement, operation)
+    if has_params:
+        # Same rule as mysql.connector: %s binds a value and %% is a literal %
+        operation = _PLACEHOLDER.sub(lambda m: "?" if m.group(1) == "s" else "%", operation)
+    return operation
+
+
+class SQLiteBackend:
+    """
+    Embedded SQLite database in WAL mode: readers never block the writer,
+    and each connection keeps its compiled statements (sqlite3's statement
+    cache, keyed by the translated SQL) so repeated queries skip parsing.
+    """
+    name = "sqlite"
+    embedded = True
+    Error = sqlite3.Error
+    IntegrityError = sqlite3.IntegrityError
+
+    def __init__(self, path, busy_timeout=10.0, cached_statements=256):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def describe(self):
+        return f"sqlite:///{self.path}"
+
+    def connect(self):
+        raw = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,   # the pool hands connections to any thread, one at a time
+            uri=self.path.startswith("file:"),
+        )
+        raw.execute("PRAGMA journal_mode=WAL")
+        raw.execute("PRAGMA synchronous=NORMAL")
+        raw.execute("PRAGMA foreign_keys=ON")
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    self.create_schema(raw)
+                    self._schema_ready = True
+        return raw
+
+    def create_schema(self, raw):
+        raw.executescript(SQLITE_SCHEMA)
+        raw.commit()
+
+    def ping(self, raw):
+        raw.execute("SELECT 1").fetchone()
+
+    def reset(self, raw):
+        if raw.in_transaction:
+            raw.rollback()
+
+    def begin(self, raw):
+        # Take the write lock up front, as SELECT ... FOR UPDATE would on MySQL
+        if not raw.in_transaction:
+            raw.execute("BEGIN IMMEDIATE")
+
+    def prepare(self, operation, args):
+        if not args or args[0] is None:
+            return _sqlite_sql(operation, False), ()
+        return _sqlite_sql(operation, True), args
+
+    def is_duplicate_key(self, error):
+        if not isinstance(error, sqlite3.IntegrityError):
+            return False
+        name = getattr(error, "sqlite_errorname", None)
+        if name is not None:
+            return name in ("SQLITE_CONSTRAINT_UNIQUE", "SQLITE_CONSTRAINT_PRIMARYKEY")
+        return "UNIQUE constraint failed" in str(error)
+
+    def error_message(self, error):
+        return str(error)
+
+    # SQL fragments
+    def month_start(self, column):
+        return f"strftime('%%Y-%%m-01', {column})"
+
+    def days_between(self, later, earlier):
+        return f"CAST(julianday({later}) - julianday({earlier}) AS INTEGER)"
+
+    def floor_div(self, numerator, denominator):
+        # Integer operands divide as integers; the offsets are never negative
+        return f"(({numerator}) / {denominator})"
+
+    def upsert_add(self, table, keys, columns, source="s"):
+        # WHERE TRUE keeps SQLite from reading ON CONFLICT as a join's ON clause
+        updates = ", ".join(f"{c} = {table}.{c} + excluded.{c}" for c in columns)
+        return f"WHERE TRUE ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}"
+
+    def upsert_newer(self, table, keys, columns, order):
+        updates = ", ".join(f"{c} = excluded.{c}" for c in list(columns) + list(order))
+        newer = f"({', '.join(f'{table}.{c}' for c in order)}) < ({', '.join(f'excluded.{c}' for c in order)})"
+        return f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates} WHERE {newer}"
+
+
+BACKENDS = {"mysql": MySQLBackend, "sqlite": SQLiteBackend}
+
+
+def create_backend(name, mysql_config, sqlite_path):
+    """Backend named by GYM_DB_BACKEND."""
+    if name == "mysql":
+        return MySQLBackend(mysql_config)
+    if name == "sqlite":
+        return SQLiteBackend(sqlite_path)
+    raise ValueError(f"Unknown database backend '{name}' (expected one of {', '.join(BACKENDS)})")
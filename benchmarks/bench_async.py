@@ -0,0 +1,80 @@
+"""
+End-to-end latency of independent page queries: sequential db.py calls vs
+the same queries run concurrently through async_db.
+
+Each scenario is what one page needs:
+
+  * reference data   fetch_membership_types + fetch_trainers (cache bypassed)
+  * member overview  fetch_member_details + fetch_member_payments
+                     + fetch_member_payment_summary
+  * members page     fetch_members_page (COUNT + page query)
+
+Runs against the configured MySQL database and prints median / p95 latency
+per scenario for both variants.
+
+    python benchmarks/bench_async.py --repeat 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import async_db  # noqa: E402
+import db  # noqa: E402
+
+
+def sample_member_id():
+    page, _, _ = db.fetch_members_page(page_size=1, sort_by="member_id", descending=True)
+    if page.empty:
+        raise SystemExit("No members in the database; load some data first")
+    return int(page["member_id"].iloc[0])
+
+
+def scenarios(member_id):
+    return {
+        "reference data": (
+            lambda: (db.fetch_membership_types(refresh=True), db.fetch_trainers(refresh=True)),
+            lambda: async_db.load_reference_data(refresh=True),
+        ),
+        "member overview": (
+            lambda: (db.fetch_member_details(member_id), db.fetch_member_payments(member_id),
+                     db.fetch_member_payment_summary(member_id)),
+            lambda: async_db.run(async_db.fetch_member_overview(member_id)),
+        ),
+        "members page": (
+            lambda: db.fetch_members_page(page_size=50, sort_by="name"),
+            lambda: async_db.run(async_db.fetch_members_page(page_size=50, sort_by="name")),
+        ),
+    }
+
+
+def measure(func, repeat):
+    func()  # warm up connections on both pools
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return statistics.median(timings), timings[int(0.95 * (len(timings) - 1))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sequential vs concurrent query latency")
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per scenario and variant")
+    args = parser.parse_args(argv)
+
+    member_id = sample_member_id()
+    print(f"{'scenario':<17} {'sequential p50/p95 ms':>22} {'async p50/p95 ms':>18} {'speedup':>8}")
+    for label, (sequential, concurrent) in scenarios(member_id).items():
+        seq_p50, seq_p95 = measure(sequential, args.repeat)
+        async_p50, async_p95 = measure(concurrent, args.repeat)
+        print(f"{label:<17} {seq_p50 * 1000:>11.2f} / {seq_p95 * 1000:<8.2f} "
+              f"{async_p50 * 1000:>8.2f} / {async_p95 * 1000:<7.2f} {seq_p50 / async_p50:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
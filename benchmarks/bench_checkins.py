@@ -0,0 +1,131 @@
+"""
+Throughput benchmark for check-in recording (checkins.py).
+
+Fires a 6pm-style burst of swipes from many threads at the configured
+database in two ways and reports swipes/second and p50/p99 latency:
+
+  * per swipe: one pooled connection, a validation query, an INSERT and a
+    commit for every swipe (how db.py writes everything else);
+  * buffered: checkins.check_in(), validated against the cached active
+    set, spooled to disk and inserted in batches by the writer thread.
+
+The buffered run then flushes and checks that every swipe reached
+Check_Ins exactly once. The benchmark's rows are deleted afterwards.
+
+    python benchmarks/bench_checkins.py --threads 16 --swipes 5000
+    GYM_CHECKIN_FSYNC=0 python benchmarks/bench_checkins.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import numpy as np
+
+# Keep the benchmark's spool files away from running apps
+os.environ.setdefault("GYM_CHECKIN_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "gym_bench_checkins"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import checkins  # noqa: E402
+import db  # noqa: E402
+
+GATE = "bench"
+
+
+def sample_members(count, seed=42):
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT member_id FROM Members")
+        member_ids = [row[0] for row in cursor.fetchall()]
+    if not member_ids:
+        sys.exit("❌ Members is empty: load data first (Project1.py or benchmarks/bench_db.py)")
+    return np.random.default_rng(seed).choice(member_ids, count).tolist()
+
+
+def swipe_per_statement(member_id):
+    """Validate and record one swipe with its own queries and commit."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(checkins.ACTIVE_MEMBERS_QUERY.format(where="m.member_id = %s"), (member_id,))
+        row = cursor.fetchone()
+        if row is None or row[1] is None or row[1] < date.today():
+            reason = checkins.NO_MEMBERSHIP
+        else:
+            reason = checkins.ACCEPTED if row[2] == "Paid" else checkins.PAYMENT_DUE
+        cursor.execute(checkins.CHECKIN_INSERT + "(%s, %s, %s, %s, %s)",
+                       (checkins._new_checkin_id(), member_id, datetime.now().replace(microsecond=0), GATE, reason))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def swipe_buffered(member_id):
+    checkins.check_in(member_id, gate=GATE)
+
+
+def run(swipe, member_ids, threads):
+    def timed(member_id):
+        start = time.perf_counter()
+        swipe(member_id)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = np.array(list(pool.map(timed, member_ids)))
+    return latencies, time.perf_counter() - start
+
+
+def bench_rows():
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*), COUNT(DISTINCT checkin_id) FROM Check_Ins WHERE gate = %s", (GATE,))
+        return cursor.fetchone()
+
+
+def delete_bench_rows():
+    with db.get_connection() as conn:
+        conn.cursor().execute("DELETE FROM Check_Ins WHERE gate = %s", (GATE,))
+        conn.commit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check-in recording throughput")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--swipes", type=int, default=5000, help="swipes per scenario")
+    args = parser.parse_args(argv)
+
+    db.POOL_SIZE = max(db.POOL_SIZE, args.threads + 1)
+    member_ids = sample_members(args.swipes)
+    len(checkins._active)   # load the active set outside the timed runs
+    delete_bench_rows()
+
+    problems = []
+    try:
+        for label, swipe in (("per swipe", swipe_per_statement), ("buffered", swipe_buffered)):
+            latencies, elapsed = run(swipe, member_ids, args.threads)
+            print(f"{label:<10} {len(latencies):>6} swipes  {elapsed:7.2f}s  {len(latencies) / elapsed:9.1f} swipes/s  "
+                  f"p50 {np.percentile(latencies, 50) * 1000:7.2f} ms  p99 {np.percentile(latencies, 99) * 1000:7.2f} ms")
+
+        start = time.perf_counter()
+        checkins.flush_checkins()
+        print(f"final flush {time.perf_counter() - start:.3f}s (fsync={'on' if checkins.CHECKIN_FSYNC else 'off'}, "
+              f"batch size {checkins.CHECKIN_BATCH_SIZE})")
+
+        rows, distinct = bench_rows()
+        if rows != 2 * args.swipes or distinct != rows:
+            problems.append(f"{rows} rows ({distinct} distinct) in Check_Ins for {2 * args.swipes} swipes")
+    finally:
+        delete_bench_rows()
+
+    for problem in problems:
+        print("❌", problem)
+    print("✅ every swipe recorded once" if not problems else f"❌ {len(problems)} problems")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
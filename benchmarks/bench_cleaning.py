@@ -0,0 +1,193 @@
+"""
+Benchmark the Project1.py cleaning helpers against their original per-cell
+implementations on synthetic dirty CSVs, and check both produce the same data.
+
+    python benchmarks/bench_cleaning.py                 # 10k, 100k, 1M rows
+    python benchmarks/bench_cleaning.py --sizes 10000 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Project1  # noqa: E402
+
+
+# ------------------- Original Helpers (reference) -------------------
+
+def legacy_capitalize_strings(df):
+    for col in df.select_dtypes(include=['object']).columns:
+        df[col] = df[col].astype(str).str.strip().str.title()
+        df[col] = df[col].replace({'Nan': None})
+    return df
+
+
+def legacy_format_dates(df, date_cols):
+    for col in date_cols:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+            df[col] = df[col].apply(lambda x: x.strftime('%Y-%m-%d') if pd.notna(x) else None)
+    return df
+
+
+def legacy_fill_non_critical(df, critical_cols):
+    non_critical = set(df.columns) - set(critical_cols)
+    for col in non_critical:
+        df[col] = df[col].apply(lambda x: x if pd.notna(x) else None)
+    return df
+
+
+def legacy_normalize_gender(df):
+    if 'gender' in df.columns:
+        df['gender'] = df['gender'].astype(str).str.strip().str[0].str.upper()
+    return df
+
+
+LEGACY = {
+    'capitalize_strings': legacy_capitalize_strings,
+    'format_dates': legacy_format_dates,
+    'fill_non_critical': legacy_fill_non_critical,
+    'normalize_gender': legacy_normalize_gender,
+}
+
+
+@contextmanager
+def legacy_helpers():
+    """Temporarily point Project1's cleaners at the original helpers."""
+    saved = {name: getattr(Project1, name) for name in LEGACY}
+    for name, func in LEGACY.items():
+        setattr(Project1, name, func)
+    try:
+        yield
+    finally:
+        for name, func in saved.items():
+            setattr(Project1, name, func)
+
+
+# ------------------- Synthetic Dirty Data -------------------
+
+NAMES = ['aarav sharma', ' PRIYA patel', 'rohan  ', 'Sneha Iyer', 'vikram SINGH', 'ananya', 'kabir mehta ']
+PLANS = ['gold', 'Silver ', 'PLATINUM', 'basic', ' gold']
+GENDERS = ['male', 'Female', ' m', 'F', 'other', None]
+MODES = ['cash', 'UPI', ' card', 'Card']
+STATUSES = ['paid', 'Unpaid', 'PAID ']
+
+
+def pick(rng, values, n, missing=0.05):
+    out = np.array(values, dtype=object)[rng.integers(0, len(values), n)]
+    out[rng.random(n) < missing] = None
+    return out
+
+
+def dirty_dates(rng, n):
+    days = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 2000, n), unit='D')
+    out = days.strftime('%Y-%m-%d').to_numpy(dtype=object)
+    slash = rng.random(n) < 0.2
+    out[slash] = days[slash].strftime('%Y/%m/%d')
+    out[rng.random(n) < 0.02] = 'not a date'
+    out[rng.random(n) < 0.03] = None
+    return out
+
+
+def make_members(n, rng):
+    ids = rng.integers(1, int(n * 0.95) + 2, n)      # ~5% duplicate keys
+    return pd.DataFrame({
+        'member_id': ids,
+        'name': pick(rng, NAMES, n, 0.01),
+        'age': np.where(rng.random(n) < 0.05, np.nan, rng.integers(16, 70, n)),
+        'gender': pick(rng, GENDERS, n),
+        'contact': np.where(rng.random(n) < 0.05, np.nan, rng.integers(7_000_000_000, 9_999_999_999, n)),
+        'membership_type': pick(rng, PLANS, n, 0.01),
+        'start_date': dirty_dates(rng, n),
+        'end_date': dirty_dates(rng, n),
+        'trainer_id': np.where(rng.random(n) < 0.02, np.nan, rng.integers(1, 20, n)),
+    })
+
+
+def make_payments(n, rng):
+    return pd.DataFrame({
+        'payment_id': [f"P{i:07X}" for i in rng.integers(0, n * 2, n)],
+        'member_id': rng.integers(1, n, n),
+        'amount': np.where(rng.random(n) < 0.05, np.nan, rng.integers(500, 5000, n)),
+        'payment_date': dirty_dates(rng, n),
+        'mode': pick(rng, MODES, n),
+        'status': pick(rng, STATUSES, n),
+    })
+
+
+# ------------------- Benchmark -------------------
+
+def normalized(df):
+    """Object frame with every missing value as None, for value-level comparison."""
+    out = df.astype(object)
+    return out.where(out.notna(), None).reset_index(drop=True)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def compare(label, old_func, new_func, df, *args):
+    old, old_time = timed(old_func, df.copy(), *args)
+    new, new_time = timed(new_func, df.copy(), *args)
+    same = normalized(old).equals(normalized(new))
+    print(f"  {label:<24} old {old_time:8.3f}s   new {new_time:8.3f}s   "
+          f"x{old_time / new_time if new_time else float('inf'):6.1f}   {'same' if same else 'DIFFERENT'}")
+    return same
+
+
+def run(size, workdir, seed):
+    rng = np.random.default_rng(seed)
+    members_csv = os.path.join(workdir, f"members_{size}.csv")
+    payments_csv = os.path.join(workdir, f"payments_{size}.csv")
+    make_members(size, rng).to_csv(members_csv, index=False)
+    make_payments(size, rng).to_csv(payments_csv, index=False)
+
+    members = pd.read_csv(members_csv)
+    payments = pd.read_csv(payments_csv)
+    critical = ['member_id', 'name', 'membership_type', 'start_date', 'trainer_id']
+
+    print(f"\n{size:,} rows")
+    results = [
+        compare('capitalize_strings', legacy_capitalize_strings, Project1.capitalize_strings, members),
+        compare('format_dates', legacy_format_dates, Project1.format_dates, members, ['start_date', 'end_date']),
+        compare('fill_non_critical', legacy_fill_non_critical, Project1.fill_non_critical, members, critical),
+        compare('normalize_gender', legacy_normalize_gender, Project1.normalize_gender, members),
+    ]
+
+    def legacy_clean(clean_df):
+        def run_legacy(df, *args):
+            with legacy_helpers():
+                return clean_df(df, *args)
+        return run_legacy
+
+    valid_trainers = set(range(1, 20))
+    valid_plans = {'Gold', 'Silver', 'Platinum', 'Basic'}
+    results.append(compare('clean_members_df', legacy_clean(Project1.clean_members_df),
+                           Project1.clean_members_df, members, valid_trainers, valid_plans))
+    results.append(compare('clean_payments_df', legacy_clean(Project1.clean_payments_df),
+                           Project1.clean_payments_df, payments))
+    return all(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Old vs vectorized cleaning helpers")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        ok = all([run(size, workdir, args.seed) for size in args.sizes])
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+"""
+Benchmark suite for the db.py data-access layer on synthetic gyms.
+
+Each size gets its own database (gym_bench_1k, gym_bench_10k, ...) built
+with the Project1.py schema and filled with a realistic gym: skewed plan
+and trainer popularity, members who joined over the last few years and
+renewed (or lapsed) plan by plan, and every renewal's payment. A database
+that already holds the requested size is reused; --rebuild regenerates it.
+
+The suite then times fetch_members (All and filtered), fetch_member_details,
+fetch_member_payments, insert_member, insert_payment, renew_membership and
+delete_member, reporting p50/p95/p99 latency, throughput and the peak
+Python memory of one call. Write operations only touch members the run
+creates itself (deleted at the end), so the dataset stays the same between
+runs.
+
+    python benchmarks/bench_db.py --sizes 1k 10k
+    python benchmarks/bench_db.py --sizes 10k 100k --save-baseline main
+    python benchmarks/bench_db.py --sizes 10k 100k --compare main --threshold 15
+
+--backend sqlite runs the same suite on the embedded backend, with one
+database file per size in --sqlite-dir (gym_bench_1k.sqlite3, ...) created
+from backends.SQLITE_SCHEMA. Save separate baselines per backend.
+
+    python benchmarks/bench_db.py --backend sqlite --sizes 10k --compare sqlite-main
+
+Baselines are JSON files in benchmarks/baselines/. --compare exits with
+status 1 when a p50 or p95 latency grew by more than --threshold percent.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+# Keep cache invalidations of the bench databases away from running apps
+os.environ.setdefault("GYM_MEMBER_JOURNAL", os.path.join(tempfile.gettempdir(), "gym_bench_members.journal"))
+os.environ.setdefault("GYM_REFERENCE_STAMP", os.path.join(tempfile.gettempdir(), "gym_bench_reference.stamp"))
+os.environ.pop("GYM_DB_REPLICA_HOST", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import backends  # noqa: E402
+import db  # noqa: E402
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+INSERT_BATCH = 10_000
+
+PLANS = [  # (membership_type, price, validity_months)
+    ("Monthly", 1500, 1), ("Quarterly", 4000, 3), ("Half-Yearly", 7500, 6), ("Annual", 14000, 12),
+    ("Student", 1000, 1), ("Couple", 2600, 1), ("Senior", 900, 1), ("Corporate", 12000, 12),
+]
+SPECIALIZATIONS = ["Strength", "Cardio", "Yoga", "CrossFit", "Zumba", "Pilates", "Boxing"]
+FIRST_NAMES = ["Aarav", "Aditi", "Arjun", "Ananya", "Diya", "Ishaan", "Kabir", "Kavya", "Meera", "Neha",
+               "Priya", "Rahul", "Riya", "Rohan", "Sai", "Sara", "Tanvi", "Vihaan", "Vivaan", "Zara"]
+LAST_NAMES = ["Sharma", "Verma", "Gupta", "Singh", "Patel", "Reddy", "Nair", "Iyer", "Das", "Khan",
+              "Mehta", "Joshi", "Kapoor", "Rao", "Bose", "Menon", "Chopra", "Malhotra", "Kulkarni", "Pillai"]
+
+
+def parse_size(label):
+    label = label.lower()
+    if label in SIZES:
+        return SIZES[label]
+    return int(label)
+
+
+def size_label(members):
+    for label, value in SIZES.items():
+        if value == members:
+            return label
+    return str(members)
+
+
+def zipf_weights(n, s=1.1):
+    """Popularity skew: item k gets weight 1/k^s."""
+    weights = 1.0 / np.arange(1, n + 1) ** s
+    return weights / weights.sum()
+
+
+# ------------------- Data generator -------------------
+def use_database(name, backend="mysql", sqlite_dir=None):
+    """Point db.py at `name`, creating the database if needed."""
+    if backend == "sqlite":
+        os.makedirs(sqlite_dir, exist_ok=True)
+        db.use_backend(backends.SQLiteBackend(os.path.join(sqlite_dir, f"{name}.sqlite3")))
+    else:
+        import mysql.connector
+
+        config = {k: v for k, v in db.DB_CONFIG.items() if k != "database"}
+        conn = mysql.connector.connect(**config)
+        conn.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{name}`")
+        conn.close()
+        db.DB_CONFIG["database"] = name
+        db.use_backend(backends.MySQLBackend(db.DB_CONFIG))
+    db.invalidate_reference_data()
+    db._roster.reset()
+
+
+def create_schema(conn):
+    if db.BACKEND.embedded:
+        db.BACKEND.create_schema(conn)
+    else:
+        from Project1 import create_tables
+        create_tables(conn)
+
+
+def member_count():
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Members")
+        return cursor.fetchone()[0]
+
+
+def insert_rows(cursor, conn, table, columns, rows):
+    placeholders = ", ".join(["%s"] * len(columns))
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    for start in range(0, len(rows), INSERT_BATCH):
+        cursor.executemany(sql, rows[start:start + INSERT_BATCH])
+        conn.commit()
+
+
+def generate_gym(members, years=3, seed=42):
+    """Fill the current (empty) database with a synthetic gym of `members` members."""
+    rng = np.random.default_rng(seed)
+    today = date.today()
+    history_days = 365 * years
+
+    with db.get_connection() as conn:
+        create_schema(conn)
+        cursor = conn.cursor()
+        for table in ("Check_Ins", "Revenue_Daily", "Revenue_Monthly", "Latest_Payments", "Payments",
+                      "Members", "Trainers", "Membership_Types"):
+            cursor.execute(f"DELETE FROM {table}")
+        conn.commit()
+
+        insert_rows(cursor, conn, "Membership_Types", ["membership_type", "price", "validity_months"], PLANS)
+
+        trainers = max(5, min(500, members // 200))
+        insert_rows(cursor, conn, "Trainers", ["trainer_id", "name", "specialization"], [
+            (t + 1, f"Coach {FIRST_NAMES[t % 20]} {LAST_NAMES[(t * 7) % 20]}", SPECIALIZATIONS[t % 7])
+            for t in range(trainers)
+        ])
+
+        # Members: skewed plan and trainer choice, 20% without a trainer
+        plan_idx = rng.choice(len(PLANS), size=members, p=zipf_weights(len(PLANS)))
+        trainer_ids = rng.choice(trainers, size=members, p=zipf_weights(trainers, 0.8)) + 1
+        no_trainer = rng.random(members) < 0.2
+        joined = rng.integers(0, history_days, size=members)      # days ago
+        ages = rng.integers(16, 70, size=members)
+        genders = rng.choice(np.array(["M", "F", "O"]), size=members, p=[0.55, 0.43, 0.02])
+        firsts = rng.integers(0, len(FIRST_NAMES), size=members)
+        lasts = rng.integers(0, len(LAST_NAMES), size=members)
+
+        # Renewals: back-to-back periods from the join date; each renewal
+        # happens with 80% probability, otherwise the membership lapses
+        validity = np.array([PLANS[i][2] for i in plan_idx]) * 30
+        max_periods = joined // validity + 1
+        periods = np.minimum(rng.geometric(0.2, size=members), max_periods)
+        start_offset = joined - (periods - 1) * validity        # days ago of the last period's start
+
+        member_rows = []
+        for i in range(members):
+            start = today - timedelta(days=int(start_offset[i]))
+            member_rows.append((
+                i + 1, f"{FIRST_NAMES[firsts[i]]} {LAST_NAMES[lasts[i]]} {i + 1}", int(ages[i]), str(genders[i]),
+                7_000_000_000 + i, PLANS[plan_idx[i]][0], start, start + timedelta(days=int(validity[i])),
+                None if no_trainer[i] else int(trainer_ids[i]),
+            ))
+        insert_rows(cursor, conn, "Members",
+                    ["member_id", "name", "age", "gender", "contact", "membership_type", "start_date",
+                     "end_date", "trainer_id"], member_rows)
+        del member_rows
+
+        total_payments = int(periods.sum())
+        payment_ids = db.new_payment_ids(total_payments)
+        modes = rng.choice(np.array(["Cash", "UPI", "Card"]), size=total_payments, p=[0.3, 0.5, 0.2])
+        unpaid = rng.random(total_payments) < 0.1
+        n = 0
+        payment_rows = []
+        for i in range(members):
+            plan, price, _ = PLANS[plan_idx[i]]
+            for k in range(int(periods[i])):
+                paid_on = today - timedelta(days=int(joined[i] - k * validity[i]))
+                payment_rows.append((payment_ids[n], i + 1, price, paid_on, str(modes[n]),
+                                     "Unpaid" if unpaid[n] else "Paid", plan))
+                n += 1
+            if len(payment_rows) >= INSERT_BATCH * 10:
+                insert_rows(cursor, conn, "Payments", ["payment_id", "member_id", "amount", "payment_date",
+                                                       "mode", "status", "membership_type"], payment_rows)
+                payment_rows = []
+        insert_rows(cursor, conn, "Payments", ["payment_id", "member_id", "amount", "payment_date",
+                                               "mode", "status", "membership_type"], payment_rows)
+
+        db.rebuild_latest_payments(conn)
+        db.rebuild_revenue_rollups(conn)
+    db.invalidate_reference_data()
+    return total_payments
+
+
+# ------------------- Timed operations -------------------
+class WriteFixture:
+    """Members created by the run; write benchmarks only touch these."""
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.created = []
+        self.serial = 0
+
+    def insert_member(self):
+        self.serial += 1
+        member_id = db.insert_member(f"Bench Member {os.getpid()}-{self.serial}", 30, "F",
+                                     str(8_000_000_000 + self.serial), self.plan, None)
+        self.created.append(member_id)
+        return member_id
+
+    def pick(self, rng):
+        return self.created[int(rng.integers(len(self.created)))]
+
+    def delete_one(self):
+        return db.delete_member(self.created.pop())
+
+    def cleanup(self):
+        for member_id in self.created:
+            db.delete_member(member_id)
+        self.created = []
+
+
+def operations(members, fixture, rng):
+    """(name, callable, heavy) for every benchmarked call."""
+    top_plan = PLANS[0][0]
+
+    def random_member():
+        return int(rng.integers(1, members + 1))
+
+    return [
+        ("fetch_members (All)", lambda: db.fetch_members(), True),
+        ("fetch_members (plan, unpaid)",
+         lambda: db.fetch_members(top_plan, payment_status="Unpaid"), True),
+        ("fetch_member_details", lambda: db.fetch_member_details(random_member()), False),
+        ("fetch_member_payments", lambda: db.fetch_member_payments(random_member()), False),
+        ("insert_member", fixture.insert_member, False),
+        ("insert_payment", lambda: db.insert_payment(fixture.pick(rng), 500, "UPI"), False),
+        ("renew_membership",
+         lambda: db.renew_membership(fixture.pick(rng), fixture.plan, 1500, "Cash", "Paid", 1), False),
+        ("delete_member", fixture.delete_one, False),
+    ]
+
+
+def measure(func, iterations):
+    func()  # warm-up: pool connections, caches, plans
+    timings = np.empty(iterations)
+    started = time.perf_counter()
+    for i in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings[i] = time.perf_counter() - start
+    elapsed = time.perf_counter() - started
+
+    # Peak memory is measured on a separate call: tracemalloc slows timing
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99]) * 1000
+    return {"iterations": iterations, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+            "ops_per_s": iterations / elapsed, "peak_mem_mb": peak / 2**20}
+
+
+def run_size(members, args):
+    label = size_label(members)
+    use_database(f"{args.database_prefix}_{label}", args.backend, args.sqlite_dir)
+    with db.get_connection() as conn:
+        create_schema(conn)
+
+    if args.rebuild or member_count() != members:
+        print(f"⏳ Generating {label} gym ({members:,} members, {args.years} years)...")
+        start = time.perf_counter()
+        payments = generate_gym(members, args.years)
+        print(f"   {payments:,} payments in {time.perf_counter() - start:.1f}s")
+
+    rng = np.random.default_rng(7)
+    fixture = WriteFixture(PLANS[0][0])
+    # Members for insert_payment / renew_membership and delete_member
+    for _ in range(max(10, args.iterations + 2)):
+        fixture.insert_member()
+
+    results = {}
+    try:
+        for name, func, heavy in operations(members, fixture, rng):
+            iterations = args.heavy_iterations if heavy else args.iterations
+            results[name] = measure(func, iterations)
+    finally:
+        fixture.cleanup()
+    return label, results
+
+
+# ------------------- Reporting -------------------
+def print_results(label, results):
+    print(f"\n📊 {label} members")
+    print(f"{'operation':<30} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>9} {'peak MB':>8}")
+    for name, r in results.items():
+        print(f"{name:<30} {r['iterations']:>5} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+              f"{r['ops_per_s']:>9.1f} {r['peak_mem_mb']:>8.2f}")
+
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def save_baseline(name, all_results):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = baseline_path(name)
+    existing = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            existing = json.load(f)["results"]
+    existing.update(all_results)   # re-running some sizes keeps the others
+    with open(path, "w") as f:
+        json.dump({"saved": datetime.now().isoformat(timespec="seconds"), "results": existing}, f, indent=2)
+    print(f"\n💾 Baseline saved to {path}")
+
+
+def compare(name, all_results, threshold):
+    """Print changes against a saved baseline; returns the number of regressions."""
+    with open(baseline_path(name)) as f:
+        baseline = json.load(f)
+    print(f"\n🔍 Compared with baseline '{name}' ({baseline['saved']}), threshold {threshold:.0f}%")
+    print(f"{'size':<6} {'operation':<30} {'p50 ms':>17} {'p95 ms':>17} {'change':>8}")
+
+    regressions = 0
+    for label, results in all_results.items():
+        for op, r in results.items():
+            old = baseline["results"].get(label, {}).get(op)
+            if old is None:
+                continue
+            change = max((r[k] - old[k]) / old[k] * 100 if old[k] else 0.0 for k in ("p50_ms", "p95_ms"))
+            flag = "❌" if change > threshold else ("✅" if change < -threshold else "  ")
+            regressions += change > threshold
+            print(f"{label:<6} {op:<30} {old['p50_ms']:>7.2f} → {r['p50_ms']:<7.2f} "
+                  f"{old['p95_ms']:>7.2f} → {r['p95_ms']:<7.2f} {change:>+7.1f}% {flag}")
+
+    print(f"\n{'❌' if regressions else '✅'} {regressions} regressions")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="db.py benchmark suite on synthetic gyms")
+    parser.add_argument("--sizes", nargs="+", default=["1k", "10k"],
+                        help="member counts: 1k, 10k, 100k, 1m or a number (default: 1k 10k)")
+    parser.add_argument("--years", type=int, default=3, help="years of payment history to generate")
+    parser.add_argument("--iterations", type=int, default=200, help="timed calls per point operation")
+    parser.add_argument("--heavy-iterations", type=int, default=5,
+                        help="timed calls per full-listing operation (fetch_members)")
+    parser.add_argument("--database-prefix", default="gym_bench",
+                        help="databases are named <prefix>_<size>; never point this at real data")
+    parser.add_argument("--backend", choices=sorted(backends.BACKENDS), default=db.DB_BACKEND,
+                        help="database backend to benchmark (default: GYM_DB_BACKEND or mysql)")
+    parser.add_argument("--sqlite-dir", default=tempfile.gettempdir(),
+                        help="directory for the sqlite backend's database files")
+    parser.add_argument("--rebuild", action="store_true", help="regenerate the synthetic data")
+    parser.add_argument("--save-baseline", metavar="NAME", help="store the results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare the results with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percent slowdown of p50/p95 counted as a regression (default 10)")
+    args = parser.parse_args(argv)
+
+    all_results = {}
+    for size in args.sizes:
+        label, results = run_size(parse_size(size), args)
+        print_results(label, results)
+        all_results[label] = results
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, all_results)
+    if args.compare:
+        return 1 if compare(args.compare, all_results, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Throughput and uniqueness check for db.IdGenerator (payment IDs).
+
+Several processes, each with several threads, draw IDs concurrently; the
+script verifies every ID is unique, fits Payments.payment_id VARCHAR(10)
+and increases within each thread, and reports IDs/second.
+
+    python benchmarks/bench_payment_ids.py                  # 2M IDs, shared in-memory counter
+    python benchmarks/bench_payment_ids.py --db             # blocks reserved from MySQL Id_Sequences
+
+Without --db the block reservation runs against a counter in shared memory
+guarded by a lock, standing in for the atomic UPDATE on Id_Sequences.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import db  # noqa: E402
+
+_counter = None
+
+
+def _init_worker(counter):
+    global _counter
+    _counter = counter
+
+
+def _reserve_shared(sequence, size):
+    with _counter.get_lock():
+        start = _counter.value
+        _counter.value += size
+    return start
+
+
+def _worker(args):
+    per_thread, threads, block_size, use_db = args
+    reserve = db._reserve_id_block if use_db else _reserve_shared
+    generator = db.IdGenerator("P", "bench_payment_id", block_size, reserve)
+    results = [None] * threads
+
+    def draw(slot):
+        results[slot] = [generator() for _ in range(per_thread)]
+
+    pool = [threading.Thread(target=draw, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Payment ID generator throughput/uniqueness")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--per-thread", type=int, default=125_000)
+    parser.add_argument("--block-size", type=int, default=db.PAYMENT_ID_BLOCK)
+    parser.add_argument("--db", action="store_true", help="reserve blocks from the configured MySQL database")
+    args = parser.parse_args(argv)
+
+    counter = mp.Value("q", 1)
+    job = (args.per_thread, args.threads, args.block_size, args.db)
+
+    start = time.perf_counter()
+    with mp.Pool(args.processes, initializer=_init_worker, initargs=(counter,)) as pool:
+        per_process = pool.map(_worker, [job] * args.processes)
+    elapsed = time.perf_counter() - start
+
+    sequences = [ids for threads in per_process for ids in threads]
+    all_ids = [i for ids in sequences for i in ids]
+    total = len(all_ids)
+
+    unique = len(set(all_ids)) == total
+    fits = max(len(i) for i in all_ids) <= 10
+    ordered = all(ids == sorted(ids) for ids in sequences)
+
+    print(f"{total:,} IDs from {args.processes} processes x {args.threads} threads "
+          f"in {elapsed:.2f}s → {total / elapsed:,.0f} IDs/s")
+    print(f"unique: {unique}   fits VARCHAR(10): {fits}   increasing per thread: {ordered}")
+    print(f"first/last: {min(all_ids)} … {max(all_ids)}")
+    return 0 if unique and fits and ordered else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Concurrency check and throughput benchmark for db.renew_membership.
+
+Creates throwaway members in the configured MySQL database, fires many
+simultaneous renewals at one member and at many different members, then
+verifies that:
+
+  * the periods handed out for the same member are back-to-back with no
+    overlap, and Members.end_date equals the last one;
+  * every renewal left exactly one payment and Latest_Payments points at
+    the newest one;
+
+and reports renewals/second. The test members are deleted afterwards.
+
+    python benchmarks/bench_renewals.py --threads 16 --renewals 200
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import db  # noqa: E402
+
+DURATION_MONTHS = 1
+
+
+def create_members(count, plan):
+    return [
+        db.insert_member(f"Bench Renewal {i}", 30, "M", str(9_000_000_000 + i), plan, None)
+        for i in range(count)
+    ]
+
+
+def renew_all(member_ids, plan, threads):
+    def renew(member_id):
+        return member_id, db.renew_membership(member_id, plan, 100, "Cash", "Paid", DURATION_MONTHS)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(renew, member_ids))
+    return results, time.perf_counter() - start
+
+
+def check_member(member_id, periods):
+    """Periods for one member must chain without gaps or overlap; returns a list of problems."""
+    problems = []
+    periods = sorted(periods)
+    for (_, prev_end), (start, _) in zip(periods, periods[1:]):
+        if start != prev_end + timedelta(days=1):
+            problems.append(f"member {member_id}: period starting {start} does not follow {prev_end}")
+
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT end_date FROM Members WHERE member_id=%s", (member_id,))
+        end_date = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM Payments WHERE member_id=%s", (member_id,))
+        payments = cursor.fetchone()[0]
+
+    if end_date != periods[-1][1]:
+        problems.append(f"member {member_id}: end_date {end_date} != last renewal end {periods[-1][1]}")
+    if payments != len(periods):
+        problems.append(f"member {member_id}: {payments} payments for {len(periods)} renewals")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent renew_membership check")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--renewals", type=int, default=200, help="renewals per scenario")
+    args = parser.parse_args(argv)
+
+    db.POOL_SIZE = max(db.POOL_SIZE, args.threads + 1)
+    plan = db.fetch_membership_types()["membership_type"].iloc[0]
+    members = create_members(args.renewals + 1, plan)
+    hot_member, others = members[0], members[1:]
+
+    try:
+        scenarios = {
+            "same member": [hot_member] * args.renewals,
+            "different members": others,
+        }
+        problems = []
+        for label, targets in scenarios.items():
+            results, elapsed = renew_all(targets, plan, args.threads)
+            print(f"{label:<18} {len(results):>6} renewals  {elapsed:7.2f}s  "
+                  f"{len(results) / elapsed:8.1f} renewals/s")
+
+            periods = {}
+            for member_id, (_, start, end, _, _) in results:
+                periods.setdefault(member_id, []).append((start, end))
+            for member_id, member_periods in periods.items():
+                problems.extend(check_member(member_id, member_periods))
+
+        out_of_sync = db.verify_latest_payments()
+        out_of_sync = out_of_sync[out_of_sync["member_id"].isin(members)]
+        if not out_of_sync.empty:
+            problems.append(f"{len(out_of_sync)} Latest_Payments rows out of sync")
+    finally:
+        for member_id in members:
+            db.delete_member(member_id)
+
+    for problem in problems:
+        print("❌", problem)
+    print("✅ all renewals consistent" if not problems else f"❌ {len(problems)} problems")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+"""
+Member check-ins from the turnstiles and the front desk (app.py's Check-In
+page). The member portal only shows the history.
+
+check_in() validates a swipe and records it, accepted or not, in Check_Ins:
+
+    result = checkins.check_in(1042, gate="Turnstile 1")
+    result.accepted, result.reason      # (True, "Accepted"), (False, "Payment due") ...
+
+Validation reads no database row per swipe. ActiveMembers holds the end date
+and latest payment status of every member whose membership has not ended.
+It is loaded once and, like db.py's member roster, re-reads by ID the members
+db.py's member journal lists as written; a journal rotation, a reference-data
+stamp bump or CHECKIN_CACHE_TTL seconds (writes made outside db.py) reload it.
+
+Recording does not wait for the database either. Before check_in() returns,
+the swipe is appended to a spool file on local disk and fsync'd (swipes
+arriving together share one fsync), then buffered in memory. A background
+thread inserts the buffer as one multi-row statement once it holds
+CHECKIN_BATCH_SIZE rows or every CHECKIN_FLUSH_INTERVAL seconds, and deletes
+a spool file only after its rows are committed. Spool files left by a crash
+or kept through a database outage are replayed on the next start; every
+check-in carries its own ID and is inserted with INSERT IGNORE, so a replay
+never records one twice.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime
+
+try:
+    import fcntl
+except ImportError:   # Windows: a spool file that is still open cannot be removed anyway
+    fcntl = None
+
+import pandas as pd
+
+import db
+import metrics
+
+CHECKIN_BATCH_SIZE = int(os.environ.get("GYM_CHECKIN_BATCH_SIZE", "200"))
+CHECKIN_FLUSH_INTERVAL = float(os.environ.get("GYM_CHECKIN_FLUSH_INTERVAL", "1"))
+# The spool must outlive a reboot, so it defaults to the user's application
+# data directory rather than the temp directory (often tmpfs or cleared on boot)
+_DATA_HOME = (os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_DATA_HOME")
+              or os.path.join(os.path.expanduser("~"), ".local", "share"))
+CHECKIN_SPOOL_DIR = os.environ.get("GYM_CHECKIN_SPOOL_DIR", os.path.join(_DATA_HOME, "gym_management", "checkin_spool"))
+# GYM_CHECKIN_FSYNC=0 only flushes the spool to the OS: a swipe survives an
+# app crash but not a power cut
+CHECKIN_FSYNC = os.environ.get("GYM_CHECKIN_FSYNC", "1") != "0"
+CHECKIN_CACHE_TTL = float(os.environ.get("GYM_CHECKIN_CACHE_TTL", "600"))
+
+ACCEPTED = "Accepted"
+NO_MEMBERSHIP = "No active membership"
+PAYMENT_DUE = "Payment due"
+
+CHECKIN_COLUMNS = ["checkin_id", "member_id", "checked_in_at", "gate", "result"]
+CheckIn = namedtuple("CheckIn", CHECKIN_COLUMNS)
+CheckInResult = namedtuple("CheckInResult", ["checkin_id", "member_id", "checked_in_at", "accepted", "reason"])
+
+
+# ------------------- Active memberships -------------------
+ACTIVE_MEMBERS_QUERY = """
+    SELECT m.member_id, m.end_date, lp.status
+    FROM Members m
+    LEFT JOIN Latest_Payments lp ON lp.member_id = m.member_id
+    WHERE {where}
+"""
+
+
+class ActiveMembers:
+    """member_id -> (end_date, latest payment status) for memberships that have not ended."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._members = None
+        self._stamp = None
+        self._loaded_at = 0.0
+        self._journal = None
+
+    def reset(self):
+        with self._lock:
+            self._members = None
+
+    def _read(self, where, params, primary=False):
+        conn = db.get_connection() if primary else db.get_read_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(ACTIVE_MEMBERS_QUERY.format(where=where), params)
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+    def _refresh(self, member_ids):
+        """Replace these members with their current rows (dropping ended or deleted ones)."""
+        member_ids = sorted(member_ids)
+        for start in range(0, len(member_ids), db.BULK_CHUNK_SIZE):
+            chunk = member_ids[start:start + db.BULK_CHUNK_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            # Primary: these members were just written
+            rows = self._read(f"m.member_id IN ({placeholders})", tuple(chunk), primary=True)
+            for member_id in chunk:
+                self._members.pop(member_id, None)
+            today = date.today()
+            self._members.update((m, (end, status)) for m, end, status in rows if end is not None and end >= today)
+
+    def _current(self):
+        stamp = db._reference_stamp()
+        with self._lock:
+            fresh = (self._members is not None and self._stamp == stamp
+                     and time.monotonic() - self._loaded_at < CHECKIN_CACHE_TTL)
+            if fresh:
+                written, self._journal = db._read_member_journal(self._journal)
+                if written is None:
+                    fresh = False   # journal rotated: writes may have been missed
+                elif written:
+                    self._refresh(set(written))
+
+            if not fresh:
+                # Journal position first: members written during the load are re-read
+                self._journal = db._member_journal_position()
+                self._members = {m: (end, status) for m, end, status in
+                                 self._read("m.end_date >= %s", (date.today(),))}
+                self._stamp, self._loaded_at = stamp, time.monotonic()
+            return self._members
+
+    def check(self, member_id, today=None):
+        """ACCEPTED, or why the member may not come in."""
+        entry = self._current().get(member_id)
+        if entry is None or entry[0] < (today or date.today()):
+            return NO_MEMBERSHIP
+        if entry[1] != "Paid":
+            return PAYMENT_DUE
+        return ACCEPTED
+
+    def __len__(self):
+        return len(self._current())
+
+
+# ------------------- Buffered writer -------------------
+CHECKIN_INSERT = "INSERT IGNORE INTO Check_Ins (checkin_id, member_id, checked_in_at, gate, result) VALUES "
+
+
+def _new_checkin_id():
+    """24 hex chars, time-ordered so inserts append to the end of the primary key."""
+    return f"{time.time_ns():016x}{os.urandom(4).hex()}"
+
+
+def _encode(row):
+    return json.dumps([row.checkin_id, row.member_id, row.checked_in_at.isoformat(), row.gate, row.result]) + "\n"
+
+
+def _decode(line):
+    checkin_id, member_id, checked_in_at, gate, result = json.loads(line)
+    return CheckIn(checkin_id, member_id, datetime.fromisoformat(checked_in_at), gate, result)
+
+
+def _insert_checkins(rows):
+    """Insert rows in multi-row statements (executemany would send INSERT IGNORE row by row)."""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        for start in range(0, len(rows), db.BULK_CHUNK_SIZE):
+            chunk = rows[start:start + db.BULK_CHUNK_SIZE]
+            values = ", ".join(["(%s, %s, %s, %s, %s)"] * len(chunk))
+            cursor.execute(CHECKIN_INSERT + values, [v for row in chunk for v in row])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _locked_elsewhere(f):
+    """True while another running writer owns this spool file."""
+    if fcntl is None:
+        return False
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return True
+    return False
+
+
+class CheckInWriter:
+    """
+    Write-behind buffer for Check_Ins backed by spool files. Each batch has
+    its own spool file, locked by this process until the batch is committed.
+    """
+
+    def __init__(self, spool_dir=CHECKIN_SPOOL_DIR, batch_size=CHECKIN_BATCH_SIZE,
+                 flush_interval=CHECKIN_FLUSH_INTERVAL, fsync=CHECKIN_FSYNC):
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._lock = threading.Lock()            # rows and spool file being filled
+        self._sync_lock = threading.Lock()       # one fsync at a time; waiting swipes share the next
+        self._flush_lock = threading.Lock()      # batches reach the database in order
+        self._wake = threading.Condition(self._lock)
+        self._rows = []
+        self._spool = None
+        self._spools = 0
+        self._written = 0                        # swipes appended to spool files
+        self._synced = 0                         # ... of which are on disk
+        self._unflushed = []                     # (spool file, rows) awaiting a commit
+        self._thread = None
+        self._closing = False
+        self._recovered = False
+        self.last_error = None
+
+    # Spool files
+    def _open_spool(self):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._spools += 1
+        path = os.path.join(self.spool_dir, f"{os.getpid()}-{time.time_ns()}-{self._spools}.spool")
+        spool = open(path, "a", encoding="utf-8")
+        if fcntl is not None:
+            fcntl.flock(spool.fileno(), fcntl.LOCK_EX)
+        return spool
+
+    def _sync(self, seq):
+        """Return once swipe number `seq` is on disk."""
+        with self._sync_lock:
+            if self._synced >= seq:
+                return
+            with self._lock:
+                spool, target = self._spool, self._written
+            os.fsync(spool.fileno())
+            self._synced = target
+
+    def recover(self):
+        """Insert the rows of spool files no running writer owns, then delete them."""
+        recovered = 0
+        with self._lock:
+            own = {spool.name for spool, _ in self._unflushed}
+            if self._spool is not None:
+                own.add(self._spool.name)
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, "*.spool"))):
+            if path in own:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    if _locked_elsewhere(f):
+                        continue
+                    rows = []
+                    for line in f:
+                        try:
+                            rows.append(_decode(line))
+                        except ValueError:
+                            pass   # a line torn by the crash was never acknowledged
+            except OSError:
+                continue
+            if rows:
+                _insert_checkins(rows)
+            try:
+                os.remove(path)
+            except OSError:
+                pass   # still open by its writer (Windows); that writer inserts it itself
+            recovered += len(rows)
+        if recovered:
+            metrics.REGISTRY.inc("gym_checkins_recovered_total", recovered)
+        self._recovered = True
+        return recovered
+
+    # Writing
+    def add(self, row):
+        """Buffer one check-in; it is in the spool (and on disk if fsync) on return."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="checkin-writer", daemon=True)
+                self._thread.start()
+            if self._spool is None:
+                self._spool = self._open_spool()
+            self._spool.write(_encode(row))
+            self._spool.flush()
+            self._rows.append(row)
+            self._written += 1
+            seq = self._written
+            if len(self._rows) >= self.batch_size:
+                self._wake.notify()
+        if self.fsync:
+            self._sync(seq)
+
+    def flush(self):
+        """Commit everything buffered so far; returns the number of rows inserted."""
+        with self._flush_lock:
+            with self._sync_lock, self._lock:
+                if self._rows:
+                    if self.fsync:
+                        os.fsync(self._spool.fileno())
+                    self._synced = self._written
+                    self._unflushed.append((self._spool, self._rows))
+                    self._spool, self._rows = None, []
+
+            inserted = 0
+            while self._unflushed:
+                spool, rows = self._unflushed[0]
+                start = time.perf_counter()
+                _insert_checkins(rows)
+                metrics.REGISTRY.observe("gym_checkin_flush_seconds", time.perf_counter() - start)
+                with self._lock:
+                    self._unflushed.pop(0)
+                spool.close()
+                try:
+                    os.remove(spool.name)
+                except OSError:
+                    pass
+                inserted += len(rows)
+            return inserted
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._wake.wait_for(lambda: len(self._rows) >= self.batch_size or self._closing,
+                                    timeout=self.flush_interval)
+                closing = self._closing
+            try:
+                if not self._recovered:
+                    self.recover()
+                self.flush()
+                self.last_error = None
+            except Exception as e:
+                # Rows stay spooled and buffered; the next round retries them
+                self.last_error = str(e)
+                metrics.REGISTRY.inc("gym_checkin_flush_errors_total")
+                if not closing:
+                    time.sleep(self.flush_interval)
+            if closing:
+                return
+
+    def close(self, timeout=10):
+        """Stop the background thread after a last flush (spooled rows survive a failure)."""
+        with self._lock:
+            self._closing = True
+            thread = self._thread
+            self._wake.notify()
+        if thread is not None:
+            thread.join(timeout)
+
+    def pending(self):
+        """Rows not yet committed, oldest first."""
+        with self._lock:
+            return [row for _, rows in self._unflushed for row in rows] + self._rows
+
+    def stats(self):
+        with self._lock:
+            return {
+                "buffered": len(self._rows) + sum(len(rows) for _, rows in self._unflushed),
+                "unflushed_batches": len(self._unflushed),
+                "flush_failing": int(self.last_error is not None),
+            }
+
+
+_active = ActiveMembers()
+_writer = CheckInWriter()
+atexit.register(_writer.close)
+
+
+# ------------------- Public API -------------------
+def check_in(member_id, gate=None):
+    """
+    Validate and record one swipe. Returns a CheckInResult once the swipe is
+    spooled; it reaches Check_Ins within CHECKIN_FLUSH_INTERVAL seconds.
+    """
+    member_id = int(member_id)
+    reason = _active.check(member_id)
+    row = CheckIn(_new_checkin_id(), member_id, datetime.now().replace(microsecond=0), gate, reason)
+    _writer.add(row)
+    metrics.REGISTRY.inc("gym_checkins_total", result=reason)
+    return CheckInResult(row.checkin_id, member_id, row.checked_in_at, reason == ACCEPTED, reason)
+
+
+def flush_checkins():
+    """Commit buffered check-ins now (e.g. before a report); returns the rows inserted."""
+    return _writer.flush()
+
+
+def fetch_member_checkins(member_id, limit=20):
+    """A member's latest check-ins, newest first, including ones still buffered here."""
+    member_id = int(member_id)
+    conn = db.get_read_connection(member_id)
+    try:
+        df = pd.read_sql(f"""
+            SELECT {', '.join(CHECKIN_COLUMNS)}
+            FROM Check_Ins
+            WHERE member_id = %s
+            ORDER BY checked_in_at DESC, checkin_id DESC
+            LIMIT %s
+        """, conn, params=(member_id, limit))
+    finally:
+        conn.close()
+
+    buffered = [row for row in _writer.pending() if row.member_id == member_id]
+    if buffered:
+        df = pd.concat([pd.DataFrame(buffered, columns=CHECKIN_COLUMNS), df], ignore_index=True)
+        df = df.drop_duplicates("checkin_id").sort_values(
+            ["checked_in_at", "checkin_id"], ascending=False).head(limit).reset_index(drop=True)
+    return df
+
+
+def checkin_stats():
+    return {"active_members": len(_active._members or ()), **_writer.stats()}
+
+
+metrics.REGISTRY.describe("gym_checkins_total", "Check-in swipes by result")
+metrics.REGISTRY.register_gauges("gym_checkin", checkin_stats)
+metrics.instrument_module(globals(), skip=("checkin_stats",), prefix="checkins.")
@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
+import metrics
 # Import the necessary functions from db.py
-from db import get_connection, fetch_member_details, fetch_member_payments
+from db import fetch_member_snapshot, fetch_member_payments_page
+from checkins import fetch_member_checkins
 
 st.set_page_config(page_title="Member Portal", layout="wide")
 
@@ -13,26 +15,32 @@ if "logged_in_member_id" not in st.session_state:
     st.session_state.logged_in_member_id = None
     st.session_state.logged_in_member_name = None
 
+# Render time of this run, recorded when the run ends
+page_timer = metrics.page_timer("portal", "login" if st.session_state.logged_in_member_id is None else "dashboard")
+metrics.start_metrics_server()
+
+# --- Contact check (contact is stored as a number) ---
+def contact_matches(stored_contact, contact_input):
+    contact_input = contact_input.strip()
+    if pd.isna(stored_contact) or not contact_input.isdigit():
+        return False
+    return int(stored_contact) == int(contact_input)
+
 # --- Function to handle Login ---
 def handle_login(member_id_input, contact_input):
     try:
         member_id = int(member_id_input)
-        
-        conn = get_connection()
-        cursor = conn.cursor()
-        
+
+        # One query loads profile + payments; the dashboard then reads them
+        # from the shared member cache on every rerun
+        details_df = fetch_member_snapshot(member_id)[0]
+
         # Check for ID and Contact match
-        cursor.execute(
-            "SELECT member_id, name FROM Members WHERE member_id=%s AND contact=%s",
-            (member_id, contact_input)
-        )
-        result = cursor.fetchone()
-        conn.close()
-
-        if result:
-            st.session_state.logged_in_member_id = result[0]
-            st.session_state.logged_in_member_name = result[1]
-            st.success(f"Welcome, {result[1]}!")
+        if not details_df.empty and contact_matches(details_df.iloc[0]['contact'], contact_input):
+            name = details_df.iloc[0]['Member_Name']
+            st.session_state.logged_in_member_id = member_id
+            st.session_state.logged_in_member_name = name
+            st.success(f"Welcome, {name}!")
             # Corrected: Using st.rerun()
             st.rerun() 
         else:
@@ -44,77 +52,125 @@ def handle_login(member_id_input, contact_input):
         st.error(f"An error occurred during login: {e}")
 
 
-# ----------------- Display Login Form or Dashboard -----------------
+# st.stop() and st.rerun() end a run by raising: record its render time either way
+try:
+    # ----------------- Display Login Form or Dashboard -----------------
+
+    if st.session_state.logged_in_member_id is None:
+        # --- Login Form ---
+        st.subheader("Login to View Your Details")
+        with st.form("client_login_form"):
+            member_id_input = st.text_input("Enter Member ID")
+            # Use type="password" to hide the contact number input
+            contact_input = st.text_input("Enter Contact Number", type="password") 
+            login_button = st.form_submit_button("Login")
+
+        if login_button:
+            handle_login(member_id_input, contact_input)
+
+    else:
+        # --- Member Dashboard View ---
+        member_id = st.session_state.logged_in_member_id
+        member_name = st.session_state.logged_in_member_name
+
+        st.header(f"👋 Welcome, **{member_name}**!")
+
+        if st.button("Logout", help="Click to log out of your portal"):
+            st.session_state.logged_in_member_id = None
+            st.session_state.logged_in_member_name = None
+            st.rerun() # Corrected rerun
+
+        st.markdown("---")
+
+        # Cached snapshot: no database round trip on ordinary reruns
+        member_details_df, payments_df, payment_summary, next_cursor = fetch_member_snapshot(member_id)
+
+        # 1. Member Profile & Membership Status
+        st.subheader("📝 Profile & Membership Status")
 
-if st.session_state.logged_in_member_id is None:
-    # --- Login Form ---
-    st.subheader("Login to View Your Details")
-    with st.form("client_login_form"):
-        member_id_input = st.text_input("Enter Member ID")
-        # Use type="password" to hide the contact number input
-        contact_input = st.text_input("Enter Contact Number", type="password") 
-        login_button = st.form_submit_button("Login")
+        if not member_details_df.empty:
+            details = member_details_df.iloc[0]
 
-    if login_button:
-        handle_login(member_id_input, contact_input)
+            # Display key status metrics
+            col1, col2, col3 = st.columns(3)
 
-else:
-    # --- Member Dashboard View ---
-    member_id = st.session_state.logged_in_member_id
-    member_name = st.session_state.logged_in_member_name
+            # This is safe because it's already a string
+            col1.metric("Membership Type", details['membership_type'])
 
-    st.header(f"👋 Welcome, **{member_name}**!")
+            # FIX: Convert datetime.date to string to prevent TypeError
+            col2.metric("Start Date (Joined)", str(details['start_date'])) 
+            col3.metric("Membership Ends", str(details['end_date'])) 
 
-    if st.button("Logout", help="Click to log out of your portal"):
-        st.session_state.logged_in_member_id = None
-        st.session_state.logged_in_member_name = None
-        st.rerun() # Corrected rerun
+            st.write(f"**Trainer:** {details['Trainer_Name']} (Specialization: {details['Trainer_Specialization']})")
 
-    st.markdown("---")
+            # Display core personal details in a concise table
+            personal_info = {
+                "Member ID": details['member_id'],
+                "Age": details['age'],
+                "Gender": details['gender'],
+                "Contact": details['contact']
+            }
+            st.table(pd.DataFrame(personal_info, index=["Details"]).T)
 
-    # 1. Member Profile & Membership Status
-    st.subheader("📝 Profile & Membership Status")
-    member_details_df = fetch_member_details(member_id)
 
-    if not member_details_df.empty:
-        details = member_details_df.iloc[0]
+        st.markdown("---")
+
+        # 2. Payment History
+        st.subheader("💳 Payment History")
 
-        # Display key status metrics
         col1, col2, col3 = st.columns(3)
-        
-        # This is safe because it's already a string
-        col1.metric("Membership Type", details['membership_type'])
-        
-        # FIX: Convert datetime.date to string to prevent TypeError
-        col2.metric("Start Date (Joined)", str(details['start_date'])) 
-        col3.metric("Membership Ends", str(details['end_date'])) 
-        
-        st.write(f"**Trainer:** {details['Trainer_Name']} (Specialization: {details['Trainer_Specialization']})")
-        
-        # Display core personal details in a concise table
-        personal_info = {
-            "Member ID": details['member_id'],
-            "Age": details['age'],
-            "Gender": details['gender'],
-            "Contact": details['contact']
-        }
-        st.table(pd.DataFrame(personal_info, index=["Details"]).T)
-
-
-    st.markdown("---")
-
-    # 2. Payment History
-    st.subheader("💳 Full Payment History")
-    payments_df = fetch_member_payments(member_id)
-    if not payments_df.empty:
-        # Format columns for better client readability
-        payments_df = payments_df.rename(columns={
-            'payment_id': 'Payment ID',
-            'amount': 'Amount (₹)',
-            'payment_date': 'Date',
-            'mode': 'Mode',
-            'status': 'Status'
-        })
-        st.dataframe(payments_df)
-    else:
-        st.info("No payment history found.")
\ No newline at end of file
+        col1.metric("Lifetime Paid", f"₹{payment_summary['total_paid']}")
+        if payment_summary['last_payment_date'] is not None:
+            col2.metric("Last Payment", f"₹{payment_summary['last_payment_amount']}",
+                        str(payment_summary['last_payment_date']), delta_color="off")
+        else:
+            col2.metric("Last Payment", "—")
+        col3.metric("Unpaid Balance", f"₹{payment_summary['unpaid_balance']}")
+
+        # Older pages loaded with "Load more" belong to this session only. They
+        # continue from the snapshot's cursor, so drop them if the snapshot moved.
+        if st.session_state.get("history_anchor") != (member_id, next_cursor):
+            st.session_state.history_anchor = (member_id, next_cursor)
+            st.session_state.history_pages = []
+            st.session_state.history_cursor = next_cursor
+
+        if st.session_state.history_pages:
+            payments_df = pd.concat([payments_df] + st.session_state.history_pages, ignore_index=True)
+
+        if not payments_df.empty:
+            # Format columns for better client readability
+            payments_df = payments_df.rename(columns={
+                'payment_id': 'Payment ID',
+                'amount': 'Amount (₹)',
+                'payment_date': 'Date',
+                'mode': 'Mode',
+                'status': 'Status'
+            })
+            st.dataframe(payments_df)
+            st.caption(f"Showing {len(payments_df)} of {payment_summary['payment_count']} payments")
+
+            if st.session_state.history_cursor is not None and st.button("Load more"):
+                page_df, st.session_state.history_cursor = fetch_member_payments_page(
+                    member_id, after=st.session_state.history_cursor
+                )
+                st.session_state.history_pages.append(page_df)
+                st.rerun()
+        else:
+            st.info("No payment history found.")
+
+        st.markdown("---")
+
+        # 3. Visit History (check-ins happen at the turnstiles and the front desk)
+        st.subheader("🚪 Visit History")
+
+        visits_df = fetch_member_checkins(member_id, limit=10)
+        if not visits_df.empty:
+            st.dataframe(visits_df.rename(columns={
+                'checked_in_at': 'Time',
+                'gate': 'Gate',
+                'result': 'Result'
+            })[['Time', 'Gate', 'Result']])
+        else:
+            st.info("No check-ins yet.")
+finally:
+    page_timer.stop()
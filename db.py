@@ -1,149 +1,1601 @@
-import mysql.connector
+import csv
+import io
+import numpy as np
 import pandas as pd
-import uuid
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
 from datetime import date, timedelta
 
-# ------------------- MySQL Connection -------------------
+import backends
+import metrics
+
+# ------------------- Database Connection -------------------
+DB_CONFIG = {
+    "host": os.environ.get("GYM_DB_HOST", "localhost"),
+    "user": os.environ.get("GYM_DB_USER", "root"),
+    "password": os.environ.get("GYM_DB_PASSWORD", "root@123"),
+    "database": os.environ.get("GYM_DB_NAME", "gym_db"),
+}
+
+# GYM_DB_BACKEND=sqlite runs on an embedded database file (GYM_DB_PATH)
+# instead of a MySQL server; see backends.py.
+DB_BACKEND = os.environ.get("GYM_DB_BACKEND", "mysql")
+SQLITE_PATH = os.environ.get("GYM_DB_PATH", "gym.db")
+BACKEND = backends.create_backend(DB_BACKEND, DB_CONFIG, SQLITE_PATH)
+
+# Pool tuning: max open connections, seconds to wait for a free one, and how
+# long a connection may sit idle before it is pinged again on checkout.
+POOL_SIZE = int(os.environ.get("GYM_DB_POOL_SIZE", "5"))
+POOL_TIMEOUT = float(os.environ.get("GYM_DB_POOL_TIMEOUT", "10"))
+POOL_PING_AFTER = float(os.environ.get("GYM_DB_POOL_PING_AFTER", "30"))
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes free within the checkout timeout."""
+
+
+class TimedCursor:
+    """
+    Cursor proxy recording statement latency, row counts and slow queries
+    (see metrics.py). Statements pass through the backend's prepare() first.
+    """
+
+    def __init__(self, raw, backend):
+        self._raw = raw
+        self._backend = backend
+        self._operation = ""
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._raw.close()
+        return False
+
+    def _timed(self, method, operation, *args, **kwargs):
+        self._operation = operation
+        sql, args = self._backend.prepare(operation, args)
+        start = time.perf_counter()
+        try:
+            return method(sql, *args, **kwargs)
+        finally:
+            # rowcount is -1 for a SELECT until its rows are fetched
+            metrics.record_statement(operation, time.perf_counter() - start, self._raw.rowcount)
+
+    def execute(self, operation, *args, **kwargs):
+        return self._timed(self._raw.execute, operation, *args, **kwargs)
+
+    def executemany(self, operation, *args, **kwargs):
+        return self._timed(self._raw.executemany, operation, *args, **kwargs)
+
+    def _fetched(self, rows):
+        metrics.REGISTRY.inc("gym_db_rows_fetched_total", len(rows),
+                             statement=metrics.statement_kind(self._operation))
+        return rows
+
+    def fetchall(self):
+        return self._fetched(self._raw.fetchall())
+
+    def fetchmany(self, *args, **kwargs):
+        return self._fetched(self._raw.fetchmany(*args, **kwargs))
+
+    def fetchone(self):
+        row = self._raw.fetchone()
+        self._fetched([] if row is None else [row])
+        return row
+
+
+class PooledConnection:
+    """Proxy around a pooled database connection; close() hands it back to the pool."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def _connection(self):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise self._pool.backend.Error("Connection already returned to the pool")
+        return raw
+
+    def __getattr__(self, name):
+        return getattr(self._connection(), name)
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._connection().cursor(*args, **kwargs), self._pool.backend)
+
+    def start_transaction(self):
+        self._pool.backend.begin(self._connection())
+
+    def commit(self):
+        self._connection().commit()
+        if self._pool.on_commit is not None:
+            self._pool.on_commit()
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.release(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __del__(self):
+        # Safety net for callers that forget close() on an error path
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Bounded pool of database connections with checkout timeout and usage
+    stats. Connections come from `backend`, or from MySQL with `config`.
+    """
+
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT, ping_after=POOL_PING_AFTER, on_commit=None,
+                 backend=None, **config):
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.on_commit = on_commit
+        self.backend = backend or backends.MySQLBackend(config or dict(DB_CONFIG))
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._health_failures = 0
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def _healthy(self, raw, idle_since):
+        if time.monotonic() - idle_since < self.ping_after:
+            return True
+        try:
+            self.backend.ping(raw)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        start = time.perf_counter()
+        waited = False
+
+        while True:
+            try:
+                raw, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._created < self.size
+                    if can_create:
+                        self._created += 1
+
+                if can_create:
+                    try:
+                        raw = self.backend.connect()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                    break
+
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - start)
+                try:
+                    raw, idle_since = self._idle.get(timeout=max(remaining, 0))
+                except queue.Empty:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No database connection free after {self.timeout}s (pool size {self.size})"
+                    )
+
+            if self._healthy(raw, idle_since):
+                break
+
+            with self._lock:
+                self._health_failures += 1
+            self._discard(raw)
+
+        elapsed = time.perf_counter() - start
+        metrics.REGISTRY.observe("gym_db_connection_acquire_seconds", elapsed)
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+                self._wait_time += elapsed
+
+        return PooledConnection(self, raw)
+
+    def release(self, raw):
+        with self._lock:
+            self._in_use -= 1
+
+        # Leave no open transaction (or other session state) behind
+        try:
+            self.backend.reset(raw)
+        except Exception:
+            self._discard(raw)
+            return
+
+        self._idle.put((raw, time.monotonic()))
+
+    def close_all(self):
+        while True:
+            try:
+                raw, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(raw)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._created,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time_total": self._wait_time,
+                "wait_time_avg": self._wait_time / self._waits if self._waits else 0.0,
+                "timeouts": self._timeouts,
+                "health_check_failures": self._health_failures,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(POOL_SIZE, POOL_TIMEOUT, POOL_PING_AFTER, on_commit=_note_write,
+                                       backend=BACKEND)
+    return _pool
+
+
 def get_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="root@123",
-        database="gym_db"
+    """Borrow a connection from the shared pool; close() returns it."""
+    return _get_pool().acquire()
+
+
+def pool_stats():
+    return _get_pool().stats()
+
+
+def close_pool():
+    global _pool, _replica_pool
+    with _pool_lock:
+        for pool in (_pool, _replica_pool):
+            if pool is not None:
+                pool.close_all()
+        _pool = _replica_pool = None
+
+
+def use_backend(backend):
+    """Point db.py at another backend (e.g. a benchmark database); pooled connections are closed."""
+    global BACKEND
+    close_pool()
+    BACKEND = backend
+
+# ------------------- READ REPLICA -------------------
+# With GYM_DB_REPLICA_HOST set, read-only helpers borrow connections through
+# get_read_connection(), which prefers the replica. Reads fall back to the
+# primary when the replica is unreachable, not replicating or more than
+# REPLICA_MAX_LAG seconds behind, and for REPLICA_MAX_LAG seconds after this
+# process commits a write or any process writes the member being read - a
+# replica within the lag limit has caught up with those writes by then.
+REPLICA_HOST = os.environ.get("GYM_DB_REPLICA_HOST")
+REPLICA_CONFIG = None
+if REPLICA_HOST and DB_BACKEND == "mysql":
+    REPLICA_CONFIG = {
+        **DB_CONFIG,
+        "host": REPLICA_HOST,
+        "port": int(os.environ.get("GYM_DB_REPLICA_PORT", "3306")),
+        "user": os.environ.get("GYM_DB_REPLICA_USER", DB_CONFIG["user"]),
+        "password": os.environ.get("GYM_DB_REPLICA_PASSWORD", DB_CONFIG["password"]),
+        "connection_timeout": int(os.environ.get("GYM_DB_REPLICA_CONNECT_TIMEOUT", "2")),
+    }
+REPLICA_MAX_LAG = float(os.environ.get("GYM_DB_REPLICA_MAX_LAG", "5"))
+REPLICA_CHECK_INTERVAL = float(os.environ.get("GYM_DB_REPLICA_CHECK_INTERVAL", "5"))
+
+
+class ReplicaMonitor:
+    """Caches whether the replica is usable; re-checks lag at most every `interval` seconds."""
+
+    def __init__(self, pool, max_lag=REPLICA_MAX_LAG, interval=REPLICA_CHECK_INTERVAL):
+        self.pool = pool
+        self.max_lag = max_lag
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._checked = None
+        self._healthy = False
+        self.lag = None
+        self.reason = "not checked yet"
+        self.fallbacks = 0
+
+    def _replication_lag(self):
+        conn = self.pool.acquire()
+        try:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except self.pool.backend.Error:
+                cursor.execute("SHOW SLAVE STATUS")   # MySQL before 8.0.22
+            status = cursor.fetchone()
+            cursor.close()
+        finally:
+            conn.close()
+
+        if status is None:
+            raise LookupError("server is not replicating")
+        lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+        if lag is None:
+            raise LookupError("replication is stopped")
+        return float(lag)
+
+    def _set(self, healthy, reason, lag=None):
+        self._healthy, self.reason, self.lag = healthy, reason, lag
+        self._checked = time.monotonic()
+
+    def available(self):
+        if self._checked is not None and time.monotonic() - self._checked < self.interval:
+            return self._healthy
+        # One thread re-checks; the others keep using the last answer
+        if not self._lock.acquire(blocking=False):
+            return self._healthy
+        try:
+            lag = self._replication_lag()
+            if lag > self.max_lag:
+                self._set(False, f"lagging {lag:.0f}s behind", lag)
+            else:
+                self._set(True, "ok", lag)
+        except Exception as e:
+            self._set(False, f"unavailable: {e}")
+        finally:
+            self._lock.release()
+        return self._healthy
+
+    def mark_down(self, error):
+        self.fallbacks += 1
+        self._set(False, f"unavailable: {error}")
+
+    def status(self):
+        return {"healthy": self._healthy, "lag_seconds": self.lag, "reason": self.reason,
+                "fallbacks": self.fallbacks}
+
+
+_replica_pool = None
+_replica_monitor = None
+_last_write = None          # monotonic time of this process's last commit
+_member_writes = {}         # member_id -> monotonic time the write was seen
+
+
+def _note_write():
+    global _last_write
+    _last_write = time.monotonic()
+
+
+def _get_replica():
+    global _replica_pool, _replica_monitor
+    if _replica_pool is None:
+        with _pool_lock:
+            if _replica_pool is None:
+                _replica_pool = ConnectionPool(POOL_SIZE, POOL_TIMEOUT, POOL_PING_AFTER,
+                                               backend=backends.MySQLBackend(REPLICA_CONFIG))
+                _replica_monitor = ReplicaMonitor(_replica_pool)
+    return _replica_pool, _replica_monitor
+
+
+def _remember_member_writes(member_ids):
+    now = time.monotonic()
+    if len(_member_writes) > 10_000:
+        for member_id, written in list(_member_writes.items()):
+            if now - written >= REPLICA_MAX_LAG:
+                _member_writes.pop(member_id, None)
+    for member_id in member_ids:
+        _member_writes[int(member_id)] = now
+
+
+def _member_recently_written(member_id):
+    _apply_member_journal()
+    written = _member_writes.get(int(member_id))
+    if written is None:
+        return False
+    if time.monotonic() - written < REPLICA_MAX_LAG:
+        return True
+    _member_writes.pop(int(member_id), None)
+    return False
+
+
+def use_replica(member_id=None):
+    """Whether a read (about `member_id`, if given) may be served by the replica right now."""
+    if REPLICA_CONFIG is None:
+        return False
+    if _last_write is not None and time.monotonic() - _last_write < REPLICA_MAX_LAG:
+        return False
+    if member_id is not None and _member_recently_written(member_id):
+        return False
+    return _get_replica()[1].available()
+
+
+def get_read_connection(member_id=None):
+    """
+    Borrow a connection for a read-only query: the replica when use_replica()
+    allows it, otherwise (or if the replica fails to connect) the primary.
+    """
+    if use_replica(member_id):
+        pool, monitor = _get_replica()
+        try:
+            return pool.acquire()
+        except (pool.backend.Error, PoolTimeoutError) as e:
+            monitor.mark_down(e)
+    return get_connection()
+
+
+def mark_replica_down(error):
+    """Stop routing reads to the replica until its next health check."""
+    if REPLICA_CONFIG is not None:
+        _get_replica()[1].mark_down(error)
+
+
+def replica_status():
+    """Routing state for diagnostics; None when no replica is configured."""
+    if REPLICA_CONFIG is None:
+        return None
+    monitor = _get_replica()[1]
+    monitor.available()
+    return {"host": REPLICA_CONFIG["host"], **monitor.status(), **_replica_pool.stats()}
+
+# ------------------- INSERT MEMBER -------------------
+def insert_member(name, age, gender, contact, membership_type, trainer_id):
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+
+        # Ensure gender format
+        gender_char = gender[0].upper() if gender else None  
+
+        # Fix trainer ID → convert '' or None to NULL
+        trainer_id = int(trainer_id) if trainer_id not in ("", None) else None
+
+        # Fetch membership validity
+        cursor.execute(
+            "SELECT validity_months FROM Membership_Types WHERE membership_type=%s",
+            (membership_type,)
+        )
+        validity = cursor.fetchone()
+
+        if not validity:
+            raise ValueError(f"Membership type '{membership_type}' not found!")
+
+        months = int(validity[0])
+
+        start_date = date.today()
+        end_date = start_date + timedelta(days=30 * months)
+
+        # Insert member
+        cursor.execute("""
+            INSERT INTO Members (name, age, gender, contact, membership_type, start_date, end_date, trainer_id)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, (name, age, gender_char, contact, membership_type, start_date, end_date, trainer_id))
+
+        member_id = cursor.lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+
+    invalidate_member(member_id)
+    return member_id
+
+# ------------------- LATEST PAYMENT SUMMARY -------------------
+# Latest_Payments keeps one row per member: the payment that ranks first by
+# (payment_date DESC, payment_id DESC). Every write path updates it inside its
+# own transaction so listings can join it instead of ranking all Payments.
+LATEST_PAYMENTS_REBUILD = """
+    INSERT INTO Latest_Payments (member_id, payment_id, amount, payment_date, mode, status)
+    SELECT member_id, payment_id, amount, payment_date, mode, status
+    FROM (
+        SELECT *,
+            ROW_NUMBER() OVER (PARTITION BY member_id
+                               ORDER BY payment_date DESC, payment_id DESC) AS rn
+        FROM Payments
+        WHERE member_id IS NOT NULL
+    ) sub
+    WHERE rn = 1
+"""
+
+
+def _record_latest_payment(cursor, member_id, payment_id, amount, payment_date, mode, status):
+    """Make this payment the member's latest unless a later one is already recorded."""
+    # One upsert: concurrent first payments of a member both reach the row
+    # and the later (payment_date, payment_id) wins whichever commits first
+    upsert = BACKEND.upsert_newer("Latest_Payments", ("member_id",), ("amount", "mode", "status"),
+                                  ("payment_date", "payment_id"))
+    cursor.execute(f"""
+        INSERT INTO Latest_Payments (member_id, payment_id, amount, payment_date, mode, status)
+        VALUES (%s,%s,%s,%s,%s,%s)
+        {upsert}
+    """, (member_id, payment_id, amount, payment_date, mode, status))
+
+
+def rebuild_latest_payments(conn=None):
+    """Recompute Latest_Payments from Payments in one transaction; returns the row count."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        conn.start_transaction()
+        cursor.execute("DELETE FROM Latest_Payments")
+        cursor.execute(LATEST_PAYMENTS_REBUILD)
+        rows = cursor.rowcount
+        conn.commit()
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def verify_latest_payments():
+    """Return members whose Latest_Payments row disagrees with Payments (empty when in sync)."""
+    query = """
+        SELECT
+            COALESCE(e.member_id, s.member_id) AS member_id,
+            e.payment_id AS expected_payment_id,
+            s.payment_id AS stored_payment_id
+        FROM (
+            SELECT member_id, payment_id, amount, payment_date, mode, status
+            FROM (
+                SELECT *,
+                    ROW_NUMBER() OVER (PARTITION BY member_id
+                                       ORDER BY payment_date DESC, payment_id DESC) AS rn
+                FROM Payments
+                WHERE member_id IS NOT NULL
+            ) sub
+            WHERE rn = 1
+        ) e
+        LEFT JOIN Latest_Payments s ON s.member_id = e.member_id
+        WHERE s.member_id IS NULL
+           OR NOT (s.payment_id <=> e.payment_id AND s.amount <=> e.amount
+                   AND s.payment_date <=> e.payment_date AND s.mode <=> e.mode
+                   AND s.status <=> e.status)
+        UNION ALL
+        SELECT s.member_id, NULL, s.payment_id
+        FROM Latest_Payments s
+        LEFT JOIN Payments p ON p.payment_id = s.payment_id
+        WHERE p.payment_id IS NULL
+    """
+    conn = get_connection()
+    try:
+        df = pd.read_sql(query, conn)
+    finally:
+        conn.close()
+    return df
+
+# ------------------- REVENUE ROLLUPS -------------------
+# Revenue_Daily and Revenue_Monthly hold payment counts and amounts per
+# (period, plan, mode, status). Every payment write path adds its rows inside
+# its own transaction, so revenue charts read a few hundred rollup rows
+# instead of scanning Payments. Payments.membership_type records the plan a
+# payment was for; bulk loads leave it NULL until their rows are rolled up.
+REVENUE_TABLES = {"day": "Revenue_Daily", "month": "Revenue_Monthly"}
+REVENUE_DIMENSIONS = ("membership_type", "mode", "status")
+
+
+def _record_revenue(cursor, where, params=(), sign=1):
+    """Add (sign=1) or remove (sign=-1) the Payments rows matching `where` in both rollups."""
+    for grain, table in REVENUE_TABLES.items():
+        period = "p.payment_date" if grain == "day" else BACKEND.month_start("p.payment_date")
+        upsert = BACKEND.upsert_add(table, ("period",) + REVENUE_DIMENSIONS, ("payments", "amount"))
+        cursor.execute(f"""
+            INSERT INTO {table} (period, membership_type, mode, status, payments, amount)
+            SELECT * FROM (
+                SELECT {period} AS period,
+                       COALESCE(p.membership_type, m.membership_type, '') AS membership_type,
+                       COALESCE(p.mode, '') AS mode,
+                       COALESCE(p.status, '') AS status,
+                       %s * COUNT(*) AS payments,
+                       %s * COALESCE(SUM(p.amount), 0) AS amount
+                FROM Payments p
+                LEFT JOIN Members m ON m.member_id = p.member_id
+                WHERE p.payment_date IS NOT NULL AND ({where})
+                GROUP BY 1, 2, 3, 4
+            ) s
+            {upsert}
+        """, (sign, sign, *params))
+
+
+def _stamp_payment_plans(cursor):
+    """Give bulk-loaded payments (plan still NULL) their member's current plan."""
+    cursor.execute("""
+        UPDATE Payments
+        SET membership_type = COALESCE(
+            (SELECT m.membership_type FROM Members m WHERE m.member_id = Payments.member_id), '')
+        WHERE membership_type IS NULL
+    """)
+    return cursor.rowcount
+
+
+def roll_up_loaded_payments(conn=None):
+    """
+    Add payments written outside db.py (the Project1.py ETL) to the rollups
+    and stamp their plan, in one transaction. Only those rows are read, so a
+    load costs the same however much history is already rolled up. Returns
+    the number of payments added.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        conn.start_transaction()
+        _record_revenue(cursor, "p.membership_type IS NULL")
+        rows = _stamp_payment_plans(cursor)
+        conn.commit()
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def rebuild_revenue_rollups(conn=None):
+    """Recompute both rollups from Payments in one transaction; returns the payment count."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        conn.start_transaction()
+        _stamp_payment_plans(cursor)
+        for table in REVENUE_TABLES.values():
+            cursor.execute(f"DELETE FROM {table}")
+        _record_revenue(cursor, "TRUE")
+        cursor.execute("SELECT COALESCE(SUM(payments), 0) FROM Revenue_Monthly")
+        rows = int(cursor.fetchone()[0])
+        conn.commit()
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def fetch_revenue(grain="month", start=None, end=None, by=None, **filters):
+    """
+    Revenue per period from the rollups. `grain` is "day" or "month"; `start`
+    and `end` bound the period (inclusive); `by` splits each period by plan,
+    mode or status; `filters` restrict those same dimensions, e.g.
+    status="Paid". Returns a DataFrame with period, [by], payments and amount.
+    """
+    table = REVENUE_TABLES[grain]
+    group = ["period"]
+    if by is not None:
+        if by not in REVENUE_DIMENSIONS:
+            raise ValueError(f"Cannot break revenue down by '{by}'")
+        group.append(by)
+
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("period >= %s")
+        params.append(start)
+    if end is not None:
+        clauses.append("period <= %s")
+        params.append(end)
+    for column, value in filters.items():
+        if column not in REVENUE_DIMENSIONS:
+            raise ValueError(f"Unknown revenue filter '{column}'")
+        if value not in (None, "All"):
+            clauses.append(f"{column} = %s")
+            params.append(value)
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    columns = ", ".join(group)
+    query = f"""
+        SELECT {columns}, SUM(payments) AS payments, SUM(amount) AS amount
+        FROM {table}
+        {where}
+        GROUP BY {columns}
+        HAVING SUM(payments) <> 0
+        ORDER BY {columns}
+    """
+
+    conn = get_read_connection()
+    try:
+        df = pd.read_sql(query, conn, params=params)
+    finally:
+        conn.close()
+    df["payments"] = df["payments"].astype(int)
+    df["amount"] = df["amount"].astype(float)
+    return df
+
+# ------------------- PAYMENT IDS -------------------
+# Payment IDs are "P" + 9 base-36 digits of a counter kept in Id_Sequences.
+# Each process reserves a block of numbers with one atomic UPDATE, so IDs are
+# unique across every app instance sharing the database, increase over time
+# (inserts append to the end of the Payments primary key) and still fit
+# Payments.payment_id VARCHAR(10). They cannot clash with the older 7-char
+# random IDs.
+PAYMENT_ID_BLOCK = int(os.environ.get("GYM_PAYMENT_ID_BLOCK", "100"))
+_ID_DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_ID_WIDTH = 9
+
+
+def _reserve_id_block(sequence, size):
+    """Atomically advance a sequence by `size`; returns the first reserved number."""
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        # The UPDATE holds the row's write lock until commit, so the value
+        # read back is this transaction's own
+        cursor.execute("UPDATE Id_Sequences SET next_value = next_value + %s WHERE name = %s", (size, sequence))
+        if cursor.rowcount == 0:
+            cursor.execute(
+                "INSERT IGNORE INTO Id_Sequences (name, next_value) VALUES (%s, 1)", (sequence,)
+            )
+            cursor.execute(
+                "UPDATE Id_Sequences SET next_value = next_value + %s WHERE name = %s", (size, sequence)
+            )
+        cursor.execute("SELECT next_value FROM Id_Sequences WHERE name = %s", (sequence,))
+        end = cursor.fetchone()[0]
+        conn.commit()
+    finally:
+        conn.close()
+    return end - size
+
+
+class IdGenerator:
+    """Hands out prefixed, time-ordered IDs from blocks reserved in Id_Sequences."""
+
+    def __init__(self, prefix, sequence, block_size=PAYMENT_ID_BLOCK, reserve=_reserve_id_block):
+        self.prefix = prefix
+        self.sequence = sequence
+        self.block_size = block_size
+        self.reserve = reserve
+        self._lock = threading.Lock()
+        self._next = self._limit = 0
+        self._pid = None
+
+    def _format(self, value):
+        digits = []
+        while value:
+            value, rem = divmod(value, 36)
+            digits.append(_ID_DIGITS[rem])
+        return self.prefix + "".join(reversed(digits)).rjust(_ID_WIDTH, "0")
+
+    def take(self, count=1):
+        """Return `count` new IDs; large requests reserve one block of exactly that size."""
+        with self._lock:
+            # A forked child must not reuse the block its parent reserved
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._next = self._limit = 0
+
+            available = self._limit - self._next
+            if available >= count:
+                start = self._next
+                self._next += count
+                values = range(start, start + count)
+            elif count >= self.block_size:
+                start = self.reserve(self.sequence, count)
+                values = range(start, start + count)
+            else:
+                values = list(range(self._next, self._limit))
+                self._next = self.reserve(self.sequence, self.block_size)
+                self._limit = self._next + self.block_size
+                needed = count - len(values)
+                values.extend(range(self._next, self._next + needed))
+                self._next += needed
+
+        return [self._format(v) for v in values]
+
+    def __call__(self):
+        return self.take(1)[0]
+
+
+new_payment_id = IdGenerator("P", "payment_id")
+
+
+def new_payment_ids(count):
+    return new_payment_id.take(count)
+
+# ------------------- INSERT PAYMENT -------------------
+def insert_payment(member_id, amount, mode, status='Paid'):
+    # Mint the ID first: a block reservation borrows its own connection
+    payment_id = new_payment_id()
+    payment_date = date.today()
+
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            INSERT INTO Payments (payment_id, member_id, amount, payment_date, mode, status, membership_type)
+            VALUES (%s,%s,%s,%s,%s,%s, (SELECT COALESCE(membership_type, '') FROM Members WHERE member_id=%s))
+        """, (payment_id, member_id, amount, payment_date, mode, status, member_id))
+        _record_latest_payment(cursor, member_id, payment_id, amount, payment_date, mode, status)
+        _record_revenue(cursor, "p.payment_id = %s", (payment_id,))
+
+        conn.commit()
+    finally:
+        conn.close()
+
+    invalidate_member(member_id)
+    return payment_id
+
+
+# ------------------- REGISTER MEMBER -------------------
+class DuplicateMemberError(ValueError):
+    """Raised when a member with the same name and contact is already registered."""
+
+
+def register_member(name, age, gender, contact, membership_type, trainer_id, mode, status='Paid', amount=None):
+    """
+    Register a member and record the initial payment (plan price unless
+    `amount` is given) in one connection and one transaction. Duplicates are
+    rejected by the unique (name, contact) index, not a separate SELECT.
+
+    Returns (member_id, payment_id).
+    """
+    plans = fetch_membership_types().set_index("membership_type")
+    if membership_type not in plans.index:
+        raise ValueError(f"Membership type '{membership_type}' not found!")
+
+    months = int(plans.at[membership_type, "validity_months"])
+    if amount is None:
+        amount = plans.at[membership_type, "price"]
+    amount = _sql_value(amount)
+
+    gender_char = gender[0].upper() if gender else None
+    trainer_id = int(trainer_id) if trainer_id not in ("", None) else None
+    start_date = date.today()
+    end_date = start_date + timedelta(days=30 * months)
+    payment_id = new_payment_id()
+
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                INSERT INTO Members (name, age, gender, contact, membership_type, start_date, end_date, trainer_id)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """, (name, age, gender_char, contact, membership_type, start_date, end_date, trainer_id))
+        except BACKEND.IntegrityError as e:
+            if BACKEND.is_duplicate_key(e):
+                raise DuplicateMemberError(f"{name} ({contact}) is already registered") from e
+            raise
+
+        member_id = cursor.lastrowid
+
+        cursor.execute("""
+            INSERT INTO Payments (payment_id, member_id, amount, payment_date, mode, status, membership_type)
+            VALUES (%s,%s,%s,%s,%s,%s,%s)
+        """, (payment_id, member_id, amount, start_date, mode, status, membership_type))
+        cursor.execute("""
+            INSERT INTO Latest_Payments (payment_id, member_id, amount, payment_date, mode, status)
+            VALUES (%s,%s,%s,%s,%s,%s)
+        """, (payment_id, member_id, amount, start_date, mode, status))
+        _record_revenue(cursor, "p.payment_id = %s", (payment_id,))
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    # A failed portal login may have cached an empty snapshot for this ID
+    invalidate_member(member_id)
+    return member_id, payment_id
+
+
+# ---------------------------------------------------------------
+# 📦 BULK REGISTRATION → members + initial payments in batches
+# ---------------------------------------------------------------
+BULK_CHUNK_SIZE = 500
+
+
+def _text(value):
+    return "" if value is None or pd.isna(value) else str(value).strip()
+
+
+def _number_text(contact):
+    """Normalize a number read from CSV/forms (e.g. contact 98765.0 → '98765')."""
+    if contact is None or pd.isna(contact):
+        return ""
+    if isinstance(contact, float) and contact.is_integer():
+        contact = int(contact)
+    return str(contact).strip()
+
+
+def _insert_registrations(cursor, rows):
+    """Insert prepared registrations; returns {row number: member_id}."""
+    cursor.executemany("""
+        INSERT INTO Members (name, age, gender, contact, membership_type, start_date, end_date, trainer_id)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, [(r["name"], r["age"], r["gender"], r["contact"], r["membership_type"],
+           r["start_date"], r["end_date"], r["trainer_id"]) for r in rows])
+
+    # Multi-row inserts may not get consecutive auto-increment IDs, so map
+    # them back through the (name, contact) index.
+    placeholders = ", ".join(["(%s, %s)"] * len(rows))
+    cursor.execute(
+        f"SELECT member_id, name, contact FROM Members WHERE (name, contact) IN ({placeholders})",
+        [v for r in rows for v in (r["name"], r["contact"])]
+    )
+    ids = {(name.lower(), str(contact)): member_id for member_id, name, contact in cursor.fetchall()}
+    member_ids = {r["row"]: ids[r["key"]] for r in rows}
+
+    payments = [(r["payment_id"], member_ids[r["row"]], r["amount"], r["start_date"], r["mode"], r["status"])
+                for r in rows]
+    cursor.executemany("""
+        INSERT INTO Payments (payment_id, member_id, amount, payment_date, mode, status, membership_type)
+        VALUES (%s,%s,%s,%s,%s,%s,%s)
+    """, [p + (r["membership_type"],) for p, r in zip(payments, rows)])
+    cursor.executemany("""
+        INSERT INTO Latest_Payments (payment_id, member_id, amount, payment_date, mode, status)
+        VALUES (%s,%s,%s,%s,%s,%s)
+    """, payments)
+    placeholders = ", ".join(["%s"] * len(rows))
+    _record_revenue(cursor, f"p.payment_id IN ({placeholders})", [r["payment_id"] for r in rows])
+    return member_ids
+
+
+def bulk_register_members(registrations, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Register many members with their initial payment.
+
+    `registrations` is a DataFrame (or list of dicts) with columns name, age,
+    gender, contact, membership_type, trainer_id and optional amount (defaults
+    to the plan price), mode ('Cash') and status ('Paid'). Rows are inserted
+    in chunked transactions; bad rows are reported instead of aborting.
+
+    Returns (registered DataFrame, failures DataFrame).
+    """
+    df = pd.DataFrame(registrations)
+    plans = fetch_membership_types().set_index("membership_type")
+    trainer_ids = {int(t) for t in fetch_trainers()["trainer_id"]}
+    today = date.today()
+
+    prepared, failures, seen = [], [], set()
+
+    for row_no, rec in enumerate(df.to_dict("records"), start=1):
+        name = _text(rec.get("name"))
+        contact = _number_text(rec.get("contact"))
+        plan = rec.get("membership_type")
+        trainer = pd.to_numeric(rec.get("trainer_id"), errors="coerce")
+        key = (name.lower(), contact.lstrip("0") or "0")
+
+        reason = None
+        if not name or not contact:
+            reason = "Name and contact are required"
+        elif not contact.isdigit():
+            reason = f"Invalid contact '{contact}'"
+        elif plan not in plans.index:
+            reason = f"Unknown membership type '{plan}'"
+        elif _text(rec.get("trainer_id")) and (pd.isna(trainer) or int(trainer) not in trainer_ids):
+            reason = f"Unknown trainer '{_number_text(rec.get('trainer_id'))}'"
+        elif key in seen:
+            reason = "Duplicate of an earlier row in this file"
+
+        if reason:
+            failures.append({"row": row_no, "name": name, "contact": contact, "reason": reason})
+            continue
+        seen.add(key)
+
+        age = pd.to_numeric(rec.get("age"), errors="coerce")
+        amount = pd.to_numeric(rec.get("amount"), errors="coerce")
+        gender = _text(rec.get("gender"))
+        prepared.append({
+            "row": row_no,
+            "key": key,
+            "name": name,
+            "age": None if pd.isna(age) else int(age),
+            "gender": gender[0].upper() if gender else None,
+            "contact": contact,
+            "membership_type": plan,
+            "start_date": today,
+            "end_date": today + timedelta(days=30 * int(plans.at[plan, "validity_months"])),
+            "trainer_id": None if pd.isna(trainer) else int(trainer),
+            "amount": _sql_value(plans.at[plan, "price"] if pd.isna(amount) else amount),
+            "mode": _text(rec.get("mode")) or "Cash",
+            "status": _text(rec.get("status")) or "Paid",
+        })
+
+    for reg, payment_id in zip(prepared, new_payment_ids(len(prepared))):
+        reg["payment_id"] = payment_id
+
+    registered = []
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+
+        for start in range(0, len(prepared), chunk_size):
+            chunk = prepared[start:start + chunk_size]
+
+            # Skip people who are already members
+            placeholders = ", ".join(["(%s, %s)"] * len(chunk))
+            cursor.execute(
+                f"SELECT name, contact FROM Members WHERE (name, contact) IN ({placeholders})",
+                [v for r in chunk for v in (r["name"], r["contact"])]
+            )
+            existing = {(name.lower(), str(contact)) for name, contact in cursor.fetchall()}
+            for r in chunk:
+                if r["key"] in existing:
+                    failures.append({"row": r["row"], "name": r["name"], "contact": r["contact"],
+                                     "reason": "Already registered"})
+            chunk = [r for r in chunk if r["key"] not in existing]
+            if not chunk:
+                continue
+
+            try:
+                member_ids = _insert_registrations(cursor, chunk)
+                conn.commit()
+                batches = [(chunk, member_ids)]
+            except BACKEND.Error:
+                conn.rollback()
+                # Retry row by row so one bad record only fails itself
+                batches = []
+                for r in chunk:
+                    try:
+                        member_ids = _insert_registrations(cursor, [r])
+                        conn.commit()
+                        batches.append(([r], member_ids))
+                    except BACKEND.Error as e:
+                        conn.rollback()
+                        failures.append({"row": r["row"], "name": r["name"], "contact": r["contact"],
+                                         "reason": BACKEND.error_message(e)})
+
+            for rows, member_ids in batches:
+                registered.extend({"row": r["row"], "member_id": member_ids[r["row"]], "name": r["name"],
+                                   "payment_id": r["payment_id"]} for r in rows)
+    finally:
+        conn.close()
+
+    if registered:
+        invalidate_member(*(r["member_id"] for r in registered))
+
+    registered_df = pd.DataFrame(registered, columns=["row", "member_id", "name", "payment_id"])
+    failures_df = pd.DataFrame(failures, columns=["row", "name", "contact", "reason"]).sort_values("row")
+    return registered_df, failures_df.reset_index(drop=True)
+
+
+# ---------------------------------------------------------------
+# 🟢 NEW IMPROVED FUNCTION → FETCH MEMBERS (All + Filter Both)
+# ---------------------------------------------------------------
+MEMBER_COLUMNS = """
+        SELECT 
+            m.member_id,
+            m.name AS Member_Name,
+            m.age,
+            m.gender,
+            m.contact,
+            m.membership_type,
+            m.start_date,
+            m.end_date,
+            t.name AS Trainer_Name,
+            t.specialization AS Trainer_Specialization,
+            p.amount AS Payment_Amount,
+            p.status AS Payment_Status,
+            p.mode AS Payment_Mode
+"""
+
+# Latest payment per member comes from the maintained Latest_Payments summary
+LATEST_PAYMENT_JOIN = """
+        LEFT JOIN Latest_Payments p ON m.member_id = p.member_id
+"""
+
+MEMBERS_FROM = """
+        FROM Members m
+        LEFT JOIN Trainers t ON m.trainer_id = t.trainer_id
+""" + LATEST_PAYMENT_JOIN
+
+# Payment status filter value for members with no payment on record
+NO_PAYMENT = "No Payment"
+
+# Sort keys accepted by fetch_members_page → (SQL column, DataFrame column)
+MEMBER_SORT_KEYS = {
+    "member_id": ("m.member_id", "member_id"),
+    "name": ("m.name", "Member_Name"),
+    "start_date": ("m.start_date", "start_date"),
+    "end_date": ("m.end_date", "end_date"),
+}
+
+
+def _sql_value(value):
+    """Turn a pandas/numpy scalar into something the database driver can bind."""
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value.item() if hasattr(value, "item") else value
+
+
+def _member_filters(membership_type="All", trainer_id=None, payment_status=None,
+                    expires_within_days=None, name_prefix=None, end_between=None):
+    clauses, params = [], []
+
+    if membership_type not in (None, "All"):
+        clauses.append("m.membership_type = %s")
+        params.append(membership_type)
+
+    if trainer_id not in (None, "", "All"):
+        clauses.append("m.trainer_id = %s")
+        params.append(int(trainer_id))
+
+    if payment_status not in (None, "All"):
+        if payment_status == NO_PAYMENT:
+            clauses.append("p.payment_id IS NULL")
+        else:
+            clauses.append("p.status = %s")
+            params.append(payment_status)
+
+    if expires_within_days is not None:
+        today = date.today()
+        clauses.append("m.end_date BETWEEN %s AND %s")
+        params.extend([today, today + timedelta(days=int(expires_within_days))])
+
+    if end_between is not None:
+        clauses.append("m.end_date BETWEEN %s AND %s")
+        params.extend(end_between)
+
+    if name_prefix:
+        escaped = name_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        clauses.append("m.name LIKE %s")
+        params.append(escaped + "%")
+
+    return clauses, params
+
+
+def _keyset_clause(column, cursor, descending):
+    """WHERE fragment resuming after cursor=(sort value, member_id); MySQL sorts NULLs first."""
+    value, last_id = cursor
+
+    if column == "m.member_id":
+        return ("m.member_id < %s" if descending else "m.member_id > %s"), [last_id]
+
+    if not descending:
+        if value is None:
+            return f"(({column} IS NULL AND m.member_id > %s) OR {column} IS NOT NULL)", [last_id]
+        return f"({column} > %s OR ({column} = %s AND m.member_id > %s))", [value, value, last_id]
+
+    if value is None:
+        return f"({column} IS NULL AND m.member_id < %s)", [last_id]
+    return f"({column} < %s OR ({column} = %s AND m.member_id < %s) OR {column} IS NULL)", [value, value, last_id]
+
+
+def fetch_members(membership_type="All", **filters):
+    clauses, params = _member_filters(membership_type, **filters)
+    query = MEMBER_COLUMNS + MEMBERS_FROM
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+
+    conn = get_read_connection()
+    try:
+        df = pd.read_sql(query, conn, params=tuple(params) or None)
+    finally:
+        conn.close()
+    return df
+
+
+# ---------------------------------------------------------------
+# 📄 PAGED MEMBER LISTING → filters + sort + keyset cursor
+# ---------------------------------------------------------------
+def _members_page_queries(page_size, sort_by, descending, after, membership_type, **filters):
+    """Build (count query, count params, page query, page params, cursor column) for one page."""
+    if sort_by not in MEMBER_SORT_KEYS:
+        raise ValueError(f"Unknown sort key '{sort_by}'")
+    sort_column, df_column = MEMBER_SORT_KEYS[sort_by]
+
+    clauses, params = _member_filters(membership_type, **filters)
+    needs_payment = any(c.startswith("p.") for c in clauses)
+
+    count_query = "SELECT COUNT(*) FROM Members m"
+    if needs_payment:
+        count_query += LATEST_PAYMENT_JOIN
+    if clauses:
+        count_query += " WHERE " + " AND ".join(clauses)
+
+    page_clauses, page_params = list(clauses), list(params)
+    if after is not None:
+        clause, extra = _keyset_clause(sort_column, after, descending)
+        page_clauses.append(clause)
+        page_params.extend(extra)
+
+    direction = "DESC" if descending else "ASC"
+    query = MEMBER_COLUMNS + MEMBERS_FROM
+    if page_clauses:
+        query += " WHERE " + " AND ".join(page_clauses)
+    if sort_column == "m.member_id":
+        query += f" ORDER BY m.member_id {direction}"
+    else:
+        query += f" ORDER BY {sort_column} {direction}, m.member_id {direction}"
+    query += " LIMIT %s"
+    page_params.append(int(page_size) + 1)
+
+    return count_query, tuple(params), query, tuple(page_params), df_column
+
+
+def _members_page_result(df, page_size, df_column):
+    """Trim the look-ahead row; returns (page, cursor for the next page or None)."""
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last = df.iloc[-1]
+        next_cursor = (_sql_value(last[df_column]), _sql_value(last["member_id"]))
+    return df, next_cursor
+
+
+def fetch_members_page(page_size=50, sort_by="member_id", descending=False, after=None,
+                       membership_type="All", **filters):
+    """
+    Return (page DataFrame, total matching members, cursor for the next page).
+    Pass the returned cursor back as `after` to continue; it is None on the last page.
+    """
+    count_query, params, query, page_params, df_column = _members_page_queries(
+        page_size, sort_by, descending, after, membership_type, **filters
     )
 
-# ------------------- INSERT MEMBER -------------------
-def insert_member(name, age, gender, contact, membership_type, trainer_id):
-    conn = get_connection()
-    cursor = conn.cursor()
+    conn = get_read_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(count_query, params)
+        total = cursor.fetchone()[0]
+        cursor.close()
 
-    # Ensure gender format
-    gender_char = gender[0].upper() if gender else None  
+        df = pd.read_sql(query, conn, params=page_params)
+    finally:
+        conn.close()
 
-    # Fix trainer ID → convert '' or None to NULL
-    trainer_id = int(trainer_id) if trainer_id not in ("", None) else None
+    df, next_cursor = _members_page_result(df, page_size, df_column)
+    return df, total, next_cursor
 
-    # Fetch membership validity
-    cursor.execute(
-        "SELECT validity_months FROM Membership_Types WHERE membership_type=%s",
-        (membership_type,)
-    )
-    validity = cursor.fetchone()
 
-    if not validity:
-        raise ValueError(f"Membership type '{membership_type}' not found!")
 
-    months = int(validity[0])
+# ---------------------------------------------------------------
+# 📤 STREAMING EXPORTS → members / payments to CSV or Parquet
+# ---------------------------------------------------------------
+# Rows come from one unbuffered cursor (MySQL keeps the result on the
+# server until fetched) EXPORT_BATCH_SIZE at a time and are written out
+# batch by batch, so memory stays flat however large the table is. Each
+# batch becomes one Parquet row group.
+EXPORT_BATCH_SIZE = int(os.environ.get("GYM_EXPORT_BATCH_SIZE", "10000"))
+EXPORT_FORMATS = ("csv", "parquet")
 
-    start_date = date.today()
-    end_date = start_date + timedelta(days=30 * months)
+# Columns of each export with their Parquet (pyarrow) types; amounts are floats
+EXPORT_COLUMNS = {
+    "members": {
+        "member_id": "int64", "Member_Name": "string", "age": "int64", "gender": "string",
+        "contact": "int64", "membership_type": "string", "start_date": "date32", "end_date": "date32",
+        "Trainer_Name": "string", "Trainer_Specialization": "string", "Payment_Amount": "float64",
+        "Payment_Status": "string", "Payment_Mode": "string",
+    },
+    "payments": {
+        "payment_id": "string", "member_id": "int64", "amount": "float64", "payment_date": "date32",
+        "mode": "string", "status": "string", "membership_type": "string",
+    },
+}
 
-    # Insert member
-    cursor.execute("""
-        INSERT INTO Members (name, age, gender, contact, membership_type, start_date, end_date, trainer_id)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-    """, (name, age, gender_char, contact, membership_type, start_date, end_date, trainer_id))
 
-    member_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+def _export_batches(query, params, batch_size, primary=False):
+    """Yield lists of row tuples from one streaming cursor (on the primary if `primary`)."""
+    conn = get_connection() if primary else get_read_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        # Rows an abandoned export left unread are drained when the pool takes it back
+        conn.close()
 
-    return member_id
 
-# ------------------- INSERT PAYMENT -------------------
-def insert_payment(member_id, amount, mode, status='Paid'):
-    conn = get_connection()
-    cursor = conn.cursor()
+def _write_csv(out, columns, batches):
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    written = 0
+    for rows in batches:
+        writer.writerows(rows)
+        written += len(rows)
+    return written
 
-    payment_id = "P" + uuid.uuid4().hex[:6].upper()
-    payment_date = date.today()
 
-    cursor.execute("""
-        INSERT INTO Payments (payment_id, member_id, amount, payment_date, mode, status)
-        VALUES (%s,%s,%s,%s,%s,%s)
-    """, (payment_id, member_id, amount, payment_date, mode, status))
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise RuntimeError("Parquet and Arrow output need pyarrow (pip install pyarrow)") from e
+    return pa
 
-    conn.commit()
-    conn.close()
-    return payment_id
+
+def _arrow_schema(columns):
+    """pyarrow schema from a {column: type name} mapping such as EXPORT_COLUMNS['payments']."""
+    pa = _pyarrow()
+    return pa.schema([(name, getattr(pa, kind)()) for name, kind in columns.items()])
+
+
+def _arrow_batch(schema, rows):
+    """RecordBatch of row tuples in schema order."""
+    pa = _pyarrow()
+    arrays = []
+    for field, values in zip(schema, zip(*rows)):
+        if pa.types.is_floating(field.type):
+            values = [None if v is None else float(v) for v in values]   # DECIMAL arrives as Decimal
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _write_parquet(out, columns, batches):
+    schema = _arrow_schema(columns)
+    import pyarrow.parquet as pq
+
+    written = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        for rows in batches:
+            writer.write_batch(_arrow_batch(schema, rows))
+            written += len(rows)
+    return written
+
+
+def _export(kind, query, params, out, fmt, batch_size):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}' (expected one of {', '.join(EXPORT_FORMATS)})")
+    columns = EXPORT_COLUMNS[kind]
+    batches = _export_batches(query, tuple(params) or None, int(batch_size))
+    try:
+        if fmt == "parquet":
+            return _write_parquet(out, columns, batches)
+        if isinstance(out, (str, os.PathLike)):
+            with open(out, "w", newline="", encoding="utf-8") as f:
+                return _write_csv(f, list(columns), batches)
+        if isinstance(out, (io.RawIOBase, io.BufferedIOBase)) or "b" in getattr(out, "mode", ""):
+            text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+            try:
+                return _write_csv(text, list(columns), batches)
+            finally:
+                text.flush()
+                text.detach()   # leave the caller's file open
+        return _write_csv(out, list(columns), batches)
+    finally:
+        batches.close()
+
+
+def export_members(out, fmt="csv", batch_size=EXPORT_BATCH_SIZE, membership_type="All", **filters):
+    """
+    Write the fetch_members() rows (same filters) to `out`, a path or file
+    object, as CSV or Parquet, in member_id order. Returns the row count.
+    """
+    clauses, params = _member_filters(membership_type, **filters)
+    query = MEMBER_COLUMNS + MEMBERS_FROM
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY m.member_id"
+    return _export("members", query, params, out, fmt, batch_size)
+
+
+def export_payments(out, fmt="csv", batch_size=EXPORT_BATCH_SIZE, start=None, end=None):
+    """
+    Write every payment (or those dated `start`..`end`, inclusive) to `out`
+    as CSV or Parquet, in payment_id order. Returns the row count.
+    """
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("payment_date >= %s")
+        params.append(start)
+    if end is not None:
+        clauses.append("payment_date <= %s")
+        params.append(end)
+
+    query = f"SELECT {', '.join(EXPORT_COLUMNS['payments'])} FROM Payments"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY payment_id"
+    return _export("payments", query, params, out, fmt, batch_size)
 
 
 # ---------------------------------------------------------------
-# 🟢 NEW IMPROVED FUNCTION → FETCH MEMBERS (All + Filter Both)
+# ⏳ EXPIRING / EXPIRED MEMBERSHIPS → bucketed counts on end_date
 # ---------------------------------------------------------------
-def fetch_members(membership_type="All"):
-    conn = get_connection()
+# Counts come from range scans on idx_members_end_date (or the plan/trainer
+# composites) and are grouped in SQL, so no member rows leave the database.
+EXPIRY_BUCKET_DAYS = {"day": 1, "week": 7}
 
-    base_query = """
-        SELECT 
-            m.member_id,
-            m.name AS Member_Name,
-            m.age,
-            m.gender,
-            m.contact,
-            m.membership_type,
-            m.start_date,
-            m.end_date,
-            t.name AS Trainer_Name,
-            t.specialization AS Trainer_Specialization,
-            p.amount AS Payment_Amount,
-            p.status AS Payment_Status,
-            p.mode AS Payment_Mode
-        FROM Members m
-        LEFT JOIN Trainers t ON m.trainer_id = t.trainer_id
-        LEFT JOIN (
-            SELECT *
-            FROM (
-                SELECT *,
-                    ROW_NUMBER() OVER (PARTITION BY member_id 
-                                       ORDER BY payment_date DESC, payment_id DESC) AS rn
-                FROM Payments
-            ) sub
-            WHERE rn = 1
-        ) p ON m.member_id = p.member_id
+
+def expiry_window(days, expired=False):
+    """(first, last) end_date covered: the next `days` days, or the past `days` days."""
+    today = date.today()
+    if expired:
+        return today - timedelta(days=days), today - timedelta(days=1)
+    return today, today + timedelta(days=days - 1)
+
+
+def expiry_bucket_counts(days=30, bucket="day", expired=False, membership_type="All", trainer_id=None):
+    """
+    Count members whose membership ends (or ended) in each day/week of the
+    window. Returns a DataFrame with From, To and Members per bucket, zero
+    buckets included, nearest to today first.
     """
+    size = EXPIRY_BUCKET_DAYS[bucket]
+    first, last = expiry_window(days, expired)
+    today = date.today()
 
-    if membership_type == "All":
-        df = pd.read_sql(base_query, conn)
+    # Offset = whole days from today, counted away from today in both modes
+    if expired:
+        offset = BACKEND.days_between("%s", "m.end_date") + " - 1"
     else:
-        df = pd.read_sql(base_query + " WHERE m.membership_type = %s", conn, params=(membership_type,))
+        offset = BACKEND.days_between("m.end_date", "%s")
+    clauses, params = _member_filters(membership_type, trainer_id=trainer_id, end_between=(first, last))
+    query = f"""
+        SELECT {BACKEND.floor_div(offset, "%s")} AS bucket, COUNT(*) AS members
+        FROM Members m
+        WHERE {" AND ".join(clauses)}
+        GROUP BY bucket
+    """
+
+    conn = get_read_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, (today, size, *params))
+        counts = {int(b): n for b, n in cursor.fetchall()}
+    finally:
+        conn.close()
+
+    rows = []
+    for b in range((days + size - 1) // size):
+        near = b * size
+        far = min(near + size, days) - 1
+        if expired:
+            start, end = today - timedelta(days=far + 1), today - timedelta(days=near + 1)
+        else:
+            start, end = today + timedelta(days=near), today + timedelta(days=far)
+        rows.append({"From": start, "To": end, "Members": counts.get(b, 0)})
+    return pd.DataFrame(rows, columns=["From", "To", "Members"])
+
+
+# ------------------- REFERENCE DATA CACHE -------------------
+# Membership_Types and Trainers rarely change, so they are cached process-wide
+# (shared by every Streamlit session). Entries expire after REFERENCE_TTL
+# seconds or as soon as invalidate_reference_data() is called - in this
+# process directly, in other processes via the mtime of a stamp file.
+REFERENCE_TTL = float(os.environ.get("GYM_REFERENCE_TTL", "600"))
+REFERENCE_STAMP_FILE = os.environ.get(
+    "GYM_REFERENCE_STAMP", os.path.join(tempfile.gettempdir(), "gym_db_reference.stamp")
+)
+
+_reference_cache = {}
+_reference_lock = threading.Lock()
+
+
+def _reference_stamp():
+    try:
+        return os.stat(REFERENCE_STAMP_FILE).st_mtime_ns
+    except OSError:
+        return 0
+
+
+REFERENCE_QUERIES = {
+    "Membership_Types": "SELECT * FROM Membership_Types",
+    "Trainers": "SELECT * FROM Trainers",
+}
+
+
+def _fresh_reference(table, stamp):
+    """The cached DataFrame for `table` if still valid under this stamp, else None."""
+    entry = _reference_cache.get(table)
+    if entry is None or entry[1] != stamp or time.monotonic() - entry[0] > REFERENCE_TTL:
+        return None
+    return entry[2]
 
-    conn.close()
-    return df
 
+def _store_reference(table, stamp, df):
+    with _reference_lock:
+        _reference_cache[table] = (time.monotonic(), stamp, df)
+
+
+def _cached_reference(table, refresh=False):
+    stamp = _reference_stamp()
+    df = None if refresh else _fresh_reference(table, stamp)
+
+    if df is None:
+        # Primary, not replica: a lagging copy would stay cached for REFERENCE_TTL
+        conn = get_connection()
+        try:
+            df = pd.read_sql(REFERENCE_QUERIES[table], conn)
+        finally:
+            conn.close()
+        _store_reference(table, stamp, df)
+
+    return df.copy()
+
+
+def invalidate_reference_data(*tables):
+    """Drop cached reference tables (all of them when none are named)."""
+    with _reference_lock:
+        if tables:
+            for table in tables:
+                _reference_cache.pop(table, None)
+        else:
+            _reference_cache.clear()
+
+    # Bump the stamp so other processes reload on their next read
+    try:
+        with open(REFERENCE_STAMP_FILE, "a"):
+            pass
+        os.utime(REFERENCE_STAMP_FILE, None)
+    except OSError:
+        pass
 
 
 # ------------------- FETCH MEMBERSHIP TYPES -------------------
-def fetch_membership_types():
-    conn = get_connection()
-    df = pd.read_sql("SELECT * FROM Membership_Types", conn)
-    conn.close()
-    return df
+def fetch_membership_types(refresh=False):
+    return _cached_reference("Membership_Types", refresh)
 
 # ------------------- FETCH TRAINERS -------------------
-def fetch_trainers():
-    conn = get_connection()
-    df = pd.read_sql("SELECT * FROM Trainers", conn)
-    conn.close()
-    return df
+def fetch_trainers(refresh=False):
+    return _cached_reference("Trainers", refresh)
 
 # ------------------- DELETE MEMBER -------------------
 def delete_member(member_id):
+    conn = None
     try:
         conn = get_connection()
         cursor = conn.cursor()
         conn.start_transaction()
 
+        cursor.execute("DELETE FROM Latest_Payments WHERE member_id=%s", (member_id,))
+        # Payments still NULL-stamped were never added to the rollups
+        _record_revenue(cursor, "p.member_id = %s AND p.membership_type IS NOT NULL", (member_id,), sign=-1)
         cursor.execute("DELETE FROM Payments WHERE member_id=%s", (member_id,))
         cursor.execute("DELETE FROM Members WHERE member_id=%s", (member_id,))
 
         if cursor.rowcount == 0:
             conn.rollback()
-            conn.close()
             return False
 
         conn.commit()
-        conn.close()
+        invalidate_member(member_id)
         return True
 
     except:
@@ -153,95 +1605,544 @@ def delete_member(member_id):
             pass
         return False
 
+    finally:
+        if conn is not None:
+            conn.close()
+
 # ------------------- RENEW MEMBERSHIP -------------------
 def renew_membership(member_id, membership_type, amount, mode, status='Paid', duration_months=3):
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    payment_id = "P" + uuid.uuid4().hex[:6].upper()
+    payment_id = new_payment_id()
     payment_date = date.today()
 
-    cursor.execute("""
-        INSERT INTO Payments (payment_id, member_id, amount, payment_date, mode, status)
-        VALUES (%s,%s,%s,%s,%s,%s)
-    """, (payment_id, member_id, amount, payment_date, mode, status))
-    conn.commit()
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        conn.start_transaction()
 
-    cursor.execute("SELECT end_date FROM Members WHERE member_id=%s", (member_id,))
-    result = cursor.fetchone()
+        # Lock the member row so concurrent renewals of one member queue up
+        # and each one extends the period the previous one wrote
+        cursor.execute("SELECT end_date FROM Members WHERE member_id=%s FOR UPDATE", (member_id,))
+        result = cursor.fetchone()
 
-    if result and result[0]:
-        last_end = result[0]
-        start_date = max(last_end + timedelta(days=1), date.today())
-    else:
-        start_date = date.today()
+        if result is None:
+            raise ValueError(f"Member {member_id} not found!")
 
-    end_date = start_date + timedelta(days=30 * duration_months)
+        if result[0]:
+            start_date = max(result[0] + timedelta(days=1), payment_date)
+        else:
+            start_date = payment_date
 
-    cursor.execute("""
-        UPDATE Members
-        SET membership_type=%s, start_date=%s, end_date=%s
-        WHERE member_id=%s
-    """, (membership_type, start_date, end_date, member_id))
+        end_date = start_date + timedelta(days=30 * int(duration_months))
 
-    conn.commit()
+        cursor.execute("""
+            INSERT INTO Payments (payment_id, member_id, amount, payment_date, mode, status, membership_type)
+            VALUES (%s,%s,%s,%s,%s,%s,%s)
+        """, (payment_id, member_id, amount, payment_date, mode, status, membership_type))
+        _record_latest_payment(cursor, member_id, payment_id, amount, payment_date, mode, status)
+        _record_revenue(cursor, "p.payment_id = %s", (payment_id,))
 
-    cursor.execute("""
-        SELECT amount, payment_date
-        FROM Payments
-        WHERE member_id=%s
-        ORDER BY payment_date DESC
-        LIMIT 1
-    """, (member_id,))
-    last_payment = cursor.fetchone()
+        cursor.execute("""
+            UPDATE Members
+            SET membership_type=%s, start_date=%s, end_date=%s
+            WHERE member_id=%s
+        """, (membership_type, start_date, end_date, member_id))
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
 
-    conn.close()
+    invalidate_member(member_id)
 
-    return payment_id, start_date, end_date, last_payment[0] if last_payment else None, last_payment[1] if last_payment else None
+    # The payment written above is now the member's latest one
+    return payment_id, start_date, end_date, amount, payment_date
 
 # db.py - Add these two functions near your other fetch functions
 
+MEMBER_DETAIL_COLUMNS = [
+    "member_id", "Member_Name", "age", "gender", "contact", "membership_type",
+    "start_date", "end_date", "Trainer_Name", "Trainer_Specialization",
+]
+PAYMENT_COLUMNS = ["payment_id", "amount", "payment_date", "mode", "status"]
+
 # ---------------------------------------------------------------
 # 👤 NEW CLIENT FUNCTION → FETCH SINGLE MEMBER DETAILS
 # ---------------------------------------------------------------
+MEMBER_DETAILS_QUERY = """
+    SELECT
+        m.member_id,
+        m.name AS Member_Name,
+        m.age,
+        m.gender,
+        m.contact,
+        m.membership_type,
+        m.start_date,
+        m.end_date,
+        t.name AS Trainer_Name,
+        t.specialization AS Trainer_Specialization
+    FROM Members m
+    LEFT JOIN Trainers t ON m.trainer_id = t.trainer_id
+    WHERE m.member_id = %s
+"""
+
+
 def fetch_member_details(member_id):
-    conn = get_connection()
-    query = """
-        SELECT
-            m.member_id,
-            m.name AS Member_Name,
-            m.age,
-            m.gender,
-            m.contact,
-            m.membership_type,
-            m.start_date,
-            m.end_date,
-            t.name AS Trainer_Name,
-            t.specialization AS Trainer_Specialization
-        FROM Members m
-        LEFT JOIN Trainers t ON m.trainer_id = t.trainer_id
-        WHERE m.member_id = %s
-    """
-    df = pd.read_sql(query, conn, params=(member_id,))
-    conn.close()
+    conn = get_read_connection(member_id)
+    try:
+        df = pd.read_sql(MEMBER_DETAILS_QUERY, conn, params=(member_id,))
+    finally:
+        conn.close()
     return df
 
 # ---------------------------------------------------------------
 # 👤 NEW CLIENT FUNCTION → FETCH MEMBER PAYMENT HISTORY
 # ---------------------------------------------------------------
+MEMBER_PAYMENTS_QUERY = """
+    SELECT
+        payment_id,
+        amount,
+        payment_date,
+        mode,
+        status
+    FROM Payments
+    WHERE member_id = %s
+    ORDER BY payment_date DESC
+"""
+
+
 def fetch_member_payments(member_id):
-    conn = get_connection()
+    conn = get_read_connection(member_id)
+    try:
+        df = pd.read_sql(MEMBER_PAYMENTS_QUERY, conn, params=(member_id,))
+    finally:
+        conn.close()
+    return df
+
+# ---------------------------------------------------------------
+# 💳 PAGED PAYMENT HISTORY → keyset on (payment_date, payment_id)
+# ---------------------------------------------------------------
+# Served by idx_payments_member_date (member_id, payment_date, payment_id)
+PAYMENT_PAGE_SIZE = 10
+
+PAYMENT_SUMMARY_QUERY = """
+    SELECT
+        COALESCE(SUM(CASE WHEN status = 'Paid' THEN amount END), 0) AS total_paid,
+        COALESCE(SUM(CASE WHEN status = 'Unpaid' THEN amount END), 0) AS unpaid_balance,
+        COUNT(*) AS payment_count
+    FROM Payments
+    WHERE member_id = %s
+"""
+
+
+def _payments_cursor(payments):
+    last = payments.iloc[-1]
+    return _sql_value(last["payment_date"]), last["payment_id"]
+
+
+def _payment_summary(row):
+    if row is None:
+        return {"total_paid": 0, "unpaid_balance": 0, "payment_count": 0,
+                "last_payment_amount": None, "last_payment_date": None}
+    return {
+        "total_paid": _sql_value(row["total_paid"]) or 0,
+        "unpaid_balance": _sql_value(row["unpaid_balance"]) or 0,
+        "payment_count": int(_sql_value(row["payment_count"]) or 0),
+        "last_payment_amount": _sql_value(row["last_payment_amount"]),
+        "last_payment_date": _sql_value(row["last_payment_date"]),
+    }
+
+
+def fetch_member_payments_page(member_id, page_size=PAYMENT_PAGE_SIZE, after=None):
+    """
+    Return (payments DataFrame, next cursor), newest first. Pass the cursor
+    back as `after` for the following page; it is None on the last page.
+    """
     query = """
-        SELECT
-            payment_id,
-            amount,
-            payment_date,
-            mode,
-            status
+        SELECT payment_id, amount, payment_date, mode, status
         FROM Payments
         WHERE member_id = %s
-        ORDER BY payment_date DESC
     """
-    df = pd.read_sql(query, conn, params=(member_id,))
-    conn.close()
-    return df
\ No newline at end of file
+    params = [member_id]
+    if after is not None:
+        query += " AND (payment_date < %s OR (payment_date = %s AND payment_id < %s))"
+        params.extend([after[0], after[0], after[1]])
+    query += " ORDER BY payment_date DESC, payment_id DESC LIMIT %s"
+    params.append(int(page_size) + 1)
+
+    conn = get_read_connection(member_id)
+    try:
+        df = pd.read_sql(query, conn, params=tuple(params))
+    finally:
+        conn.close()
+
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        next_cursor = _payments_cursor(df)
+    return df, next_cursor
+
+
+MEMBER_SUMMARY_QUERY = f"""
+    SELECT s.*, lp.amount AS last_payment_amount, lp.payment_date AS last_payment_date
+    FROM ({PAYMENT_SUMMARY_QUERY}) s
+    LEFT JOIN Latest_Payments lp ON lp.member_id = %s
+"""
+
+
+def fetch_member_payment_summary(member_id):
+    """Lifetime paid, unpaid balance, payment count and last payment, via one aggregate query."""
+    conn = get_read_connection(member_id)
+    try:
+        df = pd.read_sql(MEMBER_SUMMARY_QUERY, conn, params=(member_id, member_id))
+    finally:
+        conn.close()
+    return _payment_summary(df.iloc[0])
+
+
+# ---------------------------------------------------------------
+# 👤 MEMBER SNAPSHOT CACHE → profile + payments for the portal
+# ---------------------------------------------------------------
+# The portal keeps each member's profile and payment history in a bounded
+# LRU cache (shared by all sessions in the process) for MEMBER_CACHE_TTL
+# seconds. Write paths call invalidate_member(); the IDs are also appended to
+# a journal file so portal processes drop their copies on the next read.
+MEMBER_CACHE_SIZE = int(os.environ.get("GYM_MEMBER_CACHE_SIZE", "1000"))
+MEMBER_CACHE_TTL = float(os.environ.get("GYM_MEMBER_CACHE_TTL", "300"))
+MEMBER_JOURNAL_FILE = os.environ.get(
+    "GYM_MEMBER_JOURNAL", os.path.join(tempfile.gettempdir(), "gym_db_members.journal")
+)
+MEMBER_JOURNAL_MAX_BYTES = 1_000_000
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_member_cache = TTLCache(MEMBER_CACHE_SIZE, MEMBER_CACHE_TTL)
+_journal_lock = threading.Lock()
+_journal_position = None   # (inode, bytes already applied) once initialised
+
+
+def invalidate_member(*member_ids):
+    """Drop cached snapshots of these members here and in other processes."""
+    for member_id in member_ids:
+        _member_cache.pop(int(member_id))
+    _remember_member_writes(member_ids)
+    _roster.mark_stale(member_ids)
+
+    try:
+        with open(MEMBER_JOURNAL_FILE, "a") as journal:
+            journal.write("".join(f"{int(m)}\n" for m in member_ids))
+            rotate = journal.tell() > MEMBER_JOURNAL_MAX_BYTES
+        if rotate:
+            # A fresh file (new inode) makes every reader clear its cache once
+            tmp = MEMBER_JOURNAL_FILE + f".{os.getpid()}"
+            open(tmp, "w").close()
+            os.replace(tmp, MEMBER_JOURNAL_FILE)
+    except OSError:
+        pass
+
+
+def _member_journal_position():
+    """Current end of the member journal as (inode, offset), to read changes from later."""
+    try:
+        st = os.stat(MEMBER_JOURNAL_FILE)
+    except OSError:
+        return (None, 0)
+    return (st.st_ino, st.st_size)
+
+
+def _read_member_journal(position):
+    """
+    Member IDs written since `position` (from _member_journal_position()).
+    Returns (IDs, new position); IDs is None when the journal was rotated in
+    between, so some writes may have been missed.
+    """
+    try:
+        st = os.stat(MEMBER_JOURNAL_FILE)
+    except OSError:
+        return [], position
+
+    inode, offset = position
+    if inode == st.st_ino and offset == st.st_size:
+        return [], position
+
+    rotated = inode is not None and (inode != st.st_ino or st.st_size < offset)
+    if inode != st.st_ino or st.st_size < offset:
+        offset = 0
+
+    try:
+        with open(MEMBER_JOURNAL_FILE, "rb") as journal:
+            journal.seek(offset)
+            changed = journal.read()
+    except OSError:
+        return [], position
+
+    # A line still being appended is left for the next read
+    changed = changed[:changed.rfind(b"\n") + 1]
+    written = [int(line) for line in changed.decode("ascii", "ignore").splitlines() if line.strip().isdigit()]
+    return (None if rotated else written), (st.st_ino, offset + len(changed))
+
+
+def _apply_member_journal():
+    """Evict members other processes have written to since the last check."""
+    global _journal_position
+    with _journal_lock:
+        if _journal_position is None:
+            # First look: nothing is cached yet, so older entries don't matter
+            _journal_position = _member_journal_position()
+            return
+
+        written, _journal_position = _read_member_journal(_journal_position)
+        if written is None:
+            # Journal was rotated: entries may have been missed
+            _member_cache.clear()
+            _roster.reset()
+            _note_write()
+            return
+
+        for member_id in written:
+            _member_cache.pop(member_id)
+        _remember_member_writes(written)
+        _roster.mark_stale(written)
+
+
+def fetch_member_snapshot(member_id):
+    """
+    Return (details, payments, summary, next_cursor) for one member, loaded
+    with a single query and served from the member cache afterwards:
+
+    - details: one-row DataFrame shaped like fetch_member_details()
+    - payments: the newest PAYMENT_PAGE_SIZE payments
+    - summary: dict from the aggregate (see fetch_member_payment_summary)
+    - next_cursor: pass to fetch_member_payments_page() for older payments
+    """
+    member_id = int(member_id)
+    _apply_member_journal()
+
+    snapshot = _member_cache.get(member_id)
+    if snapshot is None:
+        query = f"""
+            SELECT
+                m.member_id,
+                m.name AS Member_Name,
+                m.age,
+                m.gender,
+                m.contact,
+                m.membership_type,
+                m.start_date,
+                m.end_date,
+                t.name AS Trainer_Name,
+                t.specialization AS Trainer_Specialization,
+                s.total_paid,
+                s.unpaid_balance,
+                s.payment_count,
+                lp.amount AS last_payment_amount,
+                lp.payment_date AS last_payment_date,
+                p.payment_id,
+                p.amount,
+                p.payment_date,
+                p.mode,
+                p.status
+            FROM Members m
+            LEFT JOIN Trainers t ON m.trainer_id = t.trainer_id
+            LEFT JOIN Latest_Payments lp ON lp.member_id = m.member_id
+            CROSS JOIN ({PAYMENT_SUMMARY_QUERY}) s
+            LEFT JOIN (
+                SELECT payment_id, amount, payment_date, mode, status
+                FROM Payments
+                WHERE member_id = %s
+                ORDER BY payment_date DESC, payment_id DESC
+                LIMIT %s
+            ) p ON TRUE
+            WHERE m.member_id = %s
+            ORDER BY p.payment_date DESC, p.payment_id DESC
+        """
+        conn = get_read_connection(member_id)
+        try:
+            df = pd.read_sql(query, conn, params=(member_id, member_id, PAYMENT_PAGE_SIZE, member_id))
+        finally:
+            conn.close()
+
+        details = df[MEMBER_DETAIL_COLUMNS].head(1).reset_index(drop=True)
+        payments = df[PAYMENT_COLUMNS].dropna(subset=["payment_id"]).reset_index(drop=True)
+        summary = _payment_summary(df.iloc[0]) if not df.empty else _payment_summary(None)
+        next_cursor = _payments_cursor(payments) if summary["payment_count"] > len(payments) else None
+        snapshot = (details, payments, summary, next_cursor)
+        _member_cache.put(member_id, snapshot)
+
+    details, payments, summary, next_cursor = snapshot
+    return details.copy(), payments.copy(), dict(summary), next_cursor
+
+
+# ---------------------------------------------------------------
+# 📇 MEMBER ROSTER → in-memory typeahead for the Renew / Delete pages
+# ---------------------------------------------------------------
+# One roster per process, shared by every session: member IDs, names, plans
+# and end dates in parallel arrays sorted by lower-cased name, so a name
+# prefix is two binary searches. It is loaded once; members touched by
+# invalidate_member() here or in another process (via the member journal)
+# are re-read by ID before the next search. A reference-data stamp bump
+# (e.g. after an ETL load) triggers a full reload.
+ROSTER_MATCHES = 20
+ROSTER_QUERY = "SELECT member_id, name, membership_type, end_date FROM Members"
+
+
+RosterEntry = namedtuple("RosterEntry", ["member_id", "name", "membership_type", "end_date"])
+
+
+class MemberRoster:
+    """Array-backed member list with prefix search by name and lookup by ID."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None     # (keys, ids, names, plan codes, end dates), sorted by key
+        self._plans = []      # plan code -> membership_type
+        self._plan_codes = {}
+        self._stamp = None
+        self._stale = set()
+
+    def mark_stale(self, member_ids):
+        with self._lock:
+            self._stale.update(int(m) for m in member_ids)
+
+    def reset(self):
+        with self._lock:
+            self._data = None
+
+    def _plan_code(self, plan):
+        code = self._plan_codes.get(plan)
+        if code is None:
+            code = self._plan_codes[plan] = len(self._plans)
+            self._plans.append(plan)
+        return code
+
+    def _build(self, rows):
+        keys = np.array([(name or "").lower() for _, name, _, _ in rows], dtype=object)
+        order = np.argsort(keys, kind="stable")
+        return (
+            keys[order],
+            np.array([r[0] for r in rows], dtype=np.int64)[order],
+            np.array([r[1] or "" for r in rows], dtype=object)[order],
+            np.array([self._plan_code(r[2]) for r in rows], dtype=np.int16)[order],
+            np.array([r[3] for r in rows], dtype="datetime64[D]")[order],
+        )
+
+    def _read(self, conn, where="", params=()):
+        try:
+            cursor = conn.cursor()
+            cursor.execute(ROSTER_QUERY + where, params)
+            rows = cursor.fetchall()
+            cursor.close()
+        finally:
+            conn.close()
+        return rows
+
+    def _refresh(self, member_ids):
+        """Replace the given members with their current rows (dropping deleted ones)."""
+        placeholders = ", ".join(["%s"] * len(member_ids))
+        # Primary: these members were just written
+        rows = self._read(get_connection(), f" WHERE member_id IN ({placeholders})", tuple(member_ids))
+
+        keys, ids, names, plans, ends = self._data
+        keep = ~np.isin(ids, list(member_ids))
+        keys, ids, names, plans, ends = (a[keep] for a in (keys, ids, names, plans, ends))
+        if rows:
+            new = self._build(rows)
+            at = np.searchsorted(keys, new[0], side="right")
+            keys, ids, names, plans, ends = (
+                np.insert(a, at, b) for a, b in zip((keys, ids, names, plans, ends), new)
+            )
+        self._data = (keys, ids, names, plans, ends)
+
+    def _current(self):
+        _apply_member_journal()
+        stamp = _reference_stamp()
+        if self._data is None or self._stamp != stamp or self._stale:
+            with self._lock:
+                if self._data is None or self._stamp != stamp:
+                    self._data = self._build(self._read(get_read_connection()))
+                    self._stamp = stamp
+                    self._stale.clear()
+                elif self._stale:
+                    stale, self._stale = self._stale, set()
+                    self._refresh(sorted(stale))
+        return self._data
+
+    def search(self, text, limit=ROSTER_MATCHES):
+        """
+        Up to `limit` RosterEntry tuples for members whose name starts with
+        `text` (case-insensitive), in name order; a numeric `text` also
+        matches that member ID first. Plain tuples rather than a DataFrame
+        keep a keystroke's search in the microseconds.
+        """
+        keys, ids, names, plans, ends = self._current()
+        text = str(text).strip().lower()
+        if not text:
+            return []
+
+        lo = np.searchsorted(keys, text, side="left")
+        hi = np.searchsorted(keys, text + "\uffff", side="left")
+        rows = np.arange(lo, min(hi, lo + limit))
+        if text.isdigit():
+            rows = np.concatenate([np.flatnonzero(ids == int(text)), rows])[:limit]
+
+        return list(map(RosterEntry, ids[rows].tolist(), names[rows].tolist(),
+                        [self._plans[c] for c in plans[rows].tolist()], ends[rows].tolist()))
+
+    def __len__(self):
+        return len(self._current()[1])
+
+
+_roster = MemberRoster()
+
+
+def search_roster(text, limit=ROSTER_MATCHES):
+    """Typeahead over the in-memory member roster; see MemberRoster.search."""
+    return _roster.search(text, limit)
+
+
+# ------------------- INSTRUMENTATION -------------------
+# Every public function above is timed and its result rows counted; pool
+# checkouts and cursor statements are recorded by ConnectionPool/TimedCursor.
+metrics.REGISTRY.describe("gym_db_rows_fetched_total", "Rows fetched from cursors")
+metrics.REGISTRY.register_gauges("gym_db_pool", pool_stats)
+metrics.instrument_module(globals(), skip=("get_connection", "get_read_connection", "use_replica",
+                                           "mark_replica_down", "pool_stats", "close_pool"))
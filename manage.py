@@ -0,0 +1,112 @@
+"""
+Maintenance commands for the gym database.
+
+    python manage.py rebuild-latest-payments
+    python manage.py verify-latest-payments
+    python manage.py rebuild-revenue
+    python manage.py replica-status
+    python manage.py export payments --output payments.parquet --start 2024-04-01
+    python manage.py export members --output - --membership-type Annual
+    python manage.py snapshot [--full]
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+import db
+import snapshot
+
+
+def cmd_rebuild_latest_payments(args):
+    rows = db.rebuild_latest_payments()
+    print(f"✅ Latest_Payments rebuilt: {rows} members")
+
+
+def cmd_verify_latest_payments(args):
+    mismatches = db.verify_latest_payments()
+    if mismatches.empty:
+        print("✅ Latest_Payments is in sync with Payments")
+        return 0
+    print(f"❌ {len(mismatches)} members out of sync:\n", mismatches.to_string(index=False))
+    return 1
+
+
+def cmd_rebuild_revenue(args):
+    rows = db.rebuild_revenue_rollups()
+    print(f"✅ Revenue rollups rebuilt from {rows} payments")
+
+
+def cmd_replica_status(args):
+    status = db.replica_status()
+    if status is None:
+        print("No read replica configured (set GYM_DB_REPLICA_HOST)")
+        return 0
+    for key, value in status.items():
+        print(f"{key:<22} {value}")
+    return 0 if status["healthy"] else 1
+
+
+def cmd_export(args):
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+    if args.output == "-" and fmt != "csv":
+        print("❌ Only CSV can be written to stdout", file=sys.stderr)
+        return 2
+
+    out = sys.stdout if args.output == "-" else args.output
+    if args.table == "members":
+        rows = db.export_members(out, fmt, args.batch_size, membership_type=args.membership_type)
+    else:
+        rows = db.export_payments(out, fmt, args.batch_size, start=args.start, end=args.end)
+
+    if args.output != "-":
+        size = os.path.getsize(args.output) / 2**20
+        print(f"✅ Exported {rows} {args.table} to {args.output} ({size:.1f} MB)")
+
+
+def cmd_snapshot(args):
+    status = snapshot.refresh(full=args.full)
+    print(f"✅ Snapshot refreshed ({status['mode']}) in {status['refresh_seconds']:.1f}s → {status['directory']}")
+    for table, rows in status["rows"].items():
+        print(f"{table:<22} {rows}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gym database maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser(
+        "rebuild-latest-payments", help="Recompute each member's latest payment from Payments"
+    ).set_defaults(func=cmd_rebuild_latest_payments)
+    commands.add_parser(
+        "verify-latest-payments", help="Compare Latest_Payments against Payments"
+    ).set_defaults(func=cmd_verify_latest_payments)
+    commands.add_parser(
+        "rebuild-revenue", help="Backfill Revenue_Daily / Revenue_Monthly from Payments"
+    ).set_defaults(func=cmd_rebuild_revenue)
+    commands.add_parser(
+        "replica-status", help="Check whether reads can be routed to the read replica"
+    ).set_defaults(func=cmd_replica_status)
+
+    export = commands.add_parser("export", help="Stream members or payments to a CSV or Parquet file")
+    export.add_argument("table", choices=["members", "payments"])
+    export.add_argument("--output", required=True, help="file to write, or - for CSV on stdout")
+    export.add_argument("--format", choices=db.EXPORT_FORMATS,
+                        help="default: parquet for *.parquet outputs, otherwise csv")
+    export.add_argument("--batch-size", type=int, default=db.EXPORT_BATCH_SIZE,
+                        help="rows fetched and written per batch (Parquet row group size)")
+    export.add_argument("--membership-type", default="All", help="members: only this plan")
+    export.add_argument("--start", type=date.fromisoformat, help="payments: first payment date (YYYY-MM-DD)")
+    export.add_argument("--end", type=date.fromisoformat, help="payments: last payment date (YYYY-MM-DD)")
+    export.set_defaults(func=cmd_export)
+
+    snap = commands.add_parser("snapshot", help="Refresh the columnar analytics snapshot")
+    snap.add_argument("--full", action="store_true", help="rebuild it instead of applying changes")
+    snap.set_defaults(func=cmd_snapshot)
+
+    args = parser.parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
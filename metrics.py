@@ -0,0 +1,325 @@
+"""
+In-process instrumentation for the gym apps.
+
+Counters and latency histograms live in one process-wide registry; db.py
+records every function call, cursor execution and connection checkout, and
+both Streamlit apps record how long each page takes to render. Statements
+slower than GYM_SLOW_QUERY_MS are written to the "gym.slow_queries" logger
+and kept in a short in-memory list for the diagnostics panel.
+
+The registry renders in the Prometheus text format (render_text()); set
+GYM_METRICS_PORT to also serve it over HTTP at /metrics. The exporter
+listens on GYM_METRICS_HOST, 127.0.0.1 by default; set it to 0.0.0.0 (or an
+interface address) only for a scraper on another machine.
+"""
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+SLOW_QUERY_SECONDS = float(os.environ.get("GYM_SLOW_QUERY_MS", "200")) / 1000
+SLOW_QUERY_KEEP = 100
+METRICS_HOST = os.environ.get("GYM_METRICS_HOST", "127.0.0.1")
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+slow_query_log = logging.getLogger("gym.slow_queries")
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (seconds)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bucket bound holding the q-th observation (inf past the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    """Thread-safe named counters, histograms and gauge callbacks, keyed by labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._gauges = []
+        self.slow_queries = deque(maxlen=SLOW_QUERY_KEEP)
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(value)
+
+    def register_gauges(self, prefix, collect):
+        """`collect()` returns {name: number}; each becomes gauge `<prefix>_<name>`."""
+        self._gauges.append((prefix, collect))
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.slow_queries.clear()
+
+    def histogram_frame(self, name):
+        """One row per label set: calls, total/avg seconds and p50/p95/p99 bucket bounds."""
+        with self._lock:
+            rows = [
+                {**dict(labels), "calls": h.count, "total_s": h.sum,
+                 "avg_ms": 1000 * h.sum / h.count if h.count else 0.0,
+                 "p50_ms": 1000 * h.quantile(0.50), "p95_ms": 1000 * h.quantile(0.95),
+                 "p99_ms": 1000 * h.quantile(0.99)}
+                for (hist_name, labels), h in self._histograms.items() if hist_name == name
+            ]
+        df = pd.DataFrame(rows)
+        return df.sort_values("total_s", ascending=False, ignore_index=True) if rows else df
+
+    def counter_frame(self, name):
+        with self._lock:
+            rows = [{**dict(labels), "value": v}
+                    for (counter_name, labels), v in self._counters.items() if counter_name == name]
+        return pd.DataFrame(rows)
+
+    def render_text(self):
+        """All metrics in the Prometheus text exposition format."""
+        def fmt_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines, typed = [], set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            histograms = [(key, list(h.buckets), list(h.counts), h.sum, h.count) for key, h in histograms]
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{fmt_labels(labels)} {value}")
+
+        for (name, labels), buckets, counts, total, count in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, n in zip(buckets + ["+Inf"], counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{fmt_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{fmt_labels(labels)} {total}")
+            lines.append(f"{name}_count{fmt_labels(labels)} {count}")
+
+        for prefix, collect in self._gauges:
+            try:
+                values = collect()
+            except Exception:
+                continue
+            for key, value in values.items():
+                name = f"{prefix}_{key}"
+                header(name, "gauge")
+                lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+REGISTRY.describe("gym_db_call_seconds", "Duration of db.py function calls")
+REGISTRY.describe("gym_db_call_rows_total", "Rows returned by db.py functions")
+REGISTRY.describe("gym_db_call_errors_total", "db.py function calls that raised")
+REGISTRY.describe("gym_db_statement_seconds", "Duration of cursor execute/executemany calls")
+REGISTRY.describe("gym_db_statement_rows_total", "Rows affected by INSERT/UPDATE/DELETE statements")
+REGISTRY.describe("gym_db_slow_statements_total", "Statements slower than the slow-query threshold")
+REGISTRY.describe("gym_db_connection_acquire_seconds", "Time to check a connection out of the pool")
+REGISTRY.describe("gym_page_render_seconds", "Streamlit page render time")
+
+
+def statement_kind(operation):
+    """First SQL keyword (SELECT, INSERT, ...), used as a low-cardinality label."""
+    words = str(operation).split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+def record_statement(operation, seconds, rows=None, registry=REGISTRY):
+    kind = statement_kind(operation)
+    rows = rows if rows is not None and rows >= 0 else None
+    registry.observe("gym_db_statement_seconds", seconds, statement=kind)
+    if rows is not None:
+        registry.inc("gym_db_statement_rows_total", rows, statement=kind)
+
+    if seconds >= SLOW_QUERY_SECONDS:
+        sql = " ".join(str(operation).split())
+        registry.inc("gym_db_slow_statements_total", statement=kind)
+        registry.slow_queries.append({
+            "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "ms": round(seconds * 1000, 1),
+            "rows": rows,
+            "sql": sql,
+        })
+        slow_query_log.warning("slow query %.1f ms (rows=%s): %s", seconds * 1000,
+                               "?" if rows is None else rows, sql)
+
+
+def _result_rows(result):
+    """Row count of a function result: a DataFrame, or a tuple led by one."""
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    return None
+
+
+def instrument(func, name=None, registry=REGISTRY):
+    """Wrap a db function (plain or async) with call timing, result row counts and error counts."""
+    name = name or func.__name__
+
+    def record(start, result):
+        registry.observe("gym_db_call_seconds", time.perf_counter() - start, function=name)
+        rows = _result_rows(result)
+        if rows is not None:
+            registry.inc("gym_db_call_rows_total", rows, function=name)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                registry.inc("gym_db_call_errors_total", function=name)
+                registry.observe("gym_db_call_seconds", time.perf_counter() - start, function=name)
+                raise
+            record(start, result)
+            return result
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                registry.inc("gym_db_call_errors_total", function=name)
+                registry.observe("gym_db_call_seconds", time.perf_counter() - start, function=name)
+                raise
+            record(start, result)
+            return result
+
+    return wrapper
+
+
+def instrument_module(namespace, skip=(), prefix=""):
+    """Wrap every public function defined in a module namespace (pass globals())."""
+    module = namespace["__name__"]
+    for name, value in list(namespace.items()):
+        if (inspect.isfunction(value) and value.__module__ == module
+                and not name.startswith("_") and name not in skip):
+            namespace[name] = instrument(value, prefix + name)
+
+
+class PageTimer:
+    """Times one Streamlit script run: start at the top, stop() at the bottom."""
+
+    def __init__(self, app, page, registry=REGISTRY):
+        self.app = app
+        self.page = page
+        self.registry = registry
+        self.start = time.perf_counter()
+
+    def stop(self):
+        self.registry.observe("gym_page_render_seconds", time.perf_counter() - self.start,
+                              app=self.app, page=self.page)
+
+
+def page_timer(app, page):
+    return PageTimer(app, page)
+
+
+def render_text():
+    return REGISTRY.render_text()
+
+
+# ------------------- HTTP exporter -------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None, host=None):
+    """
+    Serve /metrics from a daemon thread (once per process). The port defaults
+    to GYM_METRICS_PORT; without one nothing is started. The address defaults
+    to METRICS_HOST (loopback). Returns the server.
+    """
+    global _server
+    port = port if port is not None else os.environ.get("GYM_METRICS_PORT")
+    host = host or METRICS_HOST
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except OSError as e:
+                logging.getLogger("gym.metrics").warning("metrics server not started on %s:%s: %s", host, port, e)
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
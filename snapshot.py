@@ -0,0 +1,277 @@
+"""
+Columnar snapshot of the gym tables for dashboards and reports.
+
+Members, Payments, Trainers and Membership_Types are copied into Arrow IPC
+files under GYM_SNAPSHOT_DIR. Reads memory-map those files, so analysis
+gets a DataFrame in milliseconds without a query against the live database:
+
+    payments = snapshot.read_table("Payments")
+    members = snapshot.read_table("Members", columns=["member_id", "end_date"])
+    snapshot.staleness()        # seconds since the data was captured
+
+refresh() is incremental. It appends members above the highest member_id
+captured and payments dated on or after the latest payment_date captured,
+and re-reads members (with their payments) that db.py's member journal
+lists as written since the previous refresh, which also drops deleted ones.
+The two reference tables are small and re-read whole. It falls back to a
+full rebuild on the first run, after the journal was rotated, or when the
+captured row counts no longer match the database (writes made outside
+db.py, such as a Project1.py load).
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import db
+import metrics
+
+SNAPSHOT_DIR = os.environ.get("GYM_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "gym_snapshot"))
+# read_table() refreshes first when the snapshot is older than this (seconds)
+SNAPSHOT_MAX_AGE = float(os.environ.get("GYM_SNAPSHOT_MAX_AGE", "300"))
+SNAPSHOT_BATCH_SIZE = db.EXPORT_BATCH_SIZE
+
+SNAPSHOT_COLUMNS = {
+    "Members": {
+        "member_id": "int64", "name": "string", "age": "int64", "gender": "string", "contact": "int64",
+        "membership_type": "string", "start_date": "date32", "end_date": "date32", "trainer_id": "int64",
+    },
+    "Payments": db.EXPORT_COLUMNS["payments"],
+    "Trainers": {"trainer_id": "int64", "name": "string", "specialization": "string"},
+    "Membership_Types": {"membership_type": "string", "price": "float64", "validity_months": "int64"},
+}
+
+_refresh_lock = threading.Lock()
+_loaded = {}   # table -> ((inode, mtime_ns), pyarrow.Table)
+
+
+# ------------------- Files -------------------
+def _path(name):
+    return os.path.join(SNAPSHOT_DIR, name)
+
+
+def _read_meta():
+    try:
+        with open(_path("snapshot.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _replace(name, write):
+    """Write a file beside its final name, then swap it in (readers keep their mapped copy)."""
+    tmp = _path(f"{name}.{os.getpid()}.tmp")
+    write(tmp)
+    os.replace(tmp, _path(name))
+
+
+def _write_table(table, data):
+    def write(tmp):
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, data.schema) as writer:
+            writer.write_table(data)
+    _replace(f"{table}.arrow", write)
+
+
+def _write_meta(meta):
+    def write(tmp):
+        with open(tmp, "w") as f:
+            json.dump(meta, f, indent=2)
+    _replace("snapshot.json", write)
+
+
+def _arrow_table(table):
+    """The snapshot's copy of `table`, memory-mapped once per file version."""
+    path = _path(f"{table}.arrow")
+    st = os.stat(path)
+    version = (st.st_ino, st.st_mtime_ns)
+    entry = _loaded.get(table)
+    if entry is None or entry[0] != version:
+        with pa.memory_map(path) as source:
+            entry = _loaded[table] = (version, pa.ipc.open_file(source).read_all())
+    return entry[1]
+
+
+# ------------------- Database reads -------------------
+def _select(table, where="", params=(), primary=False):
+    schema = db._arrow_schema(SNAPSHOT_COLUMNS[table])
+    query = f"SELECT {', '.join(schema.names)} FROM {table}"
+    if where:
+        query += f" WHERE {where}"
+    batches = [db._arrow_batch(schema, rows) for rows in
+               db._export_batches(query, tuple(params) or None, SNAPSHOT_BATCH_SIZE, primary)]
+    return pa.Table.from_batches(batches, schema=schema)
+
+
+def _in_list(column, values):
+    return f"{column} IN ({', '.join(['%s'] * len(values))})", list(values)
+
+
+def _select_members(table, member_ids):
+    """Rows of Members/Payments for these members, read from the primary (they were just written)."""
+    parts = []
+    member_ids = sorted(member_ids)
+    for start in range(0, len(member_ids), db.BULK_CHUNK_SIZE):
+        where, params = _in_list("member_id", member_ids[start:start + db.BULK_CHUNK_SIZE])
+        parts.append(_select(table, where, params, primary=True))
+    if not parts:
+        return db._arrow_schema(SNAPSHOT_COLUMNS[table]).empty_table()
+    return pa.concat_tables(parts)
+
+
+def _drop(data, column, values):
+    if not len(values):
+        return data
+    value_set = pa.array(values, data.schema.field(column).type)
+    return data.filter(pc.invert(pc.is_in(data[column], value_set=value_set)))
+
+
+def _count(query, params=()):
+    conn = db.get_read_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, tuple(params) or None)
+        return cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _high_water(members, payments):
+    max_member = pc.max(members["member_id"]).as_py() if members.num_rows else 0
+    max_date = pc.max(payments["payment_date"]).as_py() if payments.num_rows else None
+    return max_member, max_date
+
+
+def _counts_match(members, payments, max_member, max_date):
+    """
+    Compare the captured rows with the database over the range the snapshot
+    covers (rows committed meanwhile fall outside it), so writes made
+    outside db.py force a full rebuild.
+    """
+    if _count("SELECT COUNT(*) FROM Members WHERE member_id <= %s", (max_member,)) != members.num_rows:
+        return False
+    if max_date is None:
+        return True
+    captured = pc.sum(pc.less(payments["payment_date"], pa.scalar(max_date, pa.date32()))).as_py() or 0
+    return _count("SELECT COUNT(*) FROM Payments WHERE payment_date < %s", (max_date,)) == captured
+
+
+# ------------------- Refresh -------------------
+def _full():
+    return {table: _select(table) for table in SNAPSHOT_COLUMNS}
+
+
+def _incremental(meta, changed):
+    members, payments = _arrow_table("Members"), _arrow_table("Payments")
+    max_member = meta["max_member_id"]
+    max_date = date.fromisoformat(meta["max_payment_date"]) if meta["max_payment_date"] else None
+
+    new_members = _select("Members", "member_id > %s", (max_member,))
+    if max_date is None:
+        new_payments = _select("Payments")
+    else:
+        # The last captured day is read again: payments dated that day may have arrived since
+        new_payments = _select("Payments", "payment_date >= %s", (max_date,))
+
+    # Written members are re-read from the primary and replace every other copy
+    changed = sorted(set(changed))
+    new_members = _drop(new_members, "member_id", changed)
+    new_payments = _drop(new_payments, "member_id", changed)
+    members = _drop(members, "member_id", changed + new_members["member_id"].to_pylist())
+    payments = _drop(payments, "member_id", changed)
+    payments = _drop(payments, "payment_id", new_payments["payment_id"].to_pylist())
+    changed_payments = _select_members("Payments", changed)
+
+    return {
+        "Members": pa.concat_tables([members, new_members, _select_members("Members", changed)]),
+        "Payments": pa.concat_tables([payments, new_payments, changed_payments]),
+        "Trainers": _select("Trainers"),
+        "Membership_Types": _select("Membership_Types"),
+    }
+
+
+def refresh(full=False):
+    """
+    Bring the snapshot up to date (incrementally unless `full` or needed)
+    and return status().
+    """
+    with _refresh_lock:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        meta = _read_meta()
+        if meta is not None and meta.get("source") != db.BACKEND.describe():
+            meta = None   # captured from another database
+
+        started = time.time()
+        # Journal position first: members written while reading are re-read next time
+        position = db._member_journal_position()
+        changed = None
+        if not full and meta is not None:
+            changed, position = db._read_member_journal(tuple(meta["journal"]))
+
+        if changed is None:
+            tables, mode = _full(), "full"
+        else:
+            tables, mode = _incremental(meta, changed), f"incremental ({len(set(changed))} members written)"
+
+        max_member, max_date = _high_water(tables["Members"], tables["Payments"])
+        if changed is not None and not _counts_match(tables["Members"], tables["Payments"], max_member, max_date):
+            tables, mode = _full(), "full (row counts differed)"
+            max_member, max_date = _high_water(tables["Members"], tables["Payments"])
+
+        for table, data in tables.items():
+            _write_table(table, data.combine_chunks())
+        _write_meta({
+            "source": db.BACKEND.describe(),
+            "refreshed_at": started,
+            "refresh_seconds": time.time() - started,
+            "mode": mode,
+            "journal": list(position),
+            "max_member_id": max_member,
+            "max_payment_date": max_date.isoformat() if max_date else None,
+            "rows": {table: data.num_rows for table, data in tables.items()},
+        })
+    return status()
+
+
+# ------------------- Reads -------------------
+def staleness():
+    """Seconds since the snapshot's data was read from the database (None if there is none)."""
+    meta = _read_meta()
+    return None if meta is None else time.time() - meta["refreshed_at"]
+
+
+def status():
+    """Snapshot metadata for diagnostics: age, last refresh mode and duration, row counts."""
+    meta = _read_meta()
+    if meta is None:
+        return {"exists": False, "directory": SNAPSHOT_DIR}
+    return {"exists": True, "directory": SNAPSHOT_DIR, "age_seconds": time.time() - meta["refreshed_at"],
+            **{k: meta[k] for k in ("source", "mode", "refresh_seconds", "max_member_id",
+                                    "max_payment_date", "rows")}}
+
+
+def read_arrow(table, columns=None, max_age=SNAPSHOT_MAX_AGE):
+    """
+    The snapshot's `table` as a pyarrow Table (memory-mapped, no copy).
+    Refreshes first when there is no snapshot or it is older than `max_age`
+    seconds; pass max_age=None to read whatever is there.
+    """
+    if table not in SNAPSHOT_COLUMNS:
+        raise ValueError(f"'{table}' is not in the snapshot (expected one of {', '.join(SNAPSHOT_COLUMNS)})")
+    age = staleness()
+    if age is None or (max_age is not None and age > max_age):
+        refresh()
+    data = _arrow_table(table)
+    return data.select(columns) if columns is not None else data
+
+
+def read_table(table, columns=None, max_age=SNAPSHOT_MAX_AGE):
+    """The snapshot's `table` (optionally only `columns`) as a DataFrame; see read_arrow()."""
+    return read_arrow(table, columns, max_age).to_pandas()
+
+
+metrics.instrument_module(globals(), skip=("staleness", "status"), prefix="snapshot.")